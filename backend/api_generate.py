@@ -1,12 +1,26 @@
+import functools
 import os
+import threading
+import time
 from typing import Optional, List, Dict, Any, Union
-try:
-    from openai import OpenAI
-except ImportError:
-    # 处理导入错误，在后续代码中添加检查
-    OpenAI = None
 
 from backend.config import OPENAI_BASE_URL, OPENAI_API_KEY, DEFAULT_MODEL
+from backend.metrics import llm_request_duration, llm_tokens
+from backend.tracing import span
+from backend.log import get_logger
+
+logger = get_logger(__name__)
+
+
+@functools.lru_cache(maxsize=None)
+def _openai_class():
+    """首次生成文本时才导入openai（连同httpx、pydantic约0.4秒），未安装时返回None"""
+    try:
+        from openai import OpenAI
+    except ImportError:
+        logger.warning("未找到OpenAI模块，需要安装'openai'包")
+        return None
+    return OpenAI
 
 
 class Generator:
@@ -22,16 +36,25 @@ class Generator:
         self.base_url = base_url or OPENAI_BASE_URL
         self.api_key = api_key or OPENAI_API_KEY
         self.default_model = default_model or DEFAULT_MODEL
-        
-        # 检查OpenAI是否已成功导入
-        if OpenAI is None:
-            print("警告: 未找到OpenAI模块，需要安装'openai'包")
-            self.client = None
-        else:
-            self.client = OpenAI(
-                base_url=self.base_url,
-                api_key=self.api_key,
-            )
+        self._client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def client(self):
+        """OpenAI客户端，首次使用时创建；未安装openai时为None"""
+        if self._client is None:
+            with self._client_lock:
+                OpenAI = _openai_class()
+                if self._client is None and OpenAI is not None:
+                    try:
+                        self._client = OpenAI(
+                            base_url=self.base_url,
+                            api_key=self.api_key,
+                        )
+                    except Exception:
+                        # 例如未配置API密钥，下次使用时重试
+                        logger.exception("创建OpenAI客户端失败")
+        return self._client
 
     def generate_response(
         self, 
@@ -45,16 +68,24 @@ class Generator:
         if model is None:
             model = self.default_model
              
+        started = time.perf_counter()
         try:
-            response = self.client.chat.completions.create(
-                model=model,
-                messages=messages,
-            )
-            return response.choices[0].message.content
+            with span("llm_request", "llm", model=model):
+                response = self.client.chat.completions.create(
+                    model=model,
+                    messages=messages,
+                )
         except Exception as e:
+            llm_request_duration.observe(time.perf_counter() - started, model, "error")
             # 记录错误并返回友好的错误消息
-            print(f"生成文本时出错: {e}")
+            logger.exception("生成文本时出错", extra={"model": model})
             return f"生成文本时出错: {str(e)}"
+        llm_request_duration.observe(time.perf_counter() - started, model, "success")
+        usage = getattr(response, "usage", None)
+        if usage is not None:
+            llm_tokens.inc(model, "prompt", amount=usage.prompt_tokens or 0)
+            llm_tokens.inc(model, "completion", amount=usage.completion_tokens or 0)
+        return response.choices[0].message.content
 
     def generate_with_default_messages(
         self, 
@@ -2,16 +2,24 @@ import os
 import sys
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from flask import Flask, send_from_directory, request
+from flask import Flask, request
 from flask_cors import CORS
-from flask_socketio import emit
+from flask_socketio import emit, join_room, leave_room
 
-from backend.extensions import socketio
-from backend.routes import api_bp
+from backend.extensions import (
+    socketio, emit_node_event, broadcast, client_projects, project_room, graph_room, project_scoped,
+    set_client_project, set_viewport, forget_client
+)
+from backend.http_cache import init_compression, send_static_file
+from backend.routes import api_bp, workspace_bp, ops_bp
+from backend import log, metrics, profiler
+from backend.workspace import validate_project_id
+from backend.spatial import position_of
 from backend.config import DEBUG, PORT, API_PREFIX, STATIC_FOLDER, STATIC_URL_PATH, SOCKETIO_CORS
 
-# 创建应用实例
-def create_app():
+# 创建应用实例，生产模式传入eventlet/gevent，多进程模式另外传入跨进程转发广播的
+# client_manager（见 backend/server.py）
+def create_app(async_mode="threading", client_manager=None):
     # 初始化Flask应用
     app = Flask(__name__, static_folder=STATIC_FOLDER, static_url_path=STATIC_URL_PATH)
     
@@ -20,23 +28,33 @@ def create_app():
     
     # 注册API蓝图
     app.register_blueprint(api_bp, url_prefix=API_PREFIX)
+    app.register_blueprint(api_bp, url_prefix=f"{API_PREFIX}/projects/<project_id>", name="project_api")
+    app.register_blueprint(workspace_bp, url_prefix=API_PREFIX)
+    app.register_blueprint(ops_bp)
+    metrics.init_app(app, blueprints=("api", "project_api"))
+    log.init_app(app)
+    profiler.init_app(app)
     
     # 初始化Socket.IO
-    socketio.init_app(app, cors_allowed_origins=SOCKETIO_CORS)
+    socketio.init_app(app, cors_allowed_origins=SOCKETIO_CORS, async_mode=async_mode,
+                      client_manager=client_manager)
+    
+    # 启用响应压缩
+    init_compression(app)
     
     # 静态文件路由
     @app.route("/")
     def serve_index():
         static_folder = app.static_folder or ""
-        return send_from_directory(static_folder, "index.html")
+        return send_static_file(static_folder, "index.html")
     
     @app.route("/<path:path>")
     def serve_static(path):
         static_folder = app.static_folder or ""
         if path != "" and os.path.exists(os.path.join(static_folder, path)):
-            return send_from_directory(static_folder, path)
+            return send_static_file(static_folder, path)
         else:
-            return send_from_directory(static_folder, "index.html")
+            return send_static_file(static_folder, "index.html")
     
     return app
 
@@ -44,19 +62,42 @@ def create_app():
 # Socket.IO事件处理器
 @socketio.on("connect")
 def handle_connect():
-    # 在Socket.IO上下文中可以使用request.sid
-    sid = request.headers.get('Sid') if hasattr(request, 'headers') else 'Unknown'
-    print(f"Client connected: {sid}")
+    # 连接和断开由 extensions 中的事件日志记录
+    # 默认使用默认图并接收全部节点事件，订阅可视区域后离开全图房间
+    join_room(project_room())
+    join_room(graph_room())
+    metrics.socketio_clients.inc()
 
 
 @socketio.on("disconnect")
-def handle_disconnect():
-    # 在Socket.IO上下文中可以使用request.sid
-    sid = request.headers.get('Sid') if hasattr(request, 'headers') else 'Unknown'
-    print(f"Client disconnected: {sid}")
+def handle_disconnect(reason=None):
+    # python-socketio 5.12起传入断开原因
+    forget_client(request.sid)
+    metrics.socketio_clients.dec()
+
+
+@socketio.on("project_join")
+def handle_project_join(data):
+    """切换客户端使用的项目 {"projectId": ...}，projectId为空时回到默认图"""
+    project_id = (data or {}).get("projectId") or None
+    try:
+        if project_id is not None:
+            validate_project_id(project_id)
+    except ValueError as e:
+        emit("project_error", {"error": str(e)})
+        return
+    previous = client_projects.get(request.sid)
+    leave_room(project_room(previous))
+    leave_room(graph_room(previous))
+    set_viewport(request.sid, None)
+    set_client_project(request.sid, project_id)
+    join_room(project_room(project_id))
+    join_room(graph_room(project_id))
+    emit("project_joined", {"projectId": project_id})
 
 
 @socketio.on("node_status_update")
+@project_scoped
 def handle_node_status_update(json):
     # 广播节点状态更新到所有客户端
     from backend.services import NodeService
@@ -64,13 +105,16 @@ def handle_node_status_update(json):
     
     node_id = json.get("nodeId")
     status = json.get("status")
-    if node_id and status:
-        node_service.update_node_status(node_id, status)
+    node = node_service.update_node_status(node_id, status) if node_id and status else None
     
-    emit("node_status_push", json, broadcast=True)
+    if node:
+        emit_node_event("node_status_push", json, position_of(node))
+    else:
+        broadcast("node_status_push", json)
 
 
 @socketio.on("nodes_update_request")
+@project_scoped
 def handle_nodes_update_request():
     # 发送最新节点数据给请求客户端
     from backend.services import NodeService
@@ -80,6 +124,7 @@ def handle_nodes_update_request():
 
 
 @socketio.on("edges_update_request")
+@project_scoped
 def handle_edges_update_request():
     # 发送最新边数据给请求客户端
     from backend.services import EdgeService
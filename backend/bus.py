@@ -0,0 +1,347 @@
+"""
+多进程模式的本地消息总线
+
+BusBroker 在监督进程中监听一个Unix socket，把每个进程发布的消息按唯一的全局顺序
+转发给所有进程（包括发布者自己）。图的修改（graph频道）同时在代理中按同样的顺序
+应用到各个图的共享副本上：进程载入一个图时先向代理请求该副本，代理不持有时才读磁盘。
+所有进程都卸载了一个项目后，代理写回（persist）并丢弃其共享副本。
+
+帧格式为4字节大端长度加JSON正文，不依赖Redis等外部服务。
+"""
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Set, Union
+
+import socketio
+
+from backend.config import BUS_OUTBOX_SIZE
+from backend.log import get_logger
+
+logger = get_logger(__name__)
+
+_HEADER = struct.Struct(">I")
+
+# 图修改消息所在的频道，代理会维护其共享副本
+GRAPH_CHANNEL = "graph"
+
+
+def encode_frame(message: Dict[str, Any]) -> bytes:
+    body = json.dumps(message, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return _HEADER.pack(len(body)) + body
+
+
+def send_frame(sock: socket.socket, message: Dict[str, Any]) -> None:
+    sock.sendall(encode_frame(message))
+
+
+def _recv_exact(sock: socket.socket, size: int) -> Optional[bytes]:
+    parts = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            return None
+        parts.append(chunk)
+        size -= len(chunk)
+    return b"".join(parts)
+
+
+def recv_frame(sock: socket.socket) -> Optional[Dict[str, Any]]:
+    """读取一帧，连接关闭时返回None"""
+    header = _recv_exact(sock, _HEADER.size)
+    if header is None:
+        return None
+    body = _recv_exact(sock, _HEADER.unpack(header)[0])
+    return None if body is None else json.loads(body.decode("utf-8"))
+
+
+class _SharedGraph:
+    """代理中一个图的共享副本，按ID保存节点和边的字典；seq为最后一次修改的消息序号"""
+
+    def __init__(self, nodes: List[Dict[str, Any]], edges: List[Dict[str, Any]], seq: int):
+        self.items = {
+            "nodes": OrderedDict((item["id"], item) for item in nodes),
+            "edges": OrderedDict((item["id"], item) for item in edges),
+        }
+        self.seq = seq
+
+    def apply(self, change: Dict[str, Any], seq: int) -> None:
+        items = self.items[change["kind"]]
+        if change.get("replace"):
+            items.clear()
+        for item in change.get("items", ()):
+            items[item["id"]] = item
+        for item_id in change.get("deleted", ()):
+            items.pop(item_id, None)
+        self.seq = seq
+
+    def to_message(self) -> Dict[str, Any]:
+        return {"nodes": list(self.items["nodes"].values()), "edges": list(self.items["edges"].values())}
+
+
+class _Outbox:
+    """一个连接的发送队列和发送线程
+
+    代理在锁内只把帧放入队列，由发送线程在锁外写出：某个进程停止读取时，
+    只有它自己的队列会积压，不会阻塞其他进程。队列满时断开该连接。
+    """
+
+    def __init__(self, connection: socket.socket):
+        self.connection = connection
+        self._queue: "queue.Queue[Union[bytes, Dict[str, Any], None]]" = queue.Queue(maxsize=BUS_OUTBOX_SIZE)
+        threading.Thread(target=self._run, name="bus-send", daemon=True).start()
+
+    def put(self, frame: Union[bytes, Dict[str, Any]]) -> bool:
+        """放入已编码的帧或待编码的消息，队列已满时返回False"""
+        try:
+            self._queue.put_nowait(frame)
+            return True
+        except queue.Full:
+            return False
+
+    def close(self) -> None:
+        """断开连接：正在进行的发送和该连接的接收都会结束"""
+        try:
+            self.connection.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        try:
+            self._queue.put_nowait(None)
+        except queue.Full:
+            # 发送线程正在写出，会因连接已断开而结束
+            pass
+
+    def _run(self) -> None:
+        while True:
+            frame = self._queue.get()
+            if frame is None:
+                return
+            try:
+                self.connection.sendall(frame if isinstance(frame, bytes) else encode_frame(frame))
+            except OSError:
+                self.close()
+                return
+
+
+class BusBroker:
+    """消息总线代理：为全部连接排定消息的全局顺序，并维护图的共享副本
+
+    进程通过sync请求副本时成为该图的持有者，卸载时发送release；连接断开时释放其全部持有。
+    项目图不再有持有者时，代理用persist(键, 节点, 边)写回副本后丢弃，
+    之后再载入时从磁盘读取，使代理的内存占用与工作进程一起受项目的LRU卸载约束。
+    未提供persist时直接丢弃（以各进程卸载时写回的数据为准）。默认图（空键）始终保留。
+    """
+
+    def __init__(self, path: str, persist: Optional[Callable[[str, List[Dict], List[Dict]], None]] = None):
+        self.path = path
+        self.persist = persist
+        self._lock = threading.Lock()
+        self._connections: Dict[socket.socket, _Outbox] = {}
+        self._graphs: Dict[str, _SharedGraph] = {}
+        self._holders: Dict[str, Set[socket.socket]] = {}
+        self._seq = 0
+        self._server: Optional[socketserver.ThreadingUnixStreamServer] = None
+
+    def start(self) -> "BusBroker":
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        broker = self
+
+        class Handler(socketserver.BaseRequestHandler):
+            def handle(self):
+                broker._serve(self.request)
+
+        self._server = socketserver.ThreadingUnixStreamServer(self.path, Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="bus-broker", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        with self._lock:
+            for outbox in self._connections.values():
+                outbox.close()
+            self._connections.clear()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def _serve(self, connection: socket.socket) -> None:
+        with self._lock:
+            self._connections[connection] = _Outbox(connection)
+        try:
+            while True:
+                message = recv_frame(connection)
+                if message is None:
+                    break
+                op = message.get("op")
+                if op == "release":
+                    self._release(connection, message["graph"])
+                    continue
+                with self._lock:
+                    if op == "sync":
+                        self._holders.setdefault(message["graph"], set()).add(connection)
+                        self._reply_snapshot(connection, message["graph"])
+                    else:
+                        self._fan_out(message["channel"], message["data"])
+        except OSError:
+            pass
+        finally:
+            with self._lock:
+                self._drop(connection)
+                held = [key for key, holders in self._holders.items() if connection in holders]
+            for key in held:
+                self._release(connection, key)
+
+    def _drop(self, connection: socket.socket) -> None:
+        """在self._lock内断开连接，连接已断开时不做任何事"""
+        outbox = self._connections.pop(connection, None)
+        if outbox is not None:
+            outbox.close()
+
+    def _send(self, connection: socket.socket, frame: Union[bytes, Dict[str, Any]]) -> None:
+        """在self._lock内把帧放入连接的发送队列，积压过多的连接被断开"""
+        outbox = self._connections.get(connection)
+        if outbox is not None and not outbox.put(frame):
+            logger.warning("工作进程接收消息过慢，断开其总线连接")
+            self._drop(connection)
+
+    def _fan_out(self, channel: str, data: Dict[str, Any]) -> None:
+        """在self._lock内编号并转发给所有连接"""
+        self._seq += 1
+        if channel == GRAPH_CHANNEL:
+            self._apply(data)
+        frame = encode_frame({"seq": self._seq, "channel": channel, "data": data})
+        for connection in list(self._connections):
+            self._send(connection, frame)
+
+    def _apply(self, data: Dict[str, Any]) -> None:
+        graph = self._graphs.get(data["graph"])
+        if data["type"] == "seed":
+            # 只采用第一个种子：之后的修改都以它为基础
+            if graph is None:
+                self._graphs[data["graph"]] = _SharedGraph(data["nodes"], data["edges"], self._seq)
+        elif graph is not None:
+            graph.apply(data, self._seq)
+
+    def _reply_snapshot(self, connection: socket.socket, key: str) -> None:
+        """在self._lock内回复共享副本，与其他消息在同一条有序的流中；由发送线程编码"""
+        graph = self._graphs.get(key)
+        data = {"type": "snapshot", "graph": key, **(graph.to_message() if graph else {"nodes": None, "edges": None})}
+        self._send(connection, {"seq": self._seq, "channel": GRAPH_CHANNEL, "data": data})
+
+    def _release(self, connection: socket.socket, key: str) -> None:
+        """connection不再持有图key；没有其他持有者时写回并丢弃共享副本"""
+        with self._lock:
+            holders = self._holders.get(key)
+            if holders is not None:
+                holders.discard(connection)
+            graph = self._graphs.get(key)
+            if not key or holders or graph is None:
+                return
+            seq = graph.seq
+            data = graph.to_message()
+        if self.persist is not None:
+            # 在锁外写回，写回期间的消息照常转发
+            try:
+                self.persist(key, data["nodes"], data["edges"])
+            except Exception:
+                logger.exception("写回共享副本失败", extra={"graph": key})
+                return
+        with self._lock:
+            # 写回期间有进程重新载入或修改了该图时保留副本
+            if not self._holders.get(key) and self._graphs.get(key) is graph and graph.seq == seq:
+                del self._graphs[key]
+                self._holders.pop(key, None)
+
+
+class BusClient:
+    """连接到代理的进程端：发布消息，并在后台按顺序把收到的消息分发给各频道的处理函数"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(path)
+        self._send_lock = threading.Lock()
+        self._handlers: Dict[str, Callable[[Dict[str, Any]], None]] = {}
+        self._inbox: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        # 与代理的连接断开后为False
+        self.connected = True
+
+    def subscribe(self, channel: str, handler: Callable[[Dict[str, Any]], None]) -> None:
+        self._handlers[channel] = handler
+
+    def publish(self, channel: str, data: Dict[str, Any]) -> None:
+        self._send({"op": "publish", "channel": channel, "data": data})
+
+    def request_snapshot(self, key: str) -> None:
+        """请求图的共享副本并成为其持有者，回复作为graph频道的snapshot消息送达"""
+        self._send({"op": "sync", "graph": key})
+
+    def release(self, key: str) -> None:
+        """本进程已卸载该图，不再持有代理的共享副本"""
+        self._send({"op": "release", "graph": key})
+
+    def _send(self, message: Dict[str, Any]) -> None:
+        with self._send_lock:
+            send_frame(self._sock, message)
+
+    def start(self) -> "BusClient":
+        # 接收线程只负责读取，处理函数在分发线程中按顺序执行：
+        # 处理函数等待图锁时不会停止读取，代理向本进程的发送也就不会被阻塞
+        threading.Thread(target=self._receive, name="bus-receive", daemon=True).start()
+        threading.Thread(target=self._dispatch, name="bus-dispatch", daemon=True).start()
+        return self
+
+    def _receive(self) -> None:
+        while True:
+            try:
+                frame = recv_frame(self._sock)
+            except OSError:
+                frame = None
+            self._inbox.put(frame)
+            if frame is None:
+                self.connected = False
+                return
+
+    def _dispatch(self) -> None:
+        while True:
+            frame = self._inbox.get()
+            if frame is None:
+                logger.warning("消息总线连接已断开")
+                return
+            handler = self._handlers.get(frame["channel"])
+            if handler is not None:
+                try:
+                    handler(frame["data"])
+                except Exception:
+                    logger.exception("处理总线消息时出错", extra={"channel": frame["channel"]})
+
+    def close(self) -> None:
+        self._sock.close()
+
+
+class BusClientManager(socketio.PubSubManager):
+    """通过本地消息总线在进程间转发Socket.IO广播的客户端管理器"""
+
+    name = "storyfactory-bus"
+
+    def __init__(self, client: BusClient, channel: str = "socketio"):
+        super().__init__(channel=channel)
+        self.client = client
+        self._messages: "queue.Queue[Dict[str, Any]]" = queue.Queue()
+        client.subscribe(channel, self._messages.put)
+
+    def _publish(self, data):
+        self.client.publish(self.channel, data)
+
+    def _listen(self):
+        while True:
+            yield self._messages.get()
@@ -0,0 +1,233 @@
+"""
+多进程模式的图复制和客户端状态同步
+
+每个工作进程都在内存中持有自己访问过的图。本地提交的修改通过修改监听函数发布到
+消息总线（backend/bus.py）的graph频道，代理为所有修改排定全局顺序，
+各进程按该顺序应用其他进程的修改，最终与代理的共享副本一致。
+
+本进程尚未收到回显的修改与其他进程的修改冲突时，以全局顺序为准：
+收到其他进程的修改后，再按顺序重新应用本进程随后回显的修改。
+"""
+import os
+import queue
+import threading
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from backend import extensions
+from backend.bus import GRAPH_CHANNEL, BusClient, BusClientManager
+from backend.metrics import add_readiness_check
+from backend.database import (
+    EdgeDatabase, NodeDatabase, ProjectGraph, add_change_listener, remove_change_listener,
+    silent_changes, transaction, use_graph
+)
+
+# 客户端项目和可视区域的变化所在的频道
+CLIENTS_CHANNEL = "clients"
+
+# 默认图在总线上的键，项目图使用项目ID
+DEFAULT_GRAPH = ""
+
+# 等待代理回复图副本的超时时间（秒）
+SNAPSHOT_TIMEOUT = 30
+
+class GraphReplicator:
+    """在本进程的图和消息总线之间同步修改"""
+
+    def __init__(self, client: BusClient, workspace=None):
+        self.client = client
+        self.workspace = workspace
+        self.origin = f"{os.getpid()}:{id(self):x}"
+        self._lock = threading.Lock()
+        # 应用其他进程的修改时持有，之后才取得图锁
+        self._apply_lock = threading.RLock()
+        # 已安装的图：键 -> 项目图，默认图为None
+        self._graphs: Dict[str, Optional[ProjectGraph]] = {}
+        # 已收到副本但尚未安装的图在此期间收到的修改
+        self._pending: Dict[str, List[Dict[str, Any]]] = {}
+        self._waiters: Dict[str, "queue.Queue[Dict[str, Any]]"] = {}
+        # 本进程已发布但尚未收到回显的修改数量
+        self._inflight: Dict[str, int] = {}
+        # 有未回显的修改时收到了其他进程修改的图
+        self._stale: Set[str] = set()
+
+    def start(self) -> "GraphReplicator":
+        self.client.subscribe(GRAPH_CHANNEL, self._handle)
+        add_change_listener(self._changed)
+        if self.workspace is not None:
+            self.workspace.remote = self
+        return self
+
+    def stop(self) -> None:
+        remove_change_listener(self._changed)
+        if self.workspace is not None and self.workspace.remote is self:
+            self.workspace.remote = None
+
+    def load(self, key: str, read_local: Callable[[], Tuple[List[Dict], List[Dict]]]) -> Tuple[List[Dict], List[Dict]]:
+        """取得图的最新数据：优先使用代理的共享副本，代理没有时读取本地数据作为种子
+
+        返回后到install之前收到的修改会被缓存，安装时再应用。
+        """
+        data = self._request_snapshot(key)
+        if data["nodes"] is None:
+            nodes, edges = read_local()
+            self.client.publish(GRAPH_CHANNEL, {"type": "seed", "graph": key, "nodes": nodes, "edges": edges})
+            # 其他进程可能先提交了种子，以代理采用的为准
+            data = self._request_snapshot(key)
+        return data["nodes"], data["edges"]
+
+    def _request_snapshot(self, key: str) -> Dict[str, Any]:
+        waiter: "queue.Queue[Dict[str, Any]]" = queue.Queue(maxsize=1)
+        with self._lock:
+            self._waiters[key] = waiter
+        self.client.request_snapshot(key)
+        try:
+            return waiter.get(timeout=SNAPSHOT_TIMEOUT)
+        except queue.Empty:
+            raise RuntimeError(f"等待图 {key!r} 的共享副本超时")
+        finally:
+            with self._lock:
+                if self._waiters.get(key) is waiter:
+                    del self._waiters[key]
+
+    def install(self, key: str, graph: Optional[ProjectGraph]) -> None:
+        """开始同步已载入的图，并应用load之后缓存的修改"""
+        with self._apply_lock:
+            with self._lock:
+                buffered = self._pending.pop(key, [])
+                self._graphs[key] = graph
+            for message in buffered:
+                self._apply(graph, message)
+
+    def uninstall(self, key: str) -> None:
+        """停止同步已卸载的图，并通知代理本进程不再持有它"""
+        with self._lock:
+            self._graphs.pop(key, None)
+            self._pending.pop(key, None)
+            self._inflight.pop(key, None)
+            self._stale.discard(key)
+        if self.client.connected:
+            try:
+                self.client.release(key)
+            except OSError:
+                # 与代理的连接已断开，代理会释放该连接的全部持有
+                pass
+
+    def sync_default_graph(self) -> None:
+        """启动时用代理的共享副本替换默认图，代理没有时以本进程的默认图作为种子"""
+        def read_local():
+            return NodeDatabase().get_all(), EdgeDatabase().get_all()
+
+        nodes, edges = self.load(DEFAULT_GRAPH, read_local)
+        with self._apply_lock, silent_changes(), transaction() as (node_db, edge_db):
+            node_db.replace_all(nodes)
+            edge_db.replace_all(edges)
+        self.install(DEFAULT_GRAPH, None)
+
+    def _key_for(self, store) -> Optional[str]:
+        """store所属的已安装图的键，未安装时返回None"""
+        project_id = store.project_id
+        key = DEFAULT_GRAPH if project_id is None else project_id
+        if key not in self._graphs:
+            return None
+        graph = self._graphs[key]
+        if graph is None:
+            return key if project_id is None else None
+        return key if store is graph.nodes or store is graph.edges else None
+
+    def _changed(self, store, changed: Optional[List[str]]) -> None:
+        """修改监听函数：在图写锁内按提交顺序发布本进程的修改"""
+        with self._lock:
+            key = self._key_for(store)
+            if key is None:
+                return
+            self._inflight[key] = self._inflight.get(key, 0) + 1
+        table = store.snapshot()
+        kind = "nodes" if isinstance(store, NodeDatabase) else "edges"
+        if changed is None:
+            items, deleted = table.dicts(), []
+        else:
+            items, deleted = [], []
+            for item_id in changed:
+                record = table.get(item_id)
+                if record is None:
+                    deleted.append(item_id)
+                else:
+                    items.append(table.to_dict(record))
+        self.client.publish(GRAPH_CHANNEL, {
+            "type": "change", "graph": key, "kind": kind, "origin": self.origin,
+            "items": items, "deleted": deleted, "replace": changed is None,
+        })
+
+    def _handle(self, message: Dict[str, Any]) -> None:
+        """graph频道的消息，在总线分发线程中按全局顺序处理"""
+        key = message["graph"]
+        with self._lock:
+            if message["type"] == "snapshot":
+                waiter = self._waiters.get(key)
+                if waiter is not None:
+                    if message["nodes"] is not None:
+                        self._pending[key] = []
+                    waiter.put(message)
+                return
+            if message["type"] != "change":
+                return
+            if key in self._pending:
+                self._pending[key].append(message)
+                return
+            if key not in self._graphs:
+                return
+            graph = self._graphs[key]
+        self._apply(graph, message)
+
+    def _apply(self, graph: Optional[ProjectGraph], message: Dict[str, Any]) -> None:
+        with self._apply_lock, (use_graph(graph) if graph is not None else nullcontext()):
+            with silent_changes(), transaction() as (node_db, edge_db):
+                # 在图写锁内判断：此时本进程已提交的修改都已计入_inflight
+                if not self._should_apply(message):
+                    return
+                store = node_db if message["kind"] == "nodes" else edge_db
+                store.apply_changes(message["items"], message["deleted"], replace=message["replace"])
+
+    def _should_apply(self, message: Dict[str, Any]) -> bool:
+        key = message["graph"]
+        with self._lock:
+            inflight = self._inflight.get(key, 0)
+            if message["origin"] != self.origin:
+                if inflight:
+                    self._stale.add(key)
+                return True
+            # 本进程修改的回显：只在其间应用过其他进程的修改时重新应用
+            self._inflight[key] = max(inflight - 1, 0)
+            reapply = key in self._stale
+            if not self._inflight[key]:
+                self._stale.discard(key)
+            return reapply
+
+
+def _sync_clients(client: BusClient, origin: str):
+    """把本进程的客户端状态变化发布到总线，并应用其他进程的变化"""
+    def publish(change: Dict[str, Any]) -> None:
+        client.publish(CLIENTS_CHANNEL, {**change, "origin": origin})
+
+    def receive(change: Dict[str, Any]) -> None:
+        if change.pop("origin", None) != origin:
+            extensions.apply_client_change(change)
+
+    client.subscribe(CLIENTS_CHANNEL, receive)
+    extensions.client_sync = publish
+
+
+def join(bus_path: str) -> BusClientManager:
+    """连接到消息总线并开始同步，返回供Socket.IO使用的客户端管理器"""
+    from backend.workspace import workspace
+
+    client = BusClient(bus_path)
+    replicator = GraphReplicator(client, workspace).start()
+    _sync_clients(client, replicator.origin)
+    manager = BusClientManager(client)
+    client.start()
+    replicator.sync_default_graph()
+    # 与代理断开后无法同步修改和广播，不再接收新流量
+    add_readiness_check("bus", lambda: client.connected)
+    return manager
@@ -0,0 +1,175 @@
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from backend.persistent import PersistentVector, SlotIndex, SnapshotTable
+
+Point = Tuple[float, float]
+
+# 坐标列每块的槽位数（2^12）
+_CHUNK_BITS = 12
+_CHUNK = 1 << _CHUNK_BITS
+_CHUNK_MASK = _CHUNK - 1
+
+
+def _full_chunk(chunk: Optional[np.ndarray] = None) -> np.ndarray:
+    """返回补满NaN的整块副本"""
+    full = np.full((_CHUNK, 2), np.nan)
+    if chunk is not None:
+        full[:len(chunk)] = chunk
+    return full
+
+
+class PositionColumn:
+    """按槽位保存节点坐标的列：分块的 float64 (n, 2) 数组，没有坐标的槽位为NaN
+
+    与快照表一样不可变：单点修改只复制所在的块，批量修改整体生成新数组，
+    旧版本的快照不受影响。
+    """
+
+    __slots__ = ("_chunks", "_length")
+
+    def __init__(self, chunks: Tuple[np.ndarray, ...] = (), length: int = 0):
+        self._chunks = chunks
+        self._length = length
+
+    @classmethod
+    def from_array(cls, coords: np.ndarray) -> "PositionColumn":
+        """由 (n, 2) 数组构建，之后不得再修改该数组"""
+        chunks = tuple(coords[start:start + _CHUNK] for start in range(0, len(coords), _CHUNK))
+        return cls(chunks, len(coords))
+
+    @classmethod
+    def from_points(cls, points: List[Optional[Point]]) -> "PositionColumn":
+        """由坐标列表构建，None表示没有坐标"""
+        nan = (np.nan, np.nan)
+        coords = np.array([nan if point is None else point for point in points], dtype=np.float64)
+        return cls.from_array(coords.reshape(-1, 2))
+
+    def __len__(self) -> int:
+        return self._length
+
+    def get(self, slot: int) -> Optional[Point]:
+        """获取槽位上的坐标"""
+        if slot >= self._length:
+            return None
+        chunk = self._chunks[slot >> _CHUNK_BITS]
+        offset = slot & _CHUNK_MASK
+        if offset >= len(chunk):
+            return None
+        x, y = chunk[offset].tolist()
+        if x != x:
+            return None
+        return x, y
+
+    def set(self, slot: int, point: Optional[Point]) -> "PositionColumn":
+        """返回修改了一个槽位的新列，只复制该槽位所在的块"""
+        chunks = list(self._chunks)
+        index = slot >> _CHUNK_BITS
+        offset = slot & _CHUNK_MASK
+        # 只有最后一块可以不满，追加新块前先补满
+        while len(chunks) <= index:
+            if chunks and len(chunks[-1]) < _CHUNK:
+                chunks[-1] = _full_chunk(chunks[-1])
+            chunks.append(_full_chunk())
+        chunk = chunks[index]
+        chunk = chunk.copy() if offset < len(chunk) else _full_chunk(chunk)
+        chunk[offset] = (np.nan, np.nan) if point is None else point
+        chunks[index] = chunk
+        return PositionColumn(tuple(chunks), max(self._length, slot + 1))
+
+    def to_array(self) -> np.ndarray:
+        """返回全部坐标组成的新 (n, 2) 数组"""
+        if not self._chunks:
+            return np.full((0, 2), np.nan)
+        return np.concatenate(self._chunks)[:self._length]
+
+
+class NodeTable(SnapshotTable):
+    """带坐标列的节点快照表：NodeRecord 不保存坐标，坐标按槽位存放在 PositionColumn 中"""
+
+    __slots__ = ("positions",)
+
+    def __init__(
+        self,
+        slots: PersistentVector,
+        index: SlotIndex,
+        size: int,
+        version: int,
+        positions: Optional[PositionColumn] = None,
+    ):
+        super().__init__(slots, index, size, version)
+        self.positions = positions if positions is not None else PositionColumn()
+
+    @classmethod
+    def build(cls, items: Iterable[Tuple[Any, Optional[Point]]], version: int = 0) -> "NodeTable":
+        """由 (记录, 坐标) 序列构建，id重复时保留第一个"""
+        index = SlotIndex()
+        ordered: List[Any] = []
+        points: List[Optional[Point]] = []
+        for record, point in items:
+            if record.id not in index:
+                index[record.id] = len(ordered)
+                ordered.append(record)
+                points.append(point)
+        return cls(PersistentVector.from_list(ordered), index, len(ordered), version, PositionColumn.from_points(points))
+
+    def point(self, node_id: str) -> Optional[Point]:
+        """获取节点坐标"""
+        slot = self.slot_of(node_id)
+        return None if slot is None else self.positions.get(slot)
+
+    def records_with_points(self) -> Iterator[Tuple[Any, Optional[Point]]]:
+        """按顺序产出 (节点记录, 坐标)"""
+        coords = self.positions.to_array().tolist()
+        for slot, record in self.iter_slots():
+            x, y = coords[slot] if slot < len(coords) else (None, None)
+            yield record, (None if x is None or x != x else (x, y))
+
+    def points(self) -> Iterator[Tuple[str, Optional[Point]]]:
+        """按顺序产出 (节点ID, 坐标)"""
+        for record, point in self.records_with_points():
+            yield record.id, point
+
+    def to_dict(self, record: Any) -> Dict[str, Any]:
+        """将节点记录连同坐标转换为字典"""
+        return record.to_dict(self.point(record.id))
+
+    def iter_dicts(self) -> Iterator[Dict[str, Any]]:
+        for record, point in self.records_with_points():
+            yield record.to_dict(point)
+
+    def dicts(self) -> List[Dict[str, Any]]:
+        return list(self.iter_dicts())
+
+    def slots_for(self, node_ids: Iterable[str]) -> np.ndarray:
+        """获取一组节点的槽位数组，有节点不存在时抛出KeyError"""
+        slots = []
+        for node_id in node_ids:
+            slot = self.slot_of(node_id)
+            if slot is None:
+                raise KeyError(node_id)
+            slots.append(slot)
+        return np.array(slots, dtype=np.intp)
+
+    def put(self, item: Any, point: Optional[Point] = None) -> "NodeTable":
+        """返回加入或替换了节点记录及其坐标的新版本"""
+        slot, slots, size, index = self._place(item)
+        return self._succeeded_by(NodeTable(slots, index, size, self.version + 1, self.positions.set(slot, point)))
+
+    def remove(self, item_id: str) -> "NodeTable":
+        slot = self.slot_of(item_id)
+        if slot is None:
+            return self
+        table = self._succeeded_by(NodeTable(
+            self._slots.set(slot, None), self._index, self._size - 1, self.version + 1,
+            self.positions.set(slot, None)
+        ))
+        return table.compact() if table._sparse() else table
+
+    def compact(self) -> "NodeTable":
+        return NodeTable.build(self.records_with_points(), self.version)
+
+    def with_positions(self, positions: PositionColumn) -> "NodeTable":
+        """返回替换了整个坐标列的新版本"""
+        return self._succeeded_by(NodeTable(self._slots, self._index, self._size, self.version + 1, positions))
@@ -6,6 +6,7 @@ PORT = 5000
 
 # API配置
 API_PREFIX = "/api"
+MAX_PAGE_SIZE = 1000  # 分页查询单页最大条数
 
 # OpenAI配置
 OPENAI_BASE_URL = "https://xiaohumini.site/v1"
@@ -18,3 +19,52 @@ STATIC_URL_PATH = "/"
 
 # Socket.IO配置
 SOCKETIO_CORS = "*"
+
+# 生产模式配置（python -m backend.server --prod）
+PROD_HOST = "0.0.0.0"
+PROD_ASYNC_MODES = ("gevent", "eventlet")  # 按顺序选用第一个已安装的异步服务器
+PROD_MAX_CONNECTIONS = 4096  # 同时处理的连接（协程）数量上限，包括WebSocket长连接
+PROD_LISTEN_BACKLOG = 1024  # 多进程模式每个工作进程监听socket的等待队列长度
+BUS_OUTBOX_SIZE = 10000  # 多进程模式消息总线代理向每个工作进程待发送的消息上限，超出时断开该进程
+
+# 项目导入导出配置
+PROJECT_IO_CHUNK_SIZE = 64 * 1024  # 流式读写的块大小（字节）
+
+# 响应压缩配置
+COMPRESSION_MIN_SIZE = 1024  # 小于该字节数的响应不压缩
+COMPRESSION_LEVEL = 6
+
+# 自动布局配置
+LAYOUT_LAYER_SPACING = 250  # 相邻两层之间的距离
+LAYOUT_NODE_SPACING = 150  # 同一层内相邻节点之间的距离
+LAYOUT_SWEEPS = 8  # 重心法减少交叉的迭代轮数
+
+# 图查询配置
+REACHABILITY_CACHE_SIZE = 1024  # 缓存的祖先/后代查询结果数量
+
+# 指标配置（/metrics）
+METRICS_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)  # 请求耗时分桶（秒）
+METRICS_SLOW_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)  # 文本生成和工作流耗时分桶（秒）
+READINESS_LOCK_TIMEOUT = 0.5  # 就绪检查等待默认图读锁的最长时间（秒），超时视为未就绪
+
+# 追踪配置（/api/workflow/runs/<id>/trace）
+TRACE_HISTORY = 50  # 每个进程保留的最近运行的追踪记录数量
+
+# 日志配置
+LOG_LEVEL = os.getenv("STORY_FACTORY_LOG_LEVEL", "INFO")
+LOG_QUEUE_SIZE = 10000  # 等待后台线程写出的日志记录上限，超出时丢弃
+LOG_SAMPLE_EVERY = {  # 高频事件每N次记录一次
+    "socketio.node_move": 100,
+    "socketio.viewport_subscribe": 20,
+}
+
+# 性能分析配置
+ADMIN_TOKEN = os.getenv("STORY_FACTORY_ADMIN_TOKEN")  # 管理接口（/admin/*）的访问令牌，未设置时管理接口不可用
+PROFILE_MAX_SECONDS = 60  # 采样分析的最长时间（秒）
+PROFILE_DEFAULT_INTERVAL_MS = 10  # 默认采样间隔（毫秒）
+PROFILE_TOP_FUNCTIONS = 30  # ?profile=1 返回的函数数量
+
+# 多项目配置
+PROJECTS_DIR = os.getenv("STORY_FACTORY_PROJECTS_DIR", os.path.join(os.path.dirname(__file__), "..", "projects"))
+WORKSPACE_MEMORY_BUDGET = 512 * 1024 * 1024  # 同时驻留内存的项目图的估算总大小上限（字节）
+WORKSPACE_ITEM_BYTES = 800  # 估算内存时每个节点或边占用的字节数
@@ -1,118 +1,584 @@
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, Iterable, List, Any, NamedTuple, Optional, Tuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+import functools
 import threading
-from backend.models import initial_nodes, initial_edges
+import uuid
+import numpy as np
+from backend.columns import NodeTable, PositionColumn
+from backend.locks import ReadWriteLock
+from backend.models import NodeRecord, EdgeRecord, node_point, initial_nodes, initial_edges
+from backend.persistent import SnapshotTable
+from backend.spatial import GridIndex, normalize_bbox
+from backend.topology import TopologyIndex
+
+# 默认图的节点和边共用的读写锁：写操作独占，批量修改在写锁内原子执行；
+# 快照读取只需取得当前版本的引用，不需要加锁。每个项目的图各有一把锁
+graph_lock = ReadWriteLock()
+
+# 已提交修改的监听函数 listener(store, changed)，changed为修改过（含删除）的ID列表，
+# 整体替换时为None。多进程模式用它把修改同步给其他进程
+_change_listeners: List[Callable[["_SnapshotStore", Optional[List[str]]], None]] = []
+
+# 为True时修改不通知监听函数：载入数据，以及应用其他进程同步来的修改
+_silent: ContextVar[bool] = ContextVar("silent_changes", default=False)
+
+
+def add_change_listener(listener: Callable[["_SnapshotStore", Optional[List[str]]], None]) -> None:
+    """注册已提交修改的监听函数，监听函数在图写锁内按提交顺序调用"""
+    _change_listeners.append(listener)
+
+
+def remove_change_listener(listener: Callable[["_SnapshotStore", Optional[List[str]]], None]) -> None:
+    if listener in _change_listeners:
+        _change_listeners.remove(listener)
+
+
+@contextmanager
+def silent_changes():
+    """在该上下文内的修改不通知监听函数"""
+    token = _silent.set(True)
+    try:
+        yield
+    finally:
+        _silent.reset(token)
+
+
+def _reads(method):
+    """在图读锁内执行查询方法"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._graph_lock.read():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+def _writes(method):
+    """在图写锁内执行修改方法"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._graph_lock.write():
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+class GraphSnapshot(NamedTuple):
+    """节点和边在同一时间点的不可变快照，元素为 NodeRecord / EdgeRecord"""
+    nodes: NodeTable
+    edges: SnapshotTable
+
+
+class _SnapshotStore:
+    """快照存储：数据保存为不可变的 SnapshotTable，每次修改发布一个共享结构的新版本
+    
+    读取方直接取得当前版本的引用，既不加锁也不阻塞写入。事务中的修改写入待提交版本，
+    只有持有写锁的事务线程可见，提交时整体发布，回滚时直接丢弃。
+    存储内部保存紧凑的记录对象，对外的 get_* 方法返回新生成的字典。
+    """
+    
+    _record = None
+    _graph_lock = graph_lock
+    _project_id: Optional[str] = None
+    _table: SnapshotTable
+    _pending: Optional[SnapshotTable] = None
+    # 载入编号，与版本号一起区分数据：项目图卸载后重新载入时版本号从头计数，
+    # 每次载入使用新的编号；默认图在进程内只创建一次，使用类上的编号
+    generation: str = uuid.uuid4().hex[:8]
+    # 事务内待通知的修改，每项为修改的ID列表，整体替换时为None
+    _journal: Optional[List[Optional[List[str]]]] = None
+    
+    @classmethod
+    def _create(cls, project_id: str, lock: ReadWriteLock, items: Iterable[Dict[str, Any]]):
+        """创建使用lock的独立存储（项目的图），不经过单例"""
+        store = object.__new__(cls)
+        store._graph_lock = lock
+        store._project_id = project_id
+        store.generation = uuid.uuid4().hex[:8]
+        store._init_store()
+        with lock.write(), silent_changes():
+            store._load(items)
+        return store
+    
+    def _init_store(self) -> None:
+        self._table = SnapshotTable.build([])
+    
+    def _view(self) -> SnapshotTable:
+        pending = self._pending
+        if pending is not None and self._graph_lock.is_write_held():
+            return pending
+        return self._table
+    
+    @property
+    def project_id(self) -> Optional[str]:
+        """所属项目的ID，默认图为None"""
+        return self._project_id
+    
+    def _publish(self, table: SnapshotTable, changed: Optional[List[str]]) -> None:
+        """发布新版本，changed为修改的ID列表，整体替换时为None"""
+        if not _change_listeners or _silent.get():
+            changed = []
+        if self._pending is not None:
+            self._pending = table
+            if changed != []:
+                self._journal = (self._journal or []) + [changed]
+        else:
+            self._table = table
+            if changed != []:
+                self._notify(changed)
+    
+    def _notify(self, changed: Optional[List[str]]) -> None:
+        for listener in list(_change_listeners):
+            listener(self, changed)
+    
+    def _load(self, items: List[Dict[str, Any]]) -> None:
+        records = (self._record.from_dict(item) for item in items)
+        self._publish(SnapshotTable.build(records, self._view().version + 1), None)
+    
+    def _put(self, record) -> Dict[str, Any]:
+        self._publish(self._view().put(record), [record.id])
+        return record.to_dict()
+    
+    def _upsert(self, item: Dict[str, Any]) -> None:
+        self._put(self._record.from_dict(item))
+    
+    def snapshot(self) -> SnapshotTable:
+        """获取当前数据的不可变快照（记录对象）"""
+        return self._view()
+    
+    @property
+    def version(self) -> int:
+        """数据版本号，每次修改后递增"""
+        return self._view().version
+    
+    @property
+    def in_transaction(self) -> bool:
+        return self._pending is not None
+    
+    def begin(self) -> None:
+        """开始事务"""
+        self._pending = self._table
+    
+    def commit(self) -> None:
+        """提交事务，发布待提交版本"""
+        if self._pending is not None:
+            self._table, self._pending = self._pending, None
+            journal, self._journal = self._journal, None
+            if journal:
+                if None in journal:
+                    self._notify(None)
+                else:
+                    self._notify(list(dict.fromkeys(item_id for changed in journal for item_id in changed)))
+    
+    def rollback(self) -> None:
+        """回滚事务，丢弃待提交版本"""
+        self._pending = None
+        self._journal = None
+    
+    @_writes
+    def replace_all(self, items: List[Dict[str, Any]]) -> None:
+        """批量载入数据，替换现有的全部数据"""
+        self._load(items)
+    
+    def get_all(self) -> List[Dict[str, Any]]:
+        """获取全部数据"""
+        return self._view().dicts()
+    
+    def get_by_id(self, item_id: str) -> Optional[Dict[str, Any]]:
+        """根据ID获取数据"""
+        table = self._view()
+        record = table.get(item_id)
+        return None if record is None else table.to_dict(record)
+    
+    @_writes
+    def delete(self, item_id: str) -> bool:
+        """根据ID删除数据"""
+        table = self._view()
+        updated = table.remove(item_id)
+        if updated is table:
+            return False
+        self._publish(updated, [item_id])
+        return True
+    
+    @_writes
+    def apply_changes(self, items: List[Dict[str, Any]], deleted: List[str], replace: bool = False) -> None:
+        """应用其他进程同步来的修改：items为修改后的完整数据，deleted为被删除的ID；
+        replace为True时items为全部数据"""
+        if replace:
+            self._load(items)
+            return
+        for item in items:
+            self._upsert(item)
+        for item_id in deleted:
+            self.delete(item_id)
+
 
 # 使用内存数据库模式，后续可以扩展为持久化存储
-class NodeDatabase:
+class NodeDatabase(_SnapshotStore):
+    _record = NodeRecord
     _instance = None
     _lock = threading.Lock()
     
     def __new__(cls):
+        graph = _current_graph.get()
+        if graph is not None:
+            return graph.nodes
         with cls._lock:
             if cls._instance is None:
-                cls._instance = super().__new__(cls)
-                cls._instance._nodes = initial_nodes
+                instance = super().__new__(cls)
+                instance._init_store()
+                with silent_changes():
+                    instance._nodes = initial_nodes
+                cls._instance = instance
             return cls._instance
     
-    def get_all(self) -> List[Dict[str, Any]]:
-        """获取所有节点"""
-        return self._nodes
+    def _init_store(self) -> None:
+        self._spatial = GridIndex()
+        self._table = NodeTable.build([])
     
-    def get_by_id(self, node_id: str) -> Optional[Dict[str, Any]]:
-        """根据ID获取节点"""
-        return next((node for node in self._nodes if node["id"] == node_id), None)
+    @property
+    def _nodes(self) -> List[Dict[str, Any]]:
+        return self.get_all()
     
+    @_nodes.setter
+    def _nodes(self, nodes: List[Dict[str, Any]]) -> None:
+        """整体替换节点，同时重建空间索引"""
+        with self._graph_lock.write():
+            self._load(nodes)
+    
+    def snapshot(self) -> NodeTable:
+        """获取当前节点的不可变快照（节点记录和坐标列）"""
+        return self._view()
+    
+    def _load(self, items: Iterable[Dict[str, Any]]) -> None:
+        nodes = ((NodeRecord.from_dict(node), node_point(node)) for node in items)
+        self._publish(NodeTable.build(nodes, self._view().version + 1), None)
+        self._rebuild_spatial()
+    
+    def _rebuild_spatial(self) -> None:
+        self._spatial.rebuild(self._view().points())
+    
+    def rollback(self) -> None:
+        """回滚事务，并按已发布的版本重建空间索引"""
+        if self.in_transaction:
+            super().rollback()
+            self._rebuild_spatial()
+    
+    def _put(self, record: NodeRecord, point: Optional[Tuple[float, float]] = None) -> Dict[str, Any]:
+        self._publish(self._view().put(record, point), [record.id])
+        self._spatial.insert(record.id, point)
+        return record.to_dict(point)
+    
+    def _upsert(self, item: Dict[str, Any]) -> None:
+        self._put(NodeRecord.from_dict(item), node_point(item))
+    
+    @_reads
+    def query_bbox(self, x1: float, y1: float, x2: float, y2: float) -> Tuple[NodeTable, List[NodeRecord]]:
+        """获取当前快照及其中位于矩形范围内的节点记录（按ID排序）"""
+        table = self._view()
+        node_ids = sorted(self._spatial.query(normalize_bbox(x1, y1, x2, y2)))
+        return table, [record for record in map(table.get, node_ids) if record is not None]
+    
+    def get_in_bbox(self, x1: float, y1: float, x2: float, y2: float) -> List[Dict[str, Any]]:
+        """获取位于矩形范围内的节点，按ID排序"""
+        table, records = self.query_bbox(x1, y1, x2, y2)
+        return [table.to_dict(record) for record in records]
+    
+    @_writes
     def add(self, node: Dict[str, Any]) -> Dict[str, Any]:
         """添加节点"""
-        self._nodes.append(node)
-        return node
+        return self._put(NodeRecord.from_dict(node), node_point(node))
     
+    @_writes
     def update(self, node_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """更新节点"""
-        for i, node in enumerate(self._nodes):
-            if node["id"] == node_id:
-                for key, value in data.items():
-                    self._nodes[i][key] = value
-                return self._nodes[i]
-        return None
+        table = self._view()
+        record = table.get(node_id)
+        if record is None:
+            return None
+        node = {**table.to_dict(record), **data}
+        return self._put(NodeRecord.from_dict(node), node_point(node))
     
+    @_writes
     def update_text(self, node_id: str, text: str) -> Optional[Dict[str, Any]]:
         """更新节点文本内容"""
-        for i, node in enumerate(self._nodes):
-            if node["id"] == node_id:
-                self._nodes[i]["data"]["text"] = text
-                return self._nodes[i]
-        return None
+        table = self._view()
+        record = table.get(node_id)
+        if record is None:
+            return None
+        return self._put(record.replace(data={**record.data, "text": text}), table.point(node_id))
     
     def update_position(self, node_id: str, x: float, y: float) -> Optional[Dict[str, Any]]:
         """更新节点位置"""
-        for i, node in enumerate(self._nodes):
-            if node["id"] == node_id:
-                self._nodes[i]["position"] = {"x": x, "y": y}
-                return self._nodes[i]
-        return None
+        return self.update(node_id, {"position": {"x": x, "y": y}})
     
+    @_writes
     def update_status(self, node_id: str, status: str) -> Optional[Dict[str, Any]]:
         """更新节点状态"""
-        for i, node in enumerate(self._nodes):
-            if node["id"] == node_id:
-                self._nodes[i]["data"]["status"] = status
-                return self._nodes[i]
-        return None
+        table = self._view()
+        record = table.get(node_id)
+        if record is None:
+            return None
+        return self._put(record.replace(data={**record.data, "status": status}), table.point(node_id))
+    
+    @_writes
+    def transform_positions(
+        self,
+        node_ids: Optional[List[str]],
+        transform: Callable[[np.ndarray], np.ndarray]
+    ) -> List[str]:
+        """对一组节点（为None时为全部有坐标的节点）的坐标做一次向量化变换
+    
+        transform 接收 (k, 2) 的坐标数组并返回同形状的新坐标，NaN表示没有坐标；
+        有节点不存在时抛出KeyError。返回被修改的节点ID列表。
+        """
+        table = self._view()
+        coords = table.positions.to_array()
+        if node_ids is None:
+            slots = np.flatnonzero(~np.isnan(coords[:, 0]))
+        else:
+            slots = table.slots_for(node_ids)
+        if not len(slots):
+            return []
+        moved = np.asarray(transform(coords[slots]), dtype=np.float64).reshape(len(slots), 2)
+        # 非有限值视为没有坐标
+        moved[~np.isfinite(moved).all(axis=1)] = np.nan
+        updated = coords.copy()
+        updated[slots] = moved
+        table = table.with_positions(PositionColumn.from_array(updated))
     
+        # 之前坐标无法识别、现在获得坐标的节点需要去掉保留的原始坐标
+        for slot in slots[np.isnan(coords[slots, 0]) & ~np.isnan(moved[:, 0])].tolist():
+            record = table.item_at(slot)
+            table = table.put(record.without_position(), table.positions.get(slot))
+        changed_ids = [table.item_at(slot).id for slot in slots.tolist()]
+        self._publish(table, changed_ids)
+    
+        for node_id, (x, y) in zip(changed_ids, moved.tolist()):
+            self._spatial.insert(node_id, None if x != x else (x, y))
+        return changed_ids
+    
+    @_writes
     def delete(self, node_id: str) -> bool:
         """删除节点"""
-        initial_length = len(self._nodes)
-        self._nodes = [node for node in self._nodes if node["id"] != node_id]
-        return len(self._nodes) < initial_length
+        if not super().delete(node_id):
+            return False
+        self._spatial.remove(node_id)
+        return True
+    
+    @_writes
+    def delete_many(self, node_ids: Iterable[str]) -> List[str]:
+        """删除一组节点并只发布一个新版本，返回实际删除的节点ID"""
+        table = self._view()
+        deleted = []
+        for node_id in node_ids:
+            updated = table.remove(node_id)
+            if updated is not table:
+                table = updated
+                self._spatial.remove(node_id)
+                deleted.append(node_id)
+        if deleted:
+            self._publish(table, deleted)
+        return deleted
 
 
-class EdgeDatabase:
+class EdgeDatabase(_SnapshotStore):
+    _record = EdgeRecord
     _instance = None
     _lock = threading.Lock()
     
     def __new__(cls):
+        graph = _current_graph.get()
+        if graph is not None:
+            return graph.edges
         with cls._lock:
             if cls._instance is None:
-                cls._instance = super().__new__(cls)
-                cls._instance._edges = initial_edges
+                instance = super().__new__(cls)
+                instance._init_store()
+                with silent_changes():
+                    instance._edges = initial_edges
+                cls._instance = instance
             return cls._instance
     
-    def get_all(self) -> List[Dict[str, Any]]:
-        """获取所有边"""
-        return self._edges
+    def _init_store(self) -> None:
+        self._topology = TopologyIndex()
+        self._table = SnapshotTable.build([])
+    
+    @property
+    def _edges(self) -> List[Dict[str, Any]]:
+        return self.get_all()
+    
+    @_edges.setter
+    def _edges(self, edges: List[Dict[str, Any]]) -> None:
+        """整体替换边"""
+        with self._graph_lock.write():
+            self._load(edges)
+    
+    def _load(self, items: List[Dict[str, Any]]) -> None:
+        # 载入的数据（如导入的项目）可能已经有环，按原样保留
+        super()._load(items)
+        self._rebuild_topology()
+    
+    def _rebuild_topology(self) -> None:
+        self._topology.rebuild((edge.id, edge.source, edge.target) for edge in self._view())
+    
+    def rollback(self) -> None:
+        """回滚事务，并按已发布的版本重建邻接索引"""
+        with self._graph_lock.write():
+            if self.in_transaction:
+                super().rollback()
+                self._rebuild_topology()
+    
+    @property
+    def acyclic(self) -> bool:
+        """当前的边是否没有环"""
+        with self._graph_lock.read():
+            return self._topology.acyclic
     
-    def get_by_id(self, edge_id: str) -> Optional[Dict[str, Any]]:
-        """根据ID获取边"""
-        return next((edge for edge in self._edges if edge["id"] == edge_id), None)
+    @_reads
+    def reachable(self, node_id: str, forward: bool = True) -> Dict[str, int]:
+        """通过邻接索引获取节点的后代（forward为False时为祖先）及最短距离，结果有缓存，不得修改"""
+        return self._topology.reachable(node_id, forward)
     
+    @_reads
+    def links(self, node_id: str, forward: bool = True) -> List[str]:
+        """通过邻接索引获取节点出边的终点（forward为False时为入边的起点），按边的添加顺序"""
+        return self._topology.links(node_id, forward)
+    
+    @_reads
+    def edges_between(self, node_ids: Iterable[str]) -> List[EdgeRecord]:
+        """通过邻接索引获取两端都在node_ids中的边"""
+        selected = set(node_ids)
+        table = self._view()
+        found: Dict[str, EdgeRecord] = {}
+        for node_id in selected:
+            for edge_id in self._topology.edges_of(node_id):
+                edge = table.get(edge_id)
+                if edge is not None and edge.source in selected and edge.target in selected:
+                    found[edge_id] = edge
+        return list(found.values())
+    
+    @_writes
     def add(self, edge: Dict[str, Any]) -> Dict[str, Any]:
-        """添加边"""
-        self._edges.append(edge)
-        return edge
+        """添加边，会形成环时抛出CycleError"""
+        record = EdgeRecord.from_dict(edge)
+        self._topology.add(record.id, record.source, record.target)
+        return self._put(record)
+    
+    def _upsert(self, item: Dict[str, Any]) -> None:
+        # 其他进程已经检查过环；并发的修改仍可能合成环，按原样保留
+        record = EdgeRecord.from_dict(item)
+        self._topology.add(record.id, record.source, record.target, allow_cycle=True)
+        self._put(record)
     
+    @_writes
     def update(self, edge_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """更新边"""
-        for i, edge in enumerate(self._edges):
-            if edge["id"] == edge_id:
-                self._edges[i].update(data)
-                return self._edges[i]
-        return None
+        """更新边，修改端点后会形成环时抛出CycleError"""
+        record = self._view().get(edge_id)
+        if record is None:
+            return None
+        record = EdgeRecord.from_dict({**record.to_dict(), **data})
+        self._topology.add(record.id, record.source, record.target)
+        return self._put(record)
     
+    @_writes
     def delete(self, edge_id: str) -> bool:
         """删除边"""
-        initial_length = len(self._edges)
-        self._edges = [edge for edge in self._edges if edge["id"] != edge_id]
-        return len(self._edges) < initial_length
+        if not super().delete(edge_id):
+            return False
+        self._topology.remove(edge_id)
+        return True
     
+    @_writes
     def delete_related_to_node(self, node_id: str) -> bool:
         """删除与节点相关的所有边"""
-        initial_length = len(self._edges)
-        self._edges = [
-            edge for edge in self._edges 
-            if edge["source"] != node_id and edge["target"] != node_id
-        ]
-        return len(self._edges) < initial_length
+        return bool(self.delete_related_to_nodes([node_id]))
+    
+    @_writes
+    def delete_related_to_nodes(self, node_ids: Iterable[str]) -> List[str]:
+        """通过邻接索引删除与一组节点相连的全部边，不扫描整个边表，返回被删除的边ID"""
+        table = self._view()
+        deleted = []
+        for node_id in node_ids:
+            for edge_id in self._topology.edges_of(node_id):
+                self._topology.remove(edge_id)
+                table = table.remove(edge_id)
+                deleted.append(edge_id)
+        if deleted:
+            self._publish(table, deleted)
+        return deleted
+
+
+class ProjectGraph:
+    """一个项目的节点和边存储，两者共用一把读写锁"""
+    
+    def __init__(self, project_id: str, nodes: Iterable[Dict[str, Any]] = (), edges: Iterable[Dict[str, Any]] = ()):
+        self.project_id = project_id
+        self.lock = ReadWriteLock()
+        self.nodes = NodeDatabase._create(project_id, self.lock, nodes)
+        self.edges = EdgeDatabase._create(project_id, self.lock, edges)
+    
+    @property
+    def version(self) -> Tuple[int, int]:
+        """节点和边的版本号，任一修改后都会变化"""
+        return self.nodes.version, self.edges.version
+    
+    def __len__(self) -> int:
+        return len(self.nodes.snapshot()) + len(self.edges.snapshot())
+
+
+# 当前上下文（请求、Socket.IO事件）使用的项目图，为None时使用默认图
+_current_graph: ContextVar[Optional[ProjectGraph]] = ContextVar("current_graph", default=None)
+
+
+def current_graph() -> Optional[ProjectGraph]:
+    """当前上下文使用的项目图，默认图返回None"""
+    return _current_graph.get()
+
+
+@contextmanager
+def use_graph(graph: ProjectGraph):
+    """在该上下文内，NodeDatabase()、EdgeDatabase()、graph_snapshot() 和 transaction() 都作用于graph"""
+    token = _current_graph.set(graph)
+    try:
+        yield graph
+    finally:
+        _current_graph.reset(token)
+
+
+def graph_snapshot() -> GraphSnapshot:
+    """获取节点和边一致的时间点快照，只在取引用时短暂持有读锁"""
+    node_db, edge_db = NodeDatabase(), EdgeDatabase()
+    with node_db._graph_lock.read():
+        return GraphSnapshot(node_db.snapshot(), edge_db.snapshot())
+
+
+def graph_available(timeout: float) -> bool:
+    """默认图的读锁能否在timeout秒内取得；写锁被长时间持有（导入、整体替换）时返回False而不阻塞"""
+    if not graph_lock.acquire_read(timeout):
+        return False
+    graph_lock.release_read()
+    return True
+
+
+@contextmanager
+def transaction():
+    """在图写锁内原子地执行一组节点和边的修改，发生异常时全部回滚"""
+    node_db, edge_db = NodeDatabase(), EdgeDatabase()
+    with node_db._graph_lock.write():
+        # 已处于事务中时并入外层事务
+        if node_db.in_transaction:
+            yield node_db, edge_db
+            return
+        node_db.begin()
+        edge_db.begin()
+        try:
+            yield node_db, edge_db
+        except BaseException:
+            node_db.rollback()
+            edge_db.rollback()
+            raise
+        node_db.commit()
+        edge_db.commit()
 
 
 # 为了向后兼容，提供这些函数获取数据
@@ -120,4 +586,4 @@ def get_all_nodes():
     return NodeDatabase().get_all()
 
 def get_all_edges():
-    return EdgeDatabase().get_all() 
\ No newline at end of file
+    return EdgeDatabase().get_all()
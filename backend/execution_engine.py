@@ -1,7 +1,10 @@
 from typing import Dict, List, Any, Optional, Tuple, cast
 from enum import Enum
 import time
+from backend.database import EdgeDatabase, GraphSnapshot, graph_snapshot
+from backend.persistent import SnapshotTable
 from backend.services import NodeService, EdgeService, GenerationService
+from backend.tracing import current_trace, run_trace, span
 
 class NodeStatus(Enum):
     """节点执行状态"""
@@ -26,11 +29,25 @@ class NodeExecutor:
             "default": self._execute_default_node,
         }
     
-    def execute_node(self, node_id: str, input_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
-        """执行单个节点"""
+    def execute_node(
+        self,
+        node_id: str,
+        input_data: Optional[Dict[str, Any]] = None,
+        snapshot: Optional[GraphSnapshot] = None
+    ) -> Dict[str, Any]:
+        """执行单个节点，指定snapshot时从快照读取节点数据"""
         if input_data is None:
             input_data = {}
             
+        with span("execute_node", "node", node_id=node_id):
+            return self._execute_node(node_id, input_data, snapshot)
+    
+    def _execute_node(
+        self,
+        node_id: str,
+        input_data: Dict[str, Any],
+        snapshot: Optional[GraphSnapshot]
+    ) -> Dict[str, Any]:
         result = {
             "node_id": node_id,
             "status": NodeStatus.PENDING.value,
@@ -43,28 +60,33 @@ class NodeExecutor:
         try:
             # 更新状态为运行中
             result["status"] = NodeStatus.RUNNING.value
-            self.node_service.update_node_status(node_id, NodeStatus.RUNNING.value)
+            self._update_status(node_id, NodeStatus.RUNNING)
             
             # 获取节点数据
-            node = self.node_service.get_node(node_id)
+            if snapshot is not None:
+                record = snapshot.nodes.get(node_id)
+                node = snapshot.nodes.to_dict(record) if record is not None else None
+            else:
+                node = self.node_service.get_node(node_id)
             if not node:
                 raise ValueError(f"节点 {node_id} 不存在")
             
             # 执行对应的节点类型
             node_type = node["type"]
             executor = self._executors.get(node_type, self._execute_default_node)
-            output = executor(node, input_data)
+            with span(f"executor:{node_type}", "executor", node_id=node_id):
+                output = executor(node, input_data)
             
             # 更新结果
             result["output"] = output
             result["status"] = NodeStatus.COMPLETED.value
-            self.node_service.update_node_status(node_id, NodeStatus.COMPLETED.value)
+            self._update_status(node_id, NodeStatus.COMPLETED)
             
         except Exception as e:
             # 处理执行错误
             result["status"] = NodeStatus.FAILED.value
             result["error"] = str(e)
-            self.node_service.update_node_status(node_id, NodeStatus.FAILED.value)
+            self._update_status(node_id, NodeStatus.FAILED)
             
         finally:
             # 记录结束时间
@@ -72,6 +94,10 @@ class NodeExecutor:
             
         return result
     
+    def _update_status(self, node_id: str, status: NodeStatus) -> None:
+        with span("status_update", "db", node_id=node_id, status=status.value):
+            self.node_service.update_node_status(node_id, status.value)
+    
     def _execute_text_node(self, node: Dict[str, Any], input_data: Dict[str, Any]) -> Dict[str, Any]:
         """执行文本节点"""
         text = ""
@@ -127,27 +153,50 @@ class DataFlowManager:
     def __init__(self):
         self.edge_service = EdgeService()
         self.node_service = NodeService()
+        # 最近一次使用的快照边表及由它建立的邻接表 (边表, 后继, 前驱)，同一次运行的各节点共用
+        self._adjacency: Optional[Tuple[SnapshotTable, Dict[str, List[str]], Dict[str, List[str]]]] = None
     
-    def get_node_inputs(self, node_id: str, executed_nodes: Dict[str, Any]) -> Dict[str, Any]:
+    def _snapshot_adjacency(self, snapshot: GraphSnapshot) -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
+        """快照中边的邻接表 (后继, 前驱)，每个边表只遍历一次"""
+        cached = self._adjacency
+        if cached is not None and cached[0] is snapshot.edges:
+            return cached[1], cached[2]
+        outgoing: Dict[str, List[str]] = {}
+        incoming: Dict[str, List[str]] = {}
+        for edge in snapshot.edges:
+            outgoing.setdefault(edge.source, []).append(edge.target)
+            incoming.setdefault(edge.target, []).append(edge.source)
+        self._adjacency = (snapshot.edges, outgoing, incoming)
+        return outgoing, incoming
+    
+    def _links(self, node_id: str, forward: bool, snapshot: Optional[GraphSnapshot]) -> List[str]:
+        """节点的后继（forward为False时为前驱），指定snapshot时使用快照中的边，否则使用边存储的邻接索引"""
+        if snapshot is not None:
+            outgoing, incoming = self._snapshot_adjacency(snapshot)
+            return (outgoing if forward else incoming).get(node_id, [])
+        return EdgeDatabase().links(node_id, forward)
+    
+    def get_node_inputs(
+        self,
+        node_id: str,
+        executed_nodes: Dict[str, Any],
+        snapshot: Optional[GraphSnapshot] = None
+    ) -> Dict[str, Any]:
         """获取节点的输入数据"""
-        edges = self.edge_service.get_all_edges()
-        
-        # 找到所有指向当前节点的边
-        input_edges = [edge for edge in edges if edge["target"] == node_id]
-        
-        inputs = {}
-        for edge in input_edges:
-            source_id = edge["source"]
-            if source_id in executed_nodes and "output" in executed_nodes[source_id]:
-                inputs[source_id] = executed_nodes[source_id]["output"]
-        
-        return self._merge_inputs(inputs)
+        with span("input_merge", "dataflow", node_id=node_id):
+            # 找到所有指向当前节点的边
+            input_sources = self._links(node_id, False, snapshot)
+            
+            inputs = {}
+            for source_id in input_sources:
+                if source_id in executed_nodes and "output" in executed_nodes[source_id]:
+                    inputs[source_id] = executed_nodes[source_id]["output"]
+            
+            return self._merge_inputs(inputs)
     
-    def get_next_nodes(self, node_id: str) -> List[str]:
+    def get_next_nodes(self, node_id: str, snapshot: Optional[GraphSnapshot] = None) -> List[str]:
         """获取下一个要执行的节点"""
-        edges = self.edge_service.get_all_edges()
-        output_edges = [edge for edge in edges if edge["source"] == node_id]
-        return [edge["target"] for edge in output_edges]
+        return list(self._links(node_id, True, snapshot))
     
     def _merge_inputs(self, inputs: Dict[str, Any]) -> Dict[str, Any]:
         """合并多个输入数据"""
@@ -188,17 +237,26 @@ class WorkflowEngine:
         self.is_running = True
         self.executed_nodes = {}
         
+        with run_trace("workflow", start_node_id=start_node_id) as trace:
+            result = self._execute_workflow(start_node_id)
+        result["run_id"] = trace.id
+        return result
+    
+    def _execute_workflow(self, start_node_id: Optional[str]) -> Dict[str, Any]:
         try:
+            # 整个执行过程基于开始时的图快照，执行期间的编辑不会影响本次运行
+            with span("graph_snapshot", "dataflow"):
+                snapshot = graph_snapshot()
+            
             # 如果没有指定开始节点，找到类型为start的节点
             if start_node_id is None:
-                nodes = self.node_service.get_all_nodes()
-                start_nodes = [node["id"] for node in nodes if node["type"] == "start"]
+                start_nodes = [node.id for node in snapshot.nodes if node.type == "start"]
                 if not start_nodes:
                     raise ValueError("没有找到开始节点")
                 start_node_id = start_nodes[0]
             
             # 从开始节点执行
-            self._execute_node_and_successors(cast(str, start_node_id))
+            self._execute_node_and_successors(cast(str, start_node_id), snapshot)
             
             # 返回执行结果
             return {
@@ -216,17 +274,27 @@ class WorkflowEngine:
         finally:
             self.is_running = False
     
-    def _execute_node_and_successors(self, node_id: str) -> None:
-        """执行节点及其后续节点"""
+    def _execute_node_and_successors(
+        self,
+        node_id: str,
+        snapshot: Optional[GraphSnapshot] = None,
+        queued_at: Optional[float] = None
+    ) -> None:
+        """执行节点及其后续节点，queued_at为节点成为待执行节点的时间（time.perf_counter）"""
         # 如果节点已执行，直接返回
         if node_id in self.executed_nodes:
             return
         
+        # 记录从前驱节点完成到开始执行本节点的等待，包括先执行的兄弟节点及其后续节点的时间
+        trace = current_trace()
+        if trace is not None and queued_at is not None:
+            trace.add("queue_wait", queued_at, trace.now(), "queue", {"node_id": node_id})
+        
         # 获取节点输入
-        inputs = self.data_flow_manager.get_node_inputs(node_id, self.executed_nodes)
+        inputs = self.data_flow_manager.get_node_inputs(node_id, self.executed_nodes, snapshot)
         
         # 执行节点
-        result = self.node_executor.execute_node(node_id, inputs)
+        result = self.node_executor.execute_node(node_id, inputs, snapshot)
         self.executed_nodes[node_id] = result
         
         # 如果执行失败，不继续执行后续节点
@@ -234,16 +302,20 @@ class WorkflowEngine:
             return
         
         # 获取后续节点并执行
-        next_nodes = self.data_flow_manager.get_next_nodes(node_id)
+        next_nodes = self.data_flow_manager.get_next_nodes(node_id, snapshot)
+        queued_at = time.perf_counter()
         for next_node_id in next_nodes:
-            self._execute_node_and_successors(next_node_id)
+            self._execute_node_and_successors(next_node_id, snapshot, queued_at)
     
     def execute_single_node(self, node_id: str, input_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """执行单个节点"""
         if input_data is None:
             input_data = {}
             
-        return self.node_executor.execute_node(node_id, input_data)
+        with run_trace("node", node_id=node_id) as trace:
+            result = self.node_executor.execute_node(node_id, input_data)
+        result["run_id"] = trace.id
+        return result
     
     def get_execution_status(self) -> Dict[str, Any]:
         """获取执行状态"""
@@ -1,3 +1,139 @@
+import functools
+import time
+from typing import Callable, Dict, List, Optional
+
+from flask import request
 from flask_socketio import SocketIO
 
-socketio = SocketIO()
+from backend.database import current_graph
+from backend.log import get_logger, log_event
+from backend.metrics import socketio_events
+from backend.spatial import BBox, Point, ViewportRegistry
+from backend.workspace import workspace
+
+logger = get_logger(__name__)
+
+
+class _InstrumentedSocketIO(SocketIO):
+    """按事件名统计收到的Socket.IO事件并记录事件日志，node_move等高频事件按 LOG_SAMPLE_EVERY 抽样"""
+
+    def _handle_event(self, handler, message, namespace, sid, *args):
+        socketio_events.inc(message)
+        started = time.perf_counter()
+        try:
+            result = super()._handle_event(handler, message, namespace, sid, *args)
+        except Exception:
+            logger.exception("Socket.IO事件处理出错", extra={"event": f"socketio.{message}", "sid": sid})
+            raise
+        log_event(logger, f"socketio.{message}", sid=sid,
+                  duration_ms=round((time.perf_counter() - started) * 1000, 3))
+        return result
+
+
+socketio = _InstrumentedSocketIO()
+
+# 未订阅可视区域的客户端所在房间，接收全部节点事件
+FULL_GRAPH_ROOM = "graph"
+
+# 客户端订阅的可视区域
+viewports = ViewportRegistry()
+
+# 加入了项目的客户端 sid -> 项目ID，未加入项目的客户端使用默认图
+client_projects: Dict[str, str] = {}
+
+# 多进程模式下由 backend.cluster 设置：把客户端项目和可视区域的变化同步给其他进程，
+# 使任一进程推送节点事件时都能找到连接在其他进程上的订阅者
+client_sync: Optional[Callable[[Dict], None]] = None
+
+
+def apply_client_change(change: Dict) -> None:
+    """应用客户端状态的变化 {"sid", "project"?, "bbox"?, "gone"?}，不再向外同步"""
+    sid = change["sid"]
+    if change.get("gone"):
+        viewports.unsubscribe(sid)
+        client_projects.pop(sid, None)
+        return
+    if "project" in change:
+        if change["project"] is None:
+            client_projects.pop(sid, None)
+        else:
+            client_projects[sid] = change["project"]
+    if "bbox" in change:
+        if change["bbox"] is None:
+            viewports.unsubscribe(sid)
+        else:
+            viewports.subscribe(sid, tuple(change["bbox"]))
+
+
+def _client_changed(change: Dict) -> None:
+    apply_client_change(change)
+    if client_sync is not None:
+        client_sync(change)
+
+
+def set_client_project(sid: str, project_id: Optional[str]) -> None:
+    """记录客户端使用的项目，None为默认图"""
+    _client_changed({"sid": sid, "project": project_id})
+
+
+def set_viewport(sid: str, bbox: Optional[BBox]) -> None:
+    """订阅（bbox为None时取消订阅）客户端的可视区域"""
+    _client_changed({"sid": sid, "bbox": None if bbox is None else list(bbox)})
+
+
+def forget_client(sid: str) -> None:
+    """客户端断开后清除其状态"""
+    _client_changed({"sid": sid, "gone": True})
+
+
+def current_project_id() -> Optional[str]:
+    """当前上下文使用的项目ID，默认图为None"""
+    graph = current_graph()
+    return None if graph is None else graph.project_id
+
+
+def project_room(project_id: Optional[str] = None) -> str:
+    """项目的全部客户端所在房间"""
+    return f"project:{project_id or ''}"
+
+
+def graph_room(project_id: Optional[str] = None) -> str:
+    """项目中未订阅可视区域的客户端所在房间"""
+    return f"{FULL_GRAPH_ROOM}:{project_id}" if project_id else FULL_GRAPH_ROOM
+
+
+def broadcast(event, payload, to_graph_room=False):
+    """向当前项目的客户端推送事件，to_graph_room为True时只推送给未订阅可视区域的客户端"""
+    project_id = current_project_id()
+    room = graph_room(project_id) if to_graph_room else project_room(project_id)
+    socketio.emit(event, payload, to=room)
+
+
+def viewport_subscribers(*points: Optional[Point]) -> List[str]:
+    """当前项目中可视区域包含任一给定坐标的客户端"""
+    project_id = current_project_id()
+    return [sid for sid in viewports.subscribers_for(*points) if client_projects.get(sid) == project_id]
+
+
+def emit_node_event(event, payload, *points, skip_sid=None):
+    """推送单个节点的事件
+
+    当前项目的全图客户端总能收到；订阅了可视区域的客户端仅在区域包含给定坐标
+    （例如移动前后的位置）时收到。
+    """
+    socketio.emit(event, payload, to=graph_room(current_project_id()), skip_sid=skip_sid)
+    for sid in viewport_subscribers(*points):
+        if sid != skip_sid:
+            socketio.emit(event, payload, to=sid)
+
+
+def project_scoped(handler):
+    """Socket.IO事件处理器装饰器：在发送者加入的项目图上执行"""
+    @functools.wraps(handler)
+    def wrapper(*args, **kwargs):
+        project_id = client_projects.get(request.sid)
+        if project_id is None:
+            return handler(*args, **kwargs)
+        with workspace.open(project_id):
+            return handler(*args, **kwargs)
+    return wrapper
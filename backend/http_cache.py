@@ -0,0 +1,145 @@
+import gzip
+import mimetypes
+import os
+import uuid
+from typing import Any, Callable
+
+from flask import Flask, Response, jsonify, request, send_from_directory
+
+try:
+    import brotli
+except ImportError:
+    # brotli为可选依赖，缺失时仅使用gzip
+    brotli = None
+
+from backend.config import COMPRESSION_LEVEL, COMPRESSION_MIN_SIZE
+from backend.metrics import cache_requests
+
+# 进程级别的随机前缀，避免服务重启后版本号重复导致错误的304
+_ETAG_EPOCH = uuid.uuid4().hex[:8]
+
+# 可压缩的响应类型
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/javascript",
+    "application/manifest+json",
+    "image/svg+xml",
+    "text/css",
+    "text/html",
+    "text/javascript",
+    "text/plain",
+}
+
+# 预压缩文件的扩展名，按优先级排列
+PRECOMPRESSED_EXTENSIONS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def supported_encodings():
+    """当前环境支持的压缩编码，按优先级排列"""
+    if brotli is not None:
+        return ["br", "gzip"]
+    return ["gzip"]
+
+
+def graph_etag(*parts: Any) -> str:
+    """根据图版本号等信息生成强ETag"""
+    return "-".join([_ETAG_EPOCH] + [str(part) for part in parts])
+
+
+def _etag_matches(etag: str) -> bool:
+    """判断客户端缓存的ETag是否仍然有效（包括压缩后的变体）"""
+    candidates = [etag] + [f"{etag}-{encoding}" for encoding in supported_encodings()]
+    return any(request.if_none_match.contains(candidate) for candidate in candidates)
+
+
+def conditional_json(etag: str, payload_factory: Callable[[], Any]) -> Response:
+    """返回带ETag的JSON响应，若客户端缓存仍然有效则返回304
+
+    payload_factory只在需要返回响应体时才会被调用，避免无谓的序列化。
+    """
+    if _etag_matches(etag):
+        cache_requests.inc("http_etag", "hit")
+        response = Response(status=304)
+    else:
+        cache_requests.inc("http_etag", "miss")
+        response = jsonify(payload_factory())
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+
+def _compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=min(COMPRESSION_LEVEL, 11))
+    return gzip.compress(data, compresslevel=COMPRESSION_LEVEL)
+
+
+def _add_vary(response: Response) -> None:
+    if "Accept-Encoding" not in response.vary:
+        response.vary.add("Accept-Encoding")
+
+
+def compress_response(response: Response) -> Response:
+    """按Accept-Encoding压缩较大的文本响应"""
+    if response.status_code != 200 or "Content-Encoding" in response.headers:
+        return response
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+    if response.content_length is not None and response.content_length < COMPRESSION_MIN_SIZE:
+        return response
+    if response.is_streamed and not response.direct_passthrough:
+        return response
+
+    encoding = request.accept_encodings.best_match(supported_encodings())
+    if encoding is None:
+        return response
+
+    # 压缩后的内容与原内容不同，强ETag需要区分编码
+    etag, weak = response.get_etag()
+    encoded_etag = f"{etag}-{encoding}" if etag and not weak else None
+    if encoded_etag and request.if_none_match.contains(encoded_etag):
+        not_modified = Response(status=304)
+        not_modified.set_etag(encoded_etag)
+        _add_vary(not_modified)
+        response.close()
+        return not_modified
+
+    # 静态文件默认以文件流直接输出，这里需要读取后再压缩
+    response.direct_passthrough = False
+    data = response.get_data()
+    if len(data) < COMPRESSION_MIN_SIZE:
+        return response
+
+    response.set_data(_compress(data, encoding))
+    response.headers["Content-Encoding"] = encoding
+    _add_vary(response)
+    if encoded_etag:
+        response.set_etag(encoded_etag)
+    return response
+
+
+def send_static_file(static_folder: str, path: str) -> Response:
+    """发送静态文件，存在预压缩的 .br/.gz 文件时优先使用"""
+    accepted = request.accept_encodings
+    for encoding, extension in PRECOMPRESSED_EXTENSIONS:
+        if not accepted[encoding]:
+            continue
+        if encoding == "br" and accepted["br"] < accepted["gzip"]:
+            continue
+        if not os.path.exists(os.path.join(static_folder, path + extension)):
+            continue
+
+        response = send_from_directory(static_folder, path + extension)
+        mimetype, _ = mimetypes.guess_type(path)
+        if mimetype:
+            response.mimetype = mimetype
+        response.headers["Content-Encoding"] = encoding
+        _add_vary(response)
+        return response
+
+    return send_from_directory(static_folder, path)
+
+
+def init_compression(app: Flask) -> None:
+    """为应用注册响应压缩"""
+    app.after_request(compress_response)
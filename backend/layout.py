@@ -0,0 +1,140 @@
+from typing import Dict, Iterable, List, Tuple
+
+import numpy as np
+
+from backend.config import LAYOUT_LAYER_SPACING, LAYOUT_NODE_SPACING, LAYOUT_SWEEPS
+
+# 布局方向：LR 从左到右分层，TB 从上到下分层
+DIRECTIONS = ("LR", "TB")
+
+
+def _edge_arrays(node_ids: List[str], edges: Iterable[Tuple[str, str]]) -> Tuple[np.ndarray, np.ndarray]:
+    """将边转换为节点下标数组，忽略自环、重复边和端点不存在的边"""
+    index: Dict[str, int] = {node_id: i for i, node_id in enumerate(node_ids)}
+    pairs = set()
+    for source, target in edges:
+        s, t = index.get(source), index.get(target)
+        if s is not None and t is not None and s != t:
+            pairs.add((s, t))
+    if not pairs:
+        empty = np.zeros(0, dtype=np.intp)
+        return empty, empty
+    src, dst = np.array(sorted(pairs), dtype=np.intp).T
+    return src, dst
+
+
+def _adjacency(count: int, src: np.ndarray, dst: np.ndarray) -> Tuple[List[int], List[int], np.ndarray]:
+    """构建按起点分组的邻接表 (起始偏移, 终点, 边下标)"""
+    order = np.argsort(src, kind="stable")
+    starts = np.searchsorted(src[order], np.arange(count + 1))
+    return starts.tolist(), dst[order].tolist(), order
+
+
+def _acyclic(count: int, src: np.ndarray, dst: np.ndarray) -> Tuple[np.ndarray, np.ndarray, List[int]]:
+    """深度优先搜索反转回边以去除环，返回 (起点, 终点, 拓扑序)"""
+    starts, targets, order = _adjacency(count, src, dst)
+    state = [0] * count  # 0 未访问，1 在搜索栈上，2 已完成
+    back: List[int] = []
+    finished: List[int] = []
+    for root in range(count):
+        if state[root]:
+            continue
+        state[root] = 1
+        stack = [[root, starts[root]]]
+        while stack:
+            frame = stack[-1]
+            node, cursor = frame
+            if cursor == starts[node + 1]:
+                state[node] = 2
+                finished.append(node)
+                stack.pop()
+                continue
+            frame[1] = cursor + 1
+            target = targets[cursor]
+            if state[target] == 1:
+                back.append(cursor)
+            elif state[target] == 0:
+                state[target] = 1
+                stack.append([target, starts[target]])
+    if back:
+        reversed_edges = order[back]
+        src, dst = src.copy(), dst.copy()
+        src[reversed_edges], dst[reversed_edges] = dst[reversed_edges], src[reversed_edges]
+    # 反转回边后，完成顺序的逆序即为拓扑序
+    return src, dst, finished[::-1]
+
+
+def _assign_layers(count: int, src: np.ndarray, dst: np.ndarray, topo_order: List[int]) -> np.ndarray:
+    """最长路径分层：每个节点位于其所有前驱之后的一层"""
+    starts, targets, _ = _adjacency(count, src, dst)
+    layer = [0] * count
+    for node in topo_order:
+        below = layer[node] + 1
+        for target in targets[starts[node]:starts[node + 1]]:
+            if layer[target] < below:
+                layer[target] = below
+    return np.array(layer, dtype=np.intp)
+
+
+def _order_layers(layer: np.ndarray, src: np.ndarray, dst: np.ndarray, sweeps: int) -> np.ndarray:
+    """重心法减少交叉，返回每个节点在所在层内的序号
+
+    每轮同时对所有层排序，交替使用前驱和后继的重心（各层内相对位置的平均值），
+    跨多层的边直接连接两端节点，不插入虚拟节点。
+    """
+    count = len(layer)
+    width = np.bincount(layer)
+    layer_start = np.cumsum(width) - width
+    # 初始顺序为拓扑序（节点下标顺序）
+    order = np.lexsort((np.arange(count), layer))
+    rank = np.empty(count, dtype=np.intp)
+    rank[order] = np.arange(count) - layer_start[layer[order]]
+    if not len(src):
+        return rank
+    counts = (np.bincount(dst, minlength=count), np.bincount(src, minlength=count))
+    for sweep in range(sweeps):
+        neighbors, nodes = (src, dst) if sweep % 2 == 0 else (dst, src)
+        relative = (rank + 0.5) / width[layer]
+        sums = np.bincount(nodes, weights=relative[neighbors], minlength=count)
+        degree = counts[sweep % 2]
+        barycenter = np.where(degree > 0, sums / np.maximum(degree, 1), relative)
+        order = np.lexsort((rank, barycenter, layer))
+        rank[order] = np.arange(count) - layer_start[layer[order]]
+    return rank
+
+
+def layered_layout(
+    node_ids: List[str],
+    edges: Iterable[Tuple[str, str]],
+    direction: str = "LR",
+    layer_spacing: float = LAYOUT_LAYER_SPACING,
+    node_spacing: float = LAYOUT_NODE_SPACING,
+    origin: Tuple[float, float] = (0.0, 0.0),
+    sweeps: int = LAYOUT_SWEEPS,
+) -> Tuple[np.ndarray, int]:
+    """Sugiyama式分层布局，返回与node_ids对应的 (n, 2) 坐标数组和层数
+
+    依次去环、最长路径分层、重心法减少交叉，最后每层沿布局方向排开、层内居中。
+    """
+    if direction not in DIRECTIONS:
+        raise ValueError(f"未知的布局方向: {direction}")
+    count = len(node_ids)
+    if not count:
+        return np.zeros((0, 2)), 0
+    src, dst = _edge_arrays(node_ids, edges)
+    src, dst, topo_order = _acyclic(count, src, dst)
+    # 按拓扑序重新编号，使初始层内顺序与拓扑序一致
+    renumber = np.empty(count, dtype=np.intp)
+    renumber[topo_order] = np.arange(count)
+    src, dst = renumber[src], renumber[dst]
+    layer = _assign_layers(count, src, dst, list(range(count)))
+    rank = _order_layers(layer, src, dst, sweeps)
+
+    width = np.bincount(layer)
+    along = layer * layer_spacing
+    across = (rank - (width[layer] - 1) / 2) * node_spacing
+    coords = np.empty((count, 2))
+    coords[:, 0], coords[:, 1] = (along, across) if direction == "LR" else (across, along)
+    coords += origin
+    # 换回原节点顺序
+    return coords[renumber], len(width)
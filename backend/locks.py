@@ -0,0 +1,109 @@
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator, Optional
+
+
+class ReadWriteLock:
+    """读写锁：允许多个读者并发，写者独占，写者优先以避免写饥饿
+
+    同一线程可以重入读锁或写锁，持有写锁时也可以获取读锁；
+    不支持由读锁升级为写锁。
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._readers = 0
+        self._writer = None
+        self._write_depth = 0
+        self._waiting_writers = 0
+        self._local = threading.local()
+
+    def acquire_read(self, timeout: Optional[float] = None) -> bool:
+        """获取读锁，指定timeout时最多等待timeout秒，返回是否取得"""
+        depth = getattr(self._local, "read_depth", 0)
+        if depth:
+            self._local.read_depth = depth + 1
+            return True
+        me = threading.get_ident()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            if self._writer == me:
+                # 写者线程内的读取不计入读者数量
+                self._local.counted = False
+            else:
+                while self._writer is not None or self._waiting_writers:
+                    if deadline is None:
+                        self._cond.wait()
+                        continue
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+                self._readers += 1
+                self._local.counted = True
+        self._local.read_depth = 1
+        return True
+
+    def release_read(self) -> None:
+        """释放读锁"""
+        depth = getattr(self._local, "read_depth", 0)
+        if not depth:
+            raise RuntimeError("释放未持有的读锁")
+        self._local.read_depth = depth - 1
+        if depth > 1 or not self._local.counted:
+            return
+        with self._cond:
+            self._readers -= 1
+            if self._readers == 0:
+                self._cond.notify_all()
+
+    def acquire_write(self) -> None:
+        """获取写锁"""
+        me = threading.get_ident()
+        with self._cond:
+            if self._writer == me:
+                self._write_depth += 1
+                return
+            if getattr(self._local, "read_depth", 0):
+                raise RuntimeError("不支持由读锁升级为写锁")
+            self._waiting_writers += 1
+            try:
+                while self._writer is not None or self._readers:
+                    self._cond.wait()
+            finally:
+                self._waiting_writers -= 1
+            self._writer = me
+            self._write_depth = 1
+
+    def release_write(self) -> None:
+        """释放写锁"""
+        with self._cond:
+            if self._writer != threading.get_ident():
+                raise RuntimeError("释放未持有的写锁")
+            self._write_depth -= 1
+            if self._write_depth == 0:
+                self._writer = None
+                self._cond.notify_all()
+
+    def is_write_held(self) -> bool:
+        """当前线程是否持有写锁"""
+        return self._writer == threading.get_ident()
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        """以读者身份持有锁"""
+        self.acquire_read()
+        try:
+            yield
+        finally:
+            self.release_read()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        """以写者身份持有锁"""
+        self.acquire_write()
+        try:
+            yield
+        finally:
+            self.release_write()
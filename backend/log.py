@@ -0,0 +1,194 @@
+"""
+结构化日志
+
+日志记录以JSON行的形式写到标准输出。产生日志的线程只把记录放入有界队列，
+格式化和写出都在后台线程中进行，标准输出阻塞时不会拖慢请求；队列满时丢弃记录并计数。
+每条记录带有当前HTTP请求的request_id（也通过 X-Request-ID 响应头返回给客户端）
+和当前工作流运行的run_id（见 backend/tracing.py），便于把同一请求或运行的日志关联起来。
+
+高频事件用 log_event 记录，按 LOG_SAMPLE_EVERY 每N次只记录一次，记录中的sample_every为N。
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from flask import Flask, g, has_app_context, request
+
+from backend.config import LOG_LEVEL, LOG_QUEUE_SIZE, LOG_SAMPLE_EVERY
+from backend.metrics import log_records_dropped
+from backend.tracing import current_trace
+
+ROOT_LOGGER = "storyfactory"
+
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# LogRecord自带的属性，其余属性视为调用方通过extra传入的字段
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+def get_logger(name: str) -> logging.Logger:
+    """模块使用的日志记录器，名称为 storyfactory.<模块名>"""
+    return logging.getLogger(f"{ROOT_LOGGER}.{name.rsplit('.', 1)[-1]}")
+
+
+def current_request_id() -> Optional[str]:
+    return g.get("request_id") if has_app_context() else None
+
+
+class JsonFormatter(logging.Formatter):
+    """每条记录格式化为一行JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+            "pid": record.process,
+            "thread": record.threadName,
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES and value is not None:
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _StdoutHandler(logging.StreamHandler):
+    """写到当前的sys.stdout，标准输出被替换（如测试时被捕获）后也写到新的对象"""
+
+    def __init__(self):
+        logging.Handler.__init__(self)
+
+    @property
+    def stream(self):
+        return sys.stdout
+
+    @stream.setter
+    def stream(self, value):
+        pass
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """在产生日志的线程中只补充关联ID并入队，不做格式化"""
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if getattr(record, "request_id", None) is None:
+            record.request_id = current_request_id()
+        if getattr(record, "run_id", None) is None:
+            trace = current_trace()
+            record.run_id = trace.id if trace is not None else None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            log_records_dropped.inc()
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+_configure_lock = threading.Lock()
+
+
+def configure(level: str = LOG_LEVEL, handler: Optional[logging.Handler] = None) -> None:
+    """为storyfactory日志记录器启用后台写出，重复调用无效果；handler默认为写到标准输出的JSON行"""
+    global _listener
+    with _configure_lock:
+        if _listener is not None:
+            return
+        if handler is None:
+            handler = _StdoutHandler()
+            handler.setFormatter(JsonFormatter())
+        records: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        _listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+        _listener.start()
+        root = logging.getLogger(ROOT_LOGGER)
+        root.addHandler(_QueueHandler(records))
+        root.setLevel(level)
+        root.propagate = False
+        atexit.register(shutdown)
+
+
+def shutdown() -> None:
+    """写完队列中剩余的记录并停止后台线程"""
+    global _listener
+    with _configure_lock:
+        if _listener is None:
+            return
+        _listener.stop()
+        _listener = None
+        root = logging.getLogger(ROOT_LOGGER)
+        for handler in [handler for handler in root.handlers if isinstance(handler, _QueueHandler)]:
+            root.removeHandler(handler)
+        root.propagate = True
+
+
+class _Sampler:
+    """按事件名每N次放行一次"""
+
+    def __init__(self, every: Dict[str, int]):
+        self.every = every
+        self._counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def rate(self, event: str) -> int:
+        """本次应记录时返回N（未配置抽样的事件为1），应跳过时返回0"""
+        every = self.every.get(event, 1)
+        if every <= 1:
+            return 1
+        with self._lock:
+            count = self._counts.get(event, 0)
+            self._counts[event] = count + 1
+        return every if count % every == 0 else 0
+
+
+_sampler = _Sampler(LOG_SAMPLE_EVERY)
+
+
+def log_event(logger: logging.Logger, event: str, level: int = logging.INFO, **fields: Any) -> None:
+    """记录一个命名事件，fields作为JSON字段输出"""
+    if not logger.isEnabledFor(level):
+        return
+    every = _sampler.rate(event)
+    if not every:
+        return
+    if every > 1:
+        fields["sample_every"] = every
+    logger.log(level, event, extra={"event": event, **fields})
+
+
+_access_logger = get_logger("http")
+
+
+def init_app(app: Flask) -> None:
+    """为每个请求分配request_id（使用请求头中的 X-Request-ID，没有时生成），并记录访问日志"""
+    configure()
+
+    # 应用级的URL预处理函数最先执行，载入项目图时产生的日志也带有request_id
+    @app.url_value_preprocessor
+    def _assign_request_id(endpoint, values):
+        g.request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+        g.log_started = time.perf_counter()
+
+    @app.after_request
+    def _log_request(response):
+        request_id = g.get("request_id")
+        if request_id is not None:
+            response.headers[REQUEST_ID_HEADER] = request_id
+            log_event(
+                _access_logger, "http.request", method=request.method, path=request.path,
+                status=response.status_code, duration_ms=round((time.perf_counter() - g.log_started) * 1000, 3),
+            )
+        return response
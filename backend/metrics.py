@@ -0,0 +1,261 @@
+"""
+进程内指标和 Prometheus 文本格式导出
+
+不依赖 prometheus_client：计数器和直方图在热路径上只做一次加锁的加法（直方图另做一次二分查找），
+图大小等由回调函数在抓取 /metrics 时才计算的指标不占用请求路径的时间。
+多进程模式下每个工作进程各自统计，由 Prometheus 按实例汇总。
+"""
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from flask import Flask, g, request
+
+from backend.config import METRICS_LATENCY_BUCKETS, METRICS_SLOW_BUCKETS
+
+Labels = Tuple[str, ...]
+
+# backend.log 依赖本模块，这里直接使用同名的日志记录器
+logger = logging.getLogger("storyfactory.metrics")
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in values
+        ]
+
+
+class Gauge(_Metric):
+    """可增可减的当前值；指定callback时在导出时调用，返回 [(标签值, 数值)]"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 callback: Optional[Callable[[], Iterable[Tuple[Labels, float]]]] = None):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[Labels, float] = {}
+        self._callback = callback
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def dec(self, *labels: str, amount: float = 1) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(labels, 0)
+
+    def render(self) -> List[str]:
+        if self._callback is not None:
+            values = sorted(self._callback())
+        else:
+            with self._lock:
+                values = sorted(self._values.items())
+        return self._header() + [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}" for labels, value in values
+        ]
+
+
+class Histogram(_Metric):
+    """按上界分桶的观测值分布"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = METRICS_LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # 标签值 -> (各桶计数（非累计，最后一个为+Inf）, 总和)
+        self._values: Dict[Labels, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(labels)
+            if entry is None:
+                entry = self._values[labels] = ([0] * (len(self.buckets) + 1), [0.0])
+            entry[0][index] += 1
+            entry[1][0] += value
+
+    @contextmanager
+    def time(self, *labels: str) -> Iterator[None]:
+        """记录上下文内代码的耗时（秒）"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def count(self, *labels: str) -> int:
+        with self._lock:
+            entry = self._values.get(labels)
+            return sum(entry[0]) if entry else 0
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = sorted((labels, (list(counts), total[0])) for labels, (counts, total) in self._values.items())
+        lines = self._header()
+        names = self.labelnames + ("le",)
+        for labels, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(names, labels + (_format_value(bound),))} {cumulative}")
+            suffix = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{suffix} {_format_value(total)}")
+            lines.append(f"{self.name}_count{suffix} {cumulative}")
+        return lines
+
+
+class Registry:
+    """指标集合"""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        """Prometheus 文本格式（text/plain; version=0.0.4）"""
+        lines: List[str] = []
+        for metric in self._metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception:
+                # 单个回调出错不影响其他指标的导出
+                logger.exception("导出指标时出错", extra={"metric": metric.name})
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+http_request_duration = registry.register(Histogram(
+    "storyfactory_http_request_duration_seconds", "API请求处理耗时", ("method", "route", "status"),
+))
+socketio_events = registry.register(Counter(
+    "storyfactory_socketio_events_total", "收到的Socket.IO事件数", ("event",),
+))
+socketio_clients = registry.register(Gauge(
+    "storyfactory_socketio_connected_clients", "当前连接的Socket.IO客户端数",
+))
+workflow_runs = registry.register(Counter(
+    "storyfactory_workflow_runs_total", "工作流执行次数", ("status",),
+))
+workflow_duration = registry.register(Histogram(
+    "storyfactory_workflow_duration_seconds", "工作流执行耗时", (), METRICS_SLOW_BUCKETS,
+))
+llm_request_duration = registry.register(Histogram(
+    "storyfactory_llm_request_duration_seconds", "文本生成接口调用耗时", ("model", "outcome"), METRICS_SLOW_BUCKETS,
+))
+llm_tokens = registry.register(Counter(
+    "storyfactory_llm_tokens_total", "文本生成接口消耗的token数", ("model", "type"),
+))
+cache_requests = registry.register(Counter(
+    "storyfactory_cache_requests_total", "缓存查询次数，result为hit或miss", ("cache", "result"),
+))
+log_records_dropped = registry.register(Counter(
+    "storyfactory_log_records_dropped_total", "日志队列已满时丢弃的日志记录数",
+))
+
+
+def init_app(app: Flask, blueprints: Sequence[str]) -> None:
+    """统计指定蓝图中各路由的请求耗时，按路由规则而不是实际路径分组"""
+    blueprints = frozenset(blueprints)
+
+    # 应用级的URL预处理函数先于蓝图的执行，计时包括载入项目图的时间
+    @app.url_value_preprocessor
+    def _start_timer(endpoint, values):
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def _observe(response):
+        started = g.pop("metrics_started", None)
+        if started is not None and request.blueprint in blueprints and request.url_rule is not None:
+            http_request_duration.observe(
+                time.perf_counter() - started, request.method, request.url_rule.rule, str(response.status_code)
+            )
+        return response
+
+
+def register_gauge(name: str, help_text: str, labelnames: Sequence[str],
+                   callback: Callable[[], Iterable[Tuple[Labels, float]]]) -> Gauge:
+    """注册在导出时才计算的指标"""
+    return registry.register(Gauge(name, help_text, labelnames, callback))
+
+
+# 就绪检查：名称 -> 返回是否就绪的函数，由各模块注册
+_readiness_checks: Dict[str, Callable[[], bool]] = {}
+
+
+def add_readiness_check(name: str, check: Callable[[], bool]) -> None:
+    _readiness_checks[name] = check
+
+
+def readiness() -> Dict[str, bool]:
+    """执行全部就绪检查，检查抛出异常时视为未就绪"""
+    results = {}
+    for name, check in list(_readiness_checks.items()):
+        try:
+            results[name] = bool(check())
+        except Exception:
+            logger.exception("就绪检查出错", extra={"check": name})
+            results[name] = False
+    return results
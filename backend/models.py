@@ -1,4 +1,6 @@
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
+import math
+import sys
 import uuid
 
 class Node:
@@ -65,6 +67,173 @@ class Edge:
         return new_edge
 
 
+def _intern(value: Any) -> Any:
+    """驻留字符串，使大量重复的类型、连接点和ID共享同一对象"""
+    return sys.intern(value) if type(value) is str else value
+
+
+def _detached(value: Any) -> Any:
+    """递归复制字典和列表，其余值原样共享，使记录与调用方拿到的字典不共享可变对象"""
+    if isinstance(value, dict):
+        return {key: _detached(item) if isinstance(item, (dict, list)) else item for key, item in value.items()}
+    if isinstance(value, list):
+        return [_detached(item) if isinstance(item, (dict, list)) else item for item in value]
+    return value
+
+
+def _coordinates(position: Any) -> Optional[Tuple[float, float]]:
+    """将 {"x": ..., "y": ...} 形式的坐标转换为浮点数对，其他形式返回None"""
+    if type(position) is not dict or len(position) != 2:
+        return None
+    x, y = position.get("x"), position.get("y")
+    if type(x) not in (int, float) or type(y) not in (int, float):
+        return None
+    if not (math.isfinite(x) and math.isfinite(y)):
+        return None
+    return float(x), float(y)
+
+
+def node_point(node: Dict[str, Any]) -> Optional[Tuple[float, float]]:
+    """节点字典中可按列存储的坐标，无法识别时返回None（原值保留在记录的extra中）"""
+    return _coordinates(node.get("position"))
+
+
+_NODE_FIELDS = frozenset(("id", "type", "data", "position", "sourcePosition", "targetPosition"))
+_EDGE_FIELDS = frozenset(("id", "source", "target", "sourceHandle", "targetHandle", "type"))
+
+
+class NodeRecord:
+    """节点在存储中的紧凑表示
+
+    固定字段使用 __slots__ 保存，类型和连接点方向等字符串驻留，其余字段放入 extra。
+    坐标不在记录中，由存储按槽位保存在浮点数坐标列里（见 backend/columns.py），
+    无法识别的坐标原样放入 extra。记录创建后不再修改，只在API边界通过 to_dict 转换为字典；
+    data 和 extra 在创建记录和转换为字典时复制，调用方修改得到的字典不会改变记录和共享它的快照。
+    """
+
+    __slots__ = ("id", "type", "data", "source_position", "target_position", "extra")
+
+    def __init__(
+        self,
+        node_id: str,
+        node_type: Optional[str],
+        data: Optional[Dict[str, Any]],
+        source_position: Optional[str] = None,
+        target_position: Optional[str] = None,
+        extra: Optional[Dict[str, Any]] = None,
+    ):
+        self.id = node_id
+        self.type = node_type
+        self.data = data
+        self.source_position = source_position
+        self.target_position = target_position
+        self.extra = extra
+
+    @classmethod
+    def from_dict(cls, node: Dict[str, Any]) -> "NodeRecord":
+        """由节点字典创建记录，坐标需另外通过 node_point 读取"""
+        extra = None
+        if len(node.keys() - _NODE_FIELDS):
+            extra = {key: _detached(value) for key, value in node.items() if key not in _NODE_FIELDS}
+        if "position" in node and _coordinates(node["position"]) is None:
+            # 无法识别的坐标原样保留
+            extra = {**(extra or {}), "position": _detached(node["position"])}
+        return cls(
+            _intern(node["id"]),
+            _intern(node.get("type")),
+            _detached(node.get("data")),
+            _intern(node.get("sourcePosition")),
+            _intern(node.get("targetPosition")),
+            extra,
+        )
+
+    def replace(self, **changes: Any) -> "NodeRecord":
+        """返回修改了指定字段的新记录"""
+        fields = {slot: getattr(self, slot) for slot in self.__slots__}
+        fields.update(changes)
+        return NodeRecord(
+            fields["id"], fields["type"], fields["data"],
+            fields["source_position"], fields["target_position"], fields["extra"],
+        )
+
+    def without_position(self) -> "NodeRecord":
+        """去掉extra中保留的原始坐标，坐标改由坐标列提供时使用"""
+        if not self.extra or "position" not in self.extra:
+            return self
+        extra = {key: value for key, value in self.extra.items() if key != "position"}
+        return self.replace(extra=extra or None)
+
+    def to_dict(self, point: Optional[Tuple[float, float]] = None) -> Dict[str, Any]:
+        """转换为API使用的节点字典，point为坐标列中的坐标"""
+        node: Dict[str, Any] = {"id": self.id}
+        if self.type is not None:
+            node["type"] = self.type
+        if self.data is not None:
+            node["data"] = _detached(self.data)
+        if point is not None:
+            node["position"] = {"x": point[0], "y": point[1]}
+        if self.source_position is not None:
+            node["sourcePosition"] = self.source_position
+        if self.target_position is not None:
+            node["targetPosition"] = self.target_position
+        if self.extra:
+            node.update(_detached(self.extra))
+        return node
+
+
+class EdgeRecord:
+    """边在存储中的紧凑表示，端点ID、连接点和类型字符串驻留，其余可选属性放入 props"""
+
+    __slots__ = ("id", "source", "target", "source_handle", "target_handle", "type", "props")
+
+    def __init__(
+        self,
+        edge_id: str,
+        source: str,
+        target: str,
+        source_handle: Optional[str] = None,
+        target_handle: Optional[str] = None,
+        edge_type: Optional[str] = None,
+        props: Optional[Dict[str, Any]] = None,
+    ):
+        self.id = edge_id
+        self.source = source
+        self.target = target
+        self.source_handle = source_handle
+        self.target_handle = target_handle
+        self.type = edge_type
+        self.props = props
+
+    @classmethod
+    def from_dict(cls, edge: Dict[str, Any]) -> "EdgeRecord":
+        """由边字典创建记录"""
+        props = None
+        if len(edge.keys() - _EDGE_FIELDS):
+            props = {key: _detached(value) for key, value in edge.items() if key not in _EDGE_FIELDS}
+        return cls(
+            _intern(edge["id"]),
+            _intern(edge.get("source")),
+            _intern(edge.get("target")),
+            _intern(edge.get("sourceHandle")),
+            _intern(edge.get("targetHandle")),
+            _intern(edge.get("type")),
+            props,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为API使用的边字典"""
+        edge: Dict[str, Any] = {"id": self.id, "source": self.source, "target": self.target}
+        if self.source_handle is not None:
+            edge["sourceHandle"] = self.source_handle
+        if self.target_handle is not None:
+            edge["targetHandle"] = self.target_handle
+        if self.type is not None:
+            edge["type"] = self.type
+        if self.props:
+            edge.update(_detached(self.props))
+        return edge
+
+
 # 初始节点和边缘数据
 initial_nodes = [
     Node.create(
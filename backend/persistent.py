@@ -0,0 +1,269 @@
+import itertools
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# 持久化向量每层的分支数（2^5 = 32）
+_BITS = 5
+_WIDTH = 1 << _BITS
+_MASK = _WIDTH - 1
+
+# 已删除槽位超过该数量且多于存活元素时压缩表
+_COMPACT_MIN = 64
+
+# 快照表版本的编号，用于标记索引字典的写入者
+_table_ids = itertools.count()
+
+
+def _new_path(level: int, node: tuple) -> tuple:
+    if level == 0:
+        return node
+    return (_new_path(level - _BITS, node),)
+
+
+class PersistentVector:
+    """不可变向量：32叉前缀树加尾部缓冲，修改时只复制从根到叶子的路径，其余结构与旧版本共享"""
+
+    __slots__ = ("_count", "_shift", "_root", "_tail")
+
+    def __init__(self, count: int = 0, shift: int = _BITS, root: tuple = (), tail: tuple = ()):
+        self._count = count
+        self._shift = shift
+        self._root = root
+        self._tail = tail
+
+    @classmethod
+    def from_list(cls, items: List[Any]) -> "PersistentVector":
+        """由列表批量构建，避免逐个追加的路径复制"""
+        count = len(items)
+        tail_offset = 0 if count < _WIDTH else ((count - 1) >> _BITS) << _BITS
+        nodes = [tuple(items[i:i + _WIDTH]) for i in range(0, tail_offset, _WIDTH)]
+        shift = _BITS
+        while len(nodes) > _WIDTH:
+            nodes = [tuple(nodes[i:i + _WIDTH]) for i in range(0, len(nodes), _WIDTH)]
+            shift += _BITS
+        return cls(count, shift, tuple(nodes), tuple(items[tail_offset:]))
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _tail_offset(self) -> int:
+        return 0 if self._count < _WIDTH else ((self._count - 1) >> _BITS) << _BITS
+
+    def _leaf_for(self, index: int) -> tuple:
+        if index >= self._tail_offset():
+            return self._tail
+        node = self._root
+        level = self._shift
+        while level > 0:
+            node = node[(index >> level) & _MASK]
+            level -= _BITS
+        return node
+
+    def __getitem__(self, index: int) -> Any:
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return self._leaf_for(index)[index & _MASK]
+
+    def set(self, index: int, value: Any) -> "PersistentVector":
+        """返回在index处替换为value的新向量"""
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        if index >= self._tail_offset():
+            tail = list(self._tail)
+            tail[index & _MASK] = value
+            return PersistentVector(self._count, self._shift, self._root, tuple(tail))
+        return PersistentVector(self._count, self._shift, self._assoc(self._shift, self._root, index, value), self._tail)
+
+    def _assoc(self, level: int, node: tuple, index: int, value: Any) -> tuple:
+        copy = list(node)
+        if level == 0:
+            copy[index & _MASK] = value
+        else:
+            sub = (index >> level) & _MASK
+            copy[sub] = self._assoc(level - _BITS, node[sub], index, value)
+        return tuple(copy)
+
+    def append(self, value: Any) -> "PersistentVector":
+        """返回末尾追加value的新向量"""
+        if self._count - self._tail_offset() < _WIDTH:
+            return PersistentVector(self._count + 1, self._shift, self._root, self._tail + (value,))
+        # 尾部已满，将其挂入树中
+        shift = self._shift
+        if (self._count >> _BITS) > (1 << shift):
+            root = (self._root, _new_path(shift, self._tail))
+            shift += _BITS
+        else:
+            root = self._push_tail(shift, self._root, self._tail)
+        return PersistentVector(self._count + 1, shift, root, (value,))
+
+    def _push_tail(self, level: int, parent: tuple, tail: tuple) -> tuple:
+        sub = ((self._count - 1) >> level) & _MASK
+        if level == _BITS:
+            inserted = tail
+        elif sub < len(parent):
+            inserted = self._push_tail(level - _BITS, parent[sub], tail)
+        else:
+            inserted = _new_path(level - _BITS, tail)
+        return parent[:sub] + (inserted,) + parent[sub + 1:]
+
+    def leaves(self, start: int = 0) -> Iterator[Tuple[int, tuple]]:
+        """按顺序产出 (叶子起始下标, 叶子)，从包含start的叶子开始"""
+        tail_offset = self._tail_offset()
+        index = start - (start & _MASK)
+        while index < tail_offset:
+            yield index, self._leaf_for(index)
+            index += _WIDTH
+        if self._tail and start < self._count:
+            yield tail_offset, self._tail
+
+    def __iter__(self) -> Iterator[Any]:
+        for _, leaf in self.leaves():
+            yield from leaf
+
+
+class SlotIndex(dict):
+    """id到槽位的索引字典，owner为可以写入它的快照表版本的编号"""
+
+    __slots__ = ("owner",)
+
+    def __init__(self, *args: Any):
+        super().__init__(*args)
+        self.owner: Optional[int] = None
+
+
+class SnapshotTable:
+    """按插入顺序保存、以id属性索引的不可变对象表，作为图数据的时间点快照
+
+    元素存放在持久化向量的槽位中，删除只留下空槽；id到槽位的索引字典在同一条
+    修改链上的各版本间共享且只增不减：旧版本查找时会校验槽位范围和槽位上的id，
+    因此新版本追加的元素对旧版本不可见。已删除的id再次加入时复用原槽位。
+    只有链上最新的版本可以写入索引；从旧版本分出新的修改链（如事务回滚后继续修改）
+    时先复制索引，否则新链为id分配的槽位会使共享索引的其他版本找不到自己的元素。
+    空槽过多时整体压缩并换用新的索引字典。
+    """
+
+    __slots__ = ("_slots", "_index", "_id", "_size", "version")
+
+    def __init__(self, slots: PersistentVector, index: SlotIndex, size: int, version: int):
+        self._slots = slots
+        self._index = index
+        self._id = next(_table_ids)
+        if index.owner is None:
+            index.owner = self._id
+        self._size = size
+        self.version = version
+
+    @classmethod
+    def build(cls, items: Iterable[Any], version: int = 0) -> "SnapshotTable":
+        """由对象序列构建，id重复时保留第一个"""
+        index = SlotIndex()
+        ordered: List[Any] = []
+        for item in items:
+            if item.id not in index:
+                index[item.id] = len(ordered)
+                ordered.append(item)
+        return cls(PersistentVector.from_list(ordered), index, len(ordered), version)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __iter__(self) -> Iterator[Any]:
+        for _, leaf in self._slots.leaves():
+            for item in leaf:
+                if item is not None:
+                    yield item
+
+    def __contains__(self, item_id: str) -> bool:
+        return self.slot_of(item_id) is not None
+
+    def to_list(self) -> List[Any]:
+        """按插入顺序返回全部对象"""
+        return [item for _, leaf in self._slots.leaves() for item in leaf if item is not None]
+
+    def iter_slots(self) -> Iterator[Tuple[int, Any]]:
+        """按顺序产出 (槽位, 对象)"""
+        for offset, leaf in self._slots.leaves():
+            for position, item in enumerate(leaf):
+                if item is not None:
+                    yield offset + position, item
+
+    def item_at(self, slot: int) -> Optional[Any]:
+        """获取槽位上的对象，空槽返回None"""
+        return self._slots[slot]
+
+    def to_dict(self, item: Any) -> Dict[str, Any]:
+        """将对象转换为API使用的字典"""
+        return item.to_dict()
+
+    def dicts(self) -> List[Dict[str, Any]]:
+        """按插入顺序返回全部对象的字典"""
+        return [item.to_dict() for item in self]
+
+    def iter_dicts(self) -> Iterator[Dict[str, Any]]:
+        """按插入顺序逐个生成对象的字典"""
+        for item in self:
+            yield item.to_dict()
+
+    def slot_of(self, item_id: str) -> Optional[int]:
+        """获取id所在的槽位，不存在时返回None"""
+        slot = self._index.get(item_id)
+        if slot is None or slot >= len(self._slots):
+            return None
+        item = self._slots[slot]
+        if item is None or item.id != item_id:
+            return None
+        return slot
+
+    def get(self, item_id: str) -> Optional[Any]:
+        """根据id获取对象"""
+        slot = self.slot_of(item_id)
+        return None if slot is None else self._slots[slot]
+
+    def iter_after(self, item_id: str) -> Iterator[Any]:
+        """按顺序遍历位于item_id之后的对象，item_id不存在时抛出KeyError"""
+        slot = self.slot_of(item_id)
+        if slot is None:
+            raise KeyError(item_id)
+        start = slot + 1
+        for offset, leaf in self._slots.leaves(start):
+            for item in leaf[max(start - offset, 0):]:
+                if item is not None:
+                    yield item
+
+    def _place(self, item: Any) -> Tuple[int, PersistentVector, int, SlotIndex]:
+        """为item分配槽位，返回 (槽位, 新的槽位向量, 新的元素数, 新版本使用的索引)"""
+        item_id = item.id
+        slot = self._index.get(item_id)
+        if slot is not None and slot < len(self._slots):
+            current = self._slots[slot]
+            if current is None or current.id == item_id:
+                return slot, self._slots.set(slot, item), self._size + (current is None), self._index
+        index = self._index if self._index.owner == self._id else SlotIndex(self._index)
+        slot = index[item_id] = len(self._slots)
+        return slot, self._slots.append(item), self._size + 1, index
+
+    def _succeeded_by(self, table: "SnapshotTable") -> "SnapshotTable":
+        """修改生成的新版本接替本版本写入共享索引"""
+        if table._index is self._index and self._index.owner == self._id:
+            self._index.owner = table._id
+        return table
+
+    def _sparse(self) -> bool:
+        return len(self._slots) - self._size > max(_COMPACT_MIN, self._size)
+
+    def put(self, item: Any) -> "SnapshotTable":
+        """返回加入或替换了item的新版本"""
+        _, slots, size, index = self._place(item)
+        return self._succeeded_by(SnapshotTable(slots, index, size, self.version + 1))
+
+    def remove(self, item_id: str) -> "SnapshotTable":
+        """返回删除了item_id的新版本，不存在时返回自身"""
+        slot = self.slot_of(item_id)
+        if slot is None:
+            return self
+        slots = self._slots.set(slot, None)
+        table = self._succeeded_by(SnapshotTable(slots, self._index, self._size - 1, self.version + 1))
+        return table.compact() if table._sparse() else table
+
+    def compact(self) -> "SnapshotTable":
+        """去掉空槽重新构建，版本号不变"""
+        return SnapshotTable.build(self.to_list(), self.version)
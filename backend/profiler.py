@@ -0,0 +1,228 @@
+"""
+运行中进程的性能分析
+
+  1. 采样分析：在限定时间内定期读取进程中全部线程的调用栈，输出折叠栈（flamegraph.pl 的输入格式）
+     或 speedscope JSON（https://www.speedscope.app 可直接打开）。不需要重启进程，也不需要事先安装分析器。
+     采样线程使用未被 gevent/eventlet 替换的原生线程和sleep，协程服务器的主线程忙于计算时也能按时采样。
+  2. 单请求分析：调试模式下请求带 ?profile=1 和管理令牌时以cProfile分析该请求，返回耗时最多的函数而不是原响应。
+"""
+import cProfile
+import hmac
+import importlib
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import Flask, abort, g, jsonify, make_response, request
+
+from backend.config import ADMIN_TOKEN, PROFILE_TOP_FUNCTIONS
+
+# 栈帧：(文件, 函数首行, 函数名)
+Frame = Tuple[str, int, str]
+Stack = Tuple[Frame, ...]
+
+
+def _original(module: str, name: str) -> Any:
+    """取得未被gevent/eventlet的monkey patch替换的标准库对象"""
+    if "gevent" in sys.modules:
+        from gevent import monkey
+        if monkey.is_module_patched(module):
+            return monkey.get_original(module, name)
+    if "eventlet" in sys.modules:
+        from eventlet import patcher
+        # eventlet以"thread"记录对threading和_thread的替换
+        if patcher.is_monkey_patched("thread" if module in ("threading", "_thread") else module):
+            return getattr(patcher.original(module), name)
+    return getattr(importlib.import_module(module), name)
+
+
+class SamplingProfile:
+    """按线程统计的调用栈样本"""
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.duration = 0.0
+        self.samples: Dict[str, Counter] = {}
+
+    def collect(self, duration: float) -> "SamplingProfile":
+        """在duration秒内每interval秒采样一次，不采样发起采样的线程
+
+        协程服务器中发起采样的协程与其他全部协程运行在同一个原生线程中，该线程照常采样，
+        样本中的调用栈即采样时正在运行的协程。
+        """
+        native_ident = _original("_thread", "get_ident")
+        sleep = _original("time", "sleep")
+        caller = native_ident()
+        in_coroutine = threading.get_ident() != caller
+        finished: List[bool] = []
+
+        def run():
+            skip = {native_ident()} if in_coroutine else {native_ident(), caller}
+            started = time.perf_counter()
+            deadline = started + duration
+            while time.perf_counter() < deadline:
+                names = {thread.ident: thread.name for thread in threading.enumerate()}
+                if in_coroutine:
+                    names[caller] = "coroutines"
+                for ident, frame in sys._current_frames().items():
+                    if ident in skip:
+                        continue
+                    name = names.get(ident) or f"thread-{ident}"
+                    self.samples.setdefault(name, Counter())[_stack(frame)] += 1
+                sleep(self.interval)
+            self.duration = time.perf_counter() - started
+            finished.append(True)
+
+        # 原生线程：threading.Thread在monkey patch后会以协程运行，协程服务器忙碌时无法按时采样
+        _original("_thread", "start_new_thread")(run, ())
+        # 协程服务器中等待时让出给其他协程，线程模式下即普通的sleep
+        while not finished:
+            time.sleep(min(self.interval * 10, 0.1))
+        return self
+
+    def collapsed(self) -> str:
+        """折叠栈格式：每行 "线程;外层函数;...;内层函数 样本数" """
+        lines = []
+        for thread, stacks in sorted(self.samples.items()):
+            for stack, count in stacks.most_common():
+                lines.append(";".join([thread] + [_frame_name(frame) for frame in stack]) + f" {count}")
+        return "\n".join(lines) + "\n"
+
+    def speedscope(self) -> Dict[str, Any]:
+        """speedscope 文件格式，每个线程一个 sampled profile，权重单位为秒"""
+        frames: List[Dict[str, Any]] = []
+        index: Dict[Frame, int] = {}
+
+        def frame_index(frame: Frame) -> int:
+            if frame not in index:
+                index[frame] = len(frames)
+                frames.append({"name": frame[2], "file": frame[0], "line": frame[1]})
+            return index[frame]
+
+        profiles = []
+        for thread, stacks in sorted(self.samples.items()):
+            samples, weights = [], []
+            for stack, count in stacks.most_common():
+                samples.append([frame_index(frame) for frame in stack])
+                weights.append(count * self.interval)
+            profiles.append({
+                "type": "sampled", "name": thread, "unit": "seconds",
+                "startValue": 0, "endValue": sum(weights), "samples": samples, "weights": weights,
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": f"Story Factory pid {os.getpid()}",
+            "exporter": "storyfactory",
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        }
+
+
+def _stack(frame) -> Stack:
+    """由外到内的调用栈"""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append((code.co_filename, code.co_firstlineno, code.co_name))
+        frame = frame.f_back
+    return tuple(reversed(stack))
+
+
+def _frame_name(frame: Frame) -> str:
+    return f"{frame[2]} ({os.path.basename(frame[0])}:{frame[1]})"
+
+
+# 同一时间只允许一个分析：采样分析开销随线程数增长，cProfile不允许同时启用多个
+_lock = threading.Lock()
+
+
+def sample(duration: float, interval: float) -> SamplingProfile:
+    """对本进程采样duration秒，已有分析在进行时抛出RuntimeError"""
+    if not _lock.acquire(blocking=False):
+        raise RuntimeError("已有性能分析在进行中")
+    try:
+        return SamplingProfile(interval).collect(duration)
+    finally:
+        _lock.release()
+
+
+def check_admin_token(expected: Optional[str]) -> Optional[Tuple[Dict[str, str], int]]:
+    """校验请求头 X-Admin-Token，通过时返回None，否则返回 (错误信息, 状态码)；未设置令牌时管理功能不可用"""
+    if not expected:
+        return {"error": "未设置 STORY_FACTORY_ADMIN_TOKEN，管理接口不可用"}, 404
+    if not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), expected):
+        return {"error": "管理令牌无效"}, 403
+    return None
+
+
+def _top_functions(profile: cProfile.Profile, sort: str, limit: int) -> List[Dict[str, Any]]:
+    stats = pstats.Stats(profile)
+    key = {"cumulative": 4, "tottime": 3, "calls": 2}[sort]
+    rows = sorted(
+        ((func, primitive, calls, tottime, cumtime) for func, (primitive, calls, tottime, cumtime, _) in stats.stats.items()),
+        key=lambda row: -row[key],
+    )
+    return [
+        {
+            "function": f"{name} ({os.path.basename(filename)}:{line})" if line else name,
+            "calls": calls, "primitive_calls": primitive,
+            "tottime_ms": round(tottime * 1000, 3), "cumtime_ms": round(cumtime * 1000, 3),
+        }
+        for (filename, line, name), primitive, calls, tottime, cumtime in rows[:limit]
+    ]
+
+
+def init_app(app: Flask) -> None:
+    """调试模式下支持 ?profile=1：以cProfile分析单个请求，返回 ?sort=cumulative|tottime|calls 排序的前若干个函数
+
+    与 /admin/profile 一样需要在 X-Admin-Token 请求头中提供管理令牌。分析锁只在 teardown_request 中释放，
+    请求在任何阶段失败都不会使锁一直被占用。
+    """
+
+    # 应用级的URL预处理函数先于蓝图的执行，分析结果包括载入项目图的时间
+    @app.url_value_preprocessor
+    def _start_profile(endpoint, values):
+        if not app.debug or request.args.get("profile") != "1":
+            return
+        error = check_admin_token(ADMIN_TOKEN)
+        if error is not None:
+            abort(make_response(jsonify(error[0]), error[1]))
+        sort = request.args.get("sort", "cumulative")
+        if sort not in ("cumulative", "tottime", "calls"):
+            abort(make_response(jsonify({"error": "sort 必须为 cumulative、tottime 或 calls"}), 400))
+        if not _lock.acquire(blocking=False):
+            abort(make_response(jsonify({"error": "已有性能分析在进行中"}), 409))
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            # 进程中已启用了其他分析器（如调试器或覆盖率统计）
+            _lock.release()
+            abort(make_response(jsonify({"error": str(e)}), 409))
+        g.profile = (profile, sort, time.perf_counter())
+
+    @app.after_request
+    def _finish_profile(response):
+        entry = g.get("profile")
+        if entry is None:
+            return response
+        profile, sort, started = entry
+        profile.disable()
+        return jsonify({
+            "status": response.status_code,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 3),
+            "sort": sort,
+            "functions": _top_functions(profile, sort, PROFILE_TOP_FUNCTIONS),
+        })
+
+    @app.teardown_request
+    def _end_profile(exc):
+        # 无论after_request是否执行（视图或其他钩子抛出异常时不会执行）都在这里结束分析并释放锁
+        entry = g.pop("profile", None)
+        if entry is not None:
+            entry[0].disable()
+            _lock.release()
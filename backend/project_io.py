@@ -0,0 +1,201 @@
+import codecs
+import gzip
+import json
+import zlib
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Tuple
+
+from backend.config import PROJECT_IO_CHUNK_SIZE
+
+# .storyfactory 文件中的图数据字段
+PROJECT_SECTIONS = ("nodes", "edges")
+
+_WHITESPACE = " \t\n\r"
+_GZIP_MAGIC = b"\x1f\x8b"
+
+
+def iter_project_json(nodes: Iterable[Dict[str, Any]], edges: Iterable[Dict[str, Any]]) -> Iterator[bytes]:
+    """逐个序列化节点和边，按块输出 {"nodes": [...], "edges": [...]} 文档"""
+    encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    parts: List[str] = []
+    size = 0
+
+    def sections():
+        yield '{"nodes":['
+        for index, node in enumerate(nodes):
+            yield ("," if index else "") + encoder.encode(node)
+        yield '],"edges":['
+        for index, edge in enumerate(edges):
+            yield ("," if index else "") + encoder.encode(edge)
+        yield "]}"
+
+    for part in sections():
+        parts.append(part)
+        size += len(part)
+        if size >= PROJECT_IO_CHUNK_SIZE:
+            yield "".join(parts).encode("utf-8")
+            parts, size = [], 0
+    if parts:
+        yield "".join(parts).encode("utf-8")
+
+
+def gzip_chunks(chunks: Iterable[bytes], level: int = 6) -> Iterator[bytes]:
+    """以gzip格式流式压缩数据块"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+class _PrefixedStream:
+    """将已读取的前缀字节放回流的开头"""
+
+    def __init__(self, prefix: bytes, stream: BinaryIO):
+        self._prefix = prefix
+        self._stream = stream
+
+    def read(self, size: int = -1) -> bytes:
+        if self._prefix:
+            data, self._prefix = self._prefix, b""
+            if size < 0:
+                return data + self._stream.read()
+            if len(data) < size:
+                data += self._stream.read(size - len(data))
+            return data
+        return self._stream.read(size)
+
+
+def open_project_stream(stream: BinaryIO) -> BinaryIO:
+    """根据文件头自动识别gzip压缩的项目文件"""
+    head = stream.read(2)
+    stream = _PrefixedStream(head, stream)
+    if head == _GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=stream, mode="rb")
+    return stream
+
+
+class ProjectStreamParser:
+    """增量解析 .storyfactory 文档，逐个产出节点和边，不在内存中保留整个文档"""
+
+    def __init__(self, stream: BinaryIO, chunk_size: int = PROJECT_IO_CHUNK_SIZE):
+        self._stream = stream
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self._json = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _fill(self, minimum: int = 1) -> bool:
+        """读取更多数据，直到缓冲区至少新增minimum个字符或流结束；没有读到新数据时返回False"""
+        if self._pos:
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        initial = len(self._buffer)
+        while len(self._buffer) < initial + minimum and not self._eof:
+            chunk = self._stream.read(self._chunk_size)
+            if not chunk:
+                self._eof = True
+                self._buffer += self._decoder.decode(b"", final=True)
+            else:
+                self._buffer += self._decoder.decode(chunk)
+        return len(self._buffer) > initial
+
+    def _peek(self) -> str:
+        """跳过空白并返回下一个字符，流结束时返回空字符串"""
+        while True:
+            while self._pos < len(self._buffer) and self._buffer[self._pos] in _WHITESPACE:
+                self._pos += 1
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, char: str) -> None:
+        if self._peek() != char:
+            raise ValueError(f"无效的项目文件: 期望 '{char}'")
+        self._pos += 1
+
+    def _value(self) -> Any:
+        """解析一个完整的JSON值，数据不完整时继续读取"""
+        self._peek()
+        while True:
+            try:
+                value, end = self._json.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                # 数据可能尚未完整到达，读取更多后重试（每次至少倍增缓冲区）
+                if not self._fill(max(self._chunk_size, len(self._buffer) - self._pos)):
+                    raise ValueError("无效的项目文件: JSON格式错误")
+                continue
+            # 数字等标量可能被截断，需确认其后还有分隔符
+            if end == len(self._buffer) and not isinstance(value, (dict, list)) and self._fill():
+                continue
+            self._pos = end
+            return value
+
+    def __iter__(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """产出 (字段名, 元素)，字段名为 nodes 或 edges"""
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            key = self._value()
+            if not isinstance(key, str):
+                raise ValueError("无效的项目文件: 字段名必须为字符串")
+            self._expect(":")
+            if key in PROJECT_SECTIONS and self._peek() == "[":
+                self._pos += 1
+                if self._peek() == "]":
+                    self._pos += 1
+                else:
+                    while True:
+                        yield key, self._value()
+                        separator = self._peek()
+                        self._pos += 1
+                        if separator == "]":
+                            break
+                        if separator != ",":
+                            raise ValueError(f"无效的项目文件: {key} 数组格式错误")
+            else:
+                # 忽略未知字段
+                self._value()
+            separator = self._peek()
+            self._pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise ValueError("无效的项目文件: 对象格式错误")
+
+
+def normalize_imported_node(node: Any) -> Dict[str, Any]:
+    """校验并补全导入的节点"""
+    if not isinstance(node, dict) or not isinstance(node.get("id"), str):
+        raise ValueError("无效的节点: 缺少id")
+    node.setdefault("type", "default")
+    node.setdefault("data", {})
+    node.setdefault("position", {"x": 0, "y": 0})
+    return node
+
+
+def normalize_imported_edge(edge: Any) -> Dict[str, Any]:
+    """校验导入的边"""
+    if not isinstance(edge, dict):
+        raise ValueError("无效的边")
+    for key in ("id", "source", "target"):
+        if not isinstance(edge.get(key), str):
+            raise ValueError(f"无效的边: 缺少{key}")
+    return edge
+
+
+def read_project(stream: BinaryIO) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """从（可能gzip压缩的）流中增量读取项目文件，返回校验后的节点和边列表"""
+    nodes: List[Dict[str, Any]] = []
+    edges: List[Dict[str, Any]] = []
+    for section, item in ProjectStreamParser(open_project_stream(stream)):
+        if section == "nodes":
+            nodes.append(normalize_imported_node(item))
+        else:
+            edges.append(normalize_imported_edge(item))
+    return nodes, edges
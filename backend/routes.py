@@ -1,22 +1,216 @@
-from flask import Blueprint, jsonify, request
-from flask_socketio import emit
-from backend.services import NodeService, EdgeService, GenerationService, WorkflowExecutionService
-from backend.extensions import socketio
-
+import math
+import zlib
+from contextlib import ExitStack
+from flask import Blueprint, Response, abort, g, jsonify, request, stream_with_context
+from flask_socketio import emit, join_room, leave_room
+from backend.services import (
+    NodeService, EdgeService, GenerationService, WorkflowExecutionService,
+    BatchService, BatchOperationError, ProjectService, LayoutService, GraphService, LazyService
+)
+from backend.extensions import (
+    socketio, emit_node_event, broadcast, viewport_subscribers,
+    project_scoped, client_projects, graph_room, set_viewport
+)
+from backend.spatial import normalize_bbox, position_of
+from backend.http_cache import conditional_json, graph_etag
+from backend.config import (
+    ADMIN_TOKEN, MAX_PAGE_SIZE, PROFILE_DEFAULT_INTERVAL_MS, PROFILE_MAX_SECONDS, READINESS_LOCK_TIMEOUT,
+)
+from backend.topology import CycleError
+from backend.workspace import workspace
+from backend.database import graph_available
+from backend.metrics import add_readiness_check, readiness, registry
+from backend.tracing import run_trace, span, traces
+from backend.log import get_logger
+from backend import profiler
+
+# 默认图的接口注册在 /api 下，同一组接口也注册在 /api/projects/<project_id> 下作用于指定项目
 api_bp = Blueprint("api", __name__)
+workspace_bp = Blueprint("workspace", __name__)
+# 健康检查和指标，注册在根路径下供负载均衡和Prometheus使用
+ops_bp = Blueprint("ops", __name__)
+
+logger = get_logger(__name__)
+
+# 服务在首次使用时才实例化：导入路由不会创建文本生成器和工作流引擎，也不会导入openai
+node_service = LazyService(NodeService)
+edge_service = LazyService(EdgeService)
+generation_service = LazyService(GenerationService)
+workflow_service = LazyService(WorkflowExecutionService)
+batch_service = LazyService(BatchService)
+project_service = LazyService(ProjectService)
+layout_service = LazyService(LayoutService)
+graph_service = LazyService(GraphService)
+
+
+@api_bp.url_value_preprocessor
+def _open_project(endpoint, values):
+    """项目接口在请求期间将项目图设为当前图，项目未载入时从磁盘载入"""
+    project_id = values.pop("project_id", None) if values else None
+    if project_id is None:
+        return
+    scope = ExitStack()
+    try:
+        scope.enter_context(workspace.open(project_id))
+    except (ValueError, OSError, EOFError) as e:
+        response = jsonify({"error": str(e)})
+        response.status_code = 400
+        abort(response)
+    g.project_scope = scope
+
+
+@api_bp.teardown_request
+def _close_project(exc):
+    scope = g.pop("project_scope", None)
+    if scope is not None:
+        scope.close()
+
+
+@ops_bp.route("/healthz", methods=["GET"])
+def healthz():
+    """存活检查：进程能处理请求即返回200"""
+    return jsonify({"status": "ok"}), 200
+
+
+@ops_bp.route("/readyz", methods=["GET"])
+def readyz():
+    """就绪检查：全部检查通过时返回200，否则返回503"""
+    checks = readiness()
+    ready = all(checks.values())
+    return jsonify({"status": "ok" if ready else "unavailable", "checks": checks}), 200 if ready else 503
+
+
+@ops_bp.route("/metrics", methods=["GET"])
+def metrics():
+    """Prometheus文本格式的指标"""
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
 
-# 实例化服务
-node_service = NodeService()
-edge_service = EdgeService()
-generation_service = GenerationService()
-workflow_service = WorkflowExecutionService()
+@ops_bp.route("/admin/profile", methods=["POST"])
+def profile_process():
+    """对本进程的全部线程采样 ?seconds= 秒（默认10），每 ?interval_ms= 毫秒一次，
+    ?format=speedscope（默认）返回speedscope JSON，?format=collapsed 返回折叠栈文本。
+    需要在 X-Admin-Token 请求头中提供 STORY_FACTORY_ADMIN_TOKEN"""
+    error = profiler.check_admin_token(ADMIN_TOKEN)
+    if error is not None:
+        return jsonify(error[0]), error[1]
+    try:
+        seconds = float(request.args.get("seconds", 10))
+        interval_ms = float(request.args.get("interval_ms", PROFILE_DEFAULT_INTERVAL_MS))
+    except ValueError:
+        return jsonify({"error": "seconds 和 interval_ms 必须为数字"}), 400
+    if not 0 < seconds <= PROFILE_MAX_SECONDS or not 1 <= interval_ms <= 1000:
+        return jsonify({"error": f"seconds 的范围为 (0, {PROFILE_MAX_SECONDS}]，interval_ms 的范围为 [1, 1000]"}), 400
+    output = request.args.get("format", "speedscope")
+    if output not in ("speedscope", "collapsed"):
+        return jsonify({"error": "format 必须为 speedscope 或 collapsed"}), 400
+    try:
+        result = profiler.sample(seconds, interval_ms / 1000)
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 409
+    if output == "collapsed":
+        return Response(result.collapsed(), mimetype="text/plain")
+    return jsonify(result.speedscope()), 200
+
+
+# 能在限定时间内取得默认图的读锁说明图存储可用；写锁被长时间持有时返回未就绪而不阻塞 /readyz
+add_readiness_check("graph", lambda: graph_available(READINESS_LOCK_TIMEOUT))
+
+
+@workspace_bp.route("/projects", methods=["GET"])
+def list_projects():
+    """列出磁盘上和已载入内存的全部项目"""
+    return jsonify({"projects": workspace.list_projects()}), 200
+
+
+def _split_arg(name):
+    """解析逗号分隔的查询参数"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def _parse_bbox(value):
+    """解析 x1,y1,x2,y2 形式的矩形范围"""
+    try:
+        coords = [float(item) for item in value]
+    except (TypeError, ValueError):
+        raise ValueError("bbox必须为4个数值: x1,y1,x2,y2")
+    # float()接受inf和nan，网格索引无法处理
+    if len(coords) != 4 or not all(math.isfinite(coord) for coord in coords):
+        raise ValueError("bbox必须为4个数值: x1,y1,x2,y2")
+    return normalize_bbox(*coords)
+
+
+def _parse_list_args():
+    """解析列表查询参数: limit, after, fields, types"""
+    limit = request.args.get("limit")
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            raise ValueError("limit必须为整数")
+        if limit <= 0:
+            raise ValueError("limit必须大于0")
+        limit = min(limit, MAX_PAGE_SIZE)
+    return {
+        "limit": limit,
+        "after": request.args.get("after"),
+        "fields": _split_arg("fields"),
+        "types": _split_arg("types"),
+    }
+
+
+def _list_response(kind, db, list_func, with_bbox=False):
+    """构造支持分页、字段裁剪和条件请求的列表响应"""
+    try:
+        args = _parse_list_args()
+        if with_bbox and request.args.get("bbox"):
+            args["bbox"] = _parse_bbox(request.args["bbox"].split(","))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # ETag和响应体来自同一快照
+    snapshot = db.snapshot()
+    page = {}
+
+    def build_page():
+        page["items"] = list_func(snapshot=snapshot, **args)
+        return page["items"]
+
+    etag = graph_etag(kind, db.generation, snapshot.version, zlib.crc32(request.query_string))
+    try:
+        response = conditional_json(etag, build_page)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # 返回满页时提供下一页游标
+    items = page.get("items")
+    if args["limit"] is not None and items and len(items) == args["limit"]:
+        response.headers["X-Next-Cursor"] = items[-1]["id"]
+    return response
+
+
+def _current_position(node_id):
+    """获取节点当前坐标"""
+    node = node_service.get_node(node_id)
+    return position_of(node) if node else None
+
+
+def _broadcast_node_edit(node, old_position=None):
+    """推送节点编辑：全图客户端收到完整节点列表，可视区域客户端只收到可见节点的变更"""
+    broadcast("nodes_update", {"nodes": node_service.get_all_nodes()}, to_graph_room=True)
+    for sid in viewport_subscribers(old_position, position_of(node)):
+        socketio.emit("node_changed", {"node": node}, to=sid)
 
 
 # 节点相关路由
 @api_bp.route("/nodes", methods=["GET"])
 def get_nodes():
-    """获取所有节点"""
-    return jsonify(node_service.get_all_nodes())
+    """获取节点，支持 ?limit=&after= 分页、?fields= 字段裁剪、?types= 类型过滤
+    和 ?bbox=x1,y1,x2,y2 范围查询"""
+    return _list_response("nodes", node_service.db, node_service.get_all_nodes, with_bbox=True)
 
 
 @api_bp.route("/nodes", methods=["POST"])
@@ -25,17 +219,72 @@ def create_node():
     node_data = request.get_json()
     try:
         new_node = node_service.create_node(node_data)
-        socketio.emit("nodes_update", {"nodes": node_service.get_all_nodes()})
+        broadcast("nodes_update", {"nodes": node_service.get_all_nodes()})
         return jsonify(new_node), 201
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
 
+@api_bp.route("/nodes/positions/bulk", methods=["POST"])
+def bulk_update_positions():
+    """在一次向量化操作中修改多个节点的坐标，只推送一次更新
+
+    请求体: {"op": ..., "ids": [...]}，ids省略时作用于全部节点，op为:
+      set: "positions": [[x, y], ...]，与ids一一对应
+      translate: "dx", "dy"
+      scale: "sx", "sy"（默认同sx）, "origin": [x, y]（默认原点）
+      snap: "grid" 网格间距
+      fit: "bounds": [x1, y1, x2, y2]，等比缩放并居中到该范围
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        changed = node_service.transform_positions(data)
+    except KeyError as e:
+        return jsonify({"error": f"Node {e.args[0]} not found"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    if changed:
+        broadcast("nodes_update", {"nodes": node_service.get_all_nodes()})
+    return jsonify({"updated": len(changed)}), 200
+
+
+def _broadcast_delta(**changes):
+    """推送一次图的增量事件，只包含非空的部分：
+    added_nodes / added_edges 为新增的节点和边，deleted_nodes / deleted_edges 为被删除的ID"""
+    payload = {key: value for key, value in changes.items() if value}
+    if payload:
+        broadcast("graph_delta", payload)
+
+
+@api_bp.route("/nodes/delete", methods=["POST"])
+def delete_nodes():
+    """删除一组节点（如框选的节点），默认同时删除与它们相连的边，只推送一次增量事件
+
+    请求体: {"ids": [...], "cascade": true}
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        result = node_service.delete_nodes(data.get("ids"), cascade=data.get("cascade", True) is not False)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    _broadcast_delta(deleted_nodes=result["nodes"], deleted_edges=result["edges"])
+    return jsonify({"deleted_nodes": result["nodes"], "deleted_edges": result["edges"]}), 200
+
+
 @api_bp.route("/nodes/<id>", methods=["DELETE"])
 def delete_node(id):
-    """删除节点"""
+    """删除节点，?cascade=1 时在同一操作中删除与其相连的边"""
+    if request.args.get("cascade") in ("1", "true"):
+        result = node_service.delete_nodes([id])
+        if not result["nodes"]:
+            return jsonify({"error": f"Node {id} not found"}), 404
+        _broadcast_delta(deleted_nodes=result["nodes"], deleted_edges=result["edges"])
+        return jsonify({"message": f"Node {id} deleted", "deleted_edges": result["edges"]}), 200
+    
     if node_service.delete_node(id):
-        socketio.emit("nodes_update", {"nodes": node_service.get_all_nodes()})
+        broadcast("nodes_update", {"nodes": node_service.get_all_nodes()})
         return jsonify({"message": f"Node {id} deleted"}), 200
     return jsonify({"error": f"Node {id} not found"}), 404
 
@@ -44,9 +293,10 @@ def delete_node(id):
 def update_node(id):
     """更新节点"""
     node_data = request.get_json()
+    old_position = _current_position(id)
     updated_node = node_service.update_node(id, node_data)
     if updated_node:
-        socketio.emit("nodes_update", {"nodes": node_service.get_all_nodes()})
+        _broadcast_node_edit(updated_node, old_position)
         return jsonify(updated_node), 200
     return jsonify({"error": f"Node {id} not found"}), 404
 
@@ -58,7 +308,7 @@ def update_node_text(id):
     new_text = text_data.get("text", "")
     updated_node = node_service.update_node_text(id, new_text)
     if updated_node:
-        socketio.emit("nodes_update", {"nodes": node_service.get_all_nodes()})
+        _broadcast_node_edit(updated_node)
         return jsonify(updated_node), 200
     return jsonify({"error": f"Node {id} not found"}), 404
 
@@ -66,8 +316,8 @@ def update_node_text(id):
 # 边相关路由
 @api_bp.route("/edges", methods=["GET"])
 def get_edges():
-    """获取所有边"""
-    return jsonify(edge_service.get_all_edges())
+    """获取边，支持 ?limit=&after= 分页、?fields= 字段裁剪和 ?types= 类型过滤"""
+    return _list_response("edges", edge_service.db, edge_service.get_all_edges)
 
 
 @api_bp.route("/edges", methods=["POST"])
@@ -76,12 +326,14 @@ def create_edge():
     try:
         edge_data = request.get_json()
         new_edge = edge_service.create_edge(edge_data)
-        socketio.emit("edges_update", {"edges": edge_service.get_all_edges()})
+        broadcast("edges_update", {"edges": edge_service.get_all_edges()})
         return jsonify(new_edge), 201
+    except CycleError as e:
+        return jsonify({"error": str(e)}), 409
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
     except Exception as e:
-        print(f"Error in create_edge: {e}")
+        logger.exception("Error in create_edge")
         return jsonify({"error": str(e)}), 500
 
 
@@ -89,7 +341,10 @@ def create_edge():
 def update_edge(id):
     """更新边"""
     edge_data = request.get_json()
-    updated_edge = edge_service.update_edge(id, edge_data)
+    try:
+        updated_edge = edge_service.update_edge(id, edge_data)
+    except CycleError as e:
+        return jsonify({"error": str(e)}), 409
     if updated_edge:
         return jsonify(updated_edge), 200
     return jsonify({"error": f"Edge {id} not found"}), 404
@@ -107,11 +362,131 @@ def delete_edge(id):
 def delete_related_edges(id):
     """删除与节点相关的所有边"""
     if edge_service.delete_related_to_node(id):
-        socketio.emit("edges_update", {"edges": edge_service.get_all_edges()})
+        broadcast("edges_update", {"edges": edge_service.get_all_edges()})
         return jsonify({"message": f"Edges related to node {id} deleted"}), 200
     return jsonify({"message": "No edges were deleted"}), 200
 
 
+# 图结构路由
+def _related_nodes_response(node_id, forward, key):
+    """祖先/后代查询，支持 ?depth= 限制最大距离"""
+    depth = request.args.get("depth")
+    if depth is not None:
+        try:
+            depth = int(depth)
+        except ValueError:
+            depth = 0
+        if depth < 1:
+            return jsonify({"error": "depth必须为正整数"}), 400
+    related = graph_service.related_nodes(node_id, forward, depth)
+    if related is None:
+        return jsonify({"error": f"Node {node_id} not found"}), 404
+    return jsonify({"id": node_id, key: related}), 200
+
+
+@api_bp.route("/nodes/<id>/ancestors", methods=["GET"])
+def get_ancestors(id):
+    """获取节点的全部祖先（可以到达该节点的节点）及距离"""
+    return _related_nodes_response(id, False, "ancestors")
+
+
+@api_bp.route("/nodes/<id>/descendants", methods=["GET"])
+def get_descendants(id):
+    """获取节点的全部后代（从该节点可以到达的节点）及距离"""
+    return _related_nodes_response(id, True, "descendants")
+
+
+@api_bp.route("/subgraph/clone", methods=["POST"])
+def clone_subgraph():
+    """复制一组节点及其内部的边（如故事模板），新节点和边使用新的ID，只推送一次增量事件
+
+    请求体: {"ids": [...], "dx": 0, "dy": 0}
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        result = graph_service.clone_subgraph(data)
+    except KeyError as e:
+        return jsonify({"error": f"Node {e.args[0]} not found"}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    _broadcast_delta(added_nodes=result["nodes"], added_edges=result["edges"])
+    return jsonify(result), 201
+
+
+@api_bp.route("/graph/validate", methods=["GET"])
+def validate_graph():
+    """检查图中的环、从开始节点不可达的节点和悬空边"""
+    return jsonify(graph_service.validate()), 200
+
+
+# 批量操作路由
+@api_bp.route("/batch", methods=["POST"])
+def apply_batch():
+    """原子地执行一组节点/边的创建、更新和删除操作，只推送一次更新"""
+    data = request.get_json(silent=True) or {}
+    try:
+        result = batch_service.apply(data.get("operations"))
+    except BatchOperationError as e:
+        return jsonify({"error": str(e), "index": e.index}), 400
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    if result["nodes_changed"]:
+        broadcast("nodes_update", {"nodes": node_service.get_all_nodes()})
+    if result["edges_changed"]:
+        broadcast("edges_update", {"edges": edge_service.get_all_edges()})
+    return jsonify({"results": result["results"], "id_map": result["id_map"]}), 200
+
+
+# 自动布局路由
+@api_bp.route("/layout", methods=["POST"])
+def apply_layout():
+    """按边的连接关系对全部节点做分层（Sugiyama式）布局，一次写入全部坐标并只推送一次更新
+
+    请求体（均可省略）: {"direction": "LR"|"TB", "layer_spacing": 层间距,
+    "node_spacing": 层内节点间距, "origin": [x, y]}
+    """
+    data = request.get_json(silent=True) or {}
+    try:
+        result = layout_service.apply_layout(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    if result["updated"]:
+        broadcast("nodes_update", {"nodes": node_service.get_all_nodes()})
+    return jsonify(result), 200
+
+
+# 项目导入导出路由
+@api_bp.route("/project/export", methods=["GET"])
+def export_project():
+    """流式导出项目文件，?gzip=1 时导出gzip压缩的文件"""
+    compress = request.args.get("gzip") in ("1", "true")
+    filename = request.args.get("filename", "project").replace('"', "")
+    filename += ".storyfactory.gz" if compress else ".storyfactory"
+    
+    response = Response(
+        stream_with_context(project_service.export_chunks(compress=compress)),
+        mimetype="application/gzip" if compress else "application/json",
+    )
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
+
+
+@api_bp.route("/project/import", methods=["POST"])
+def import_project():
+    """流式导入项目文件（支持gzip压缩），替换当前的节点和边"""
+    try:
+        counts = project_service.import_stream(request.stream)
+    except (ValueError, OSError, EOFError) as e:
+        return jsonify({"error": f"导入失败: {e}"}), 400
+    
+    broadcast("nodes_update", {"nodes": node_service.get_all_nodes()})
+    broadcast("edges_update", {"edges": edge_service.get_all_edges()})
+    return jsonify({"message": "项目已导入", **counts}), 200
+
+
 # 生成相关路由
 @api_bp.route("/generate", methods=["POST"])
 def generate_text():
@@ -125,7 +500,7 @@ def generate_text():
         generated_text = generation_service.generate_text(user_content)
         return jsonify({"generated_text": generated_text}), 200
     except Exception as e:
-        print(f"Error in generate_text: {e}")
+        logger.exception("Error in generate_text")
         return jsonify({"error": str(e)}), 500
 
 
@@ -149,7 +524,7 @@ def generate_text_basic_straight():
             "source_node_id": source_id
         })
     except Exception as e:
-        print(f"Error in generate_text_basic_straight: {e}")
+        logger.exception("Error in generate_text_basic_straight")
         return jsonify({"error": str(e)}), 500
 
 
@@ -171,7 +546,7 @@ def generate_from_node(node_id):
             "source_node_id": source_id
         })
     except Exception as e:
-        print(f"Error in generate_from_node: {e}")
+        logger.exception("Error in generate_from_node")
         return jsonify({"error": str(e)}), 500
 
 
@@ -183,23 +558,27 @@ def execute_workflow():
         data = request.get_json() or {}
         start_node_id = data.get("start_node_id")
         
-        result = workflow_service.execute_workflow(start_node_id)
-        
-        # 通知前端工作流执行完成
-        if result.get("success"):
-            socketio.emit("workflow_completed", {
-                "success": True,
-                "executed_nodes": list(result.get("executed_nodes", {}).keys())
-            })
-        else:
-            socketio.emit("workflow_error", {
-                "error": result.get("error", "Unknown error"),
-                "executed_nodes": list(result.get("executed_nodes", {}).keys())
-            })
+        # 广播也计入本次运行的追踪
+        with run_trace("workflow", start_node_id=start_node_id) as trace:
+            result = workflow_service.execute_workflow(start_node_id)
+            
+            # 通知前端工作流执行完成
+            with span("broadcast", "socketio"):
+                if result.get("success"):
+                    broadcast("workflow_completed", {
+                        "success": True,
+                        "executed_nodes": list(result.get("executed_nodes", {}).keys())
+                    })
+                else:
+                    broadcast("workflow_error", {
+                        "error": result.get("error", "Unknown error"),
+                        "executed_nodes": list(result.get("executed_nodes", {}).keys())
+                    })
+        result["run_id"] = trace.id
             
         return jsonify(result), 200
     except Exception as e:
-        print(f"Error in execute_workflow: {e}")
+        logger.exception("Error in execute_workflow")
         return jsonify({"error": str(e), "success": False}), 500
 
 
@@ -213,6 +592,21 @@ def get_workflow_status():
         return jsonify({"error": str(e)}), 500
 
 
+@api_bp.route("/workflow/runs", methods=["GET"])
+def get_workflow_runs():
+    """本进程最近的运行，由新到旧"""
+    return jsonify([trace.summary() for trace in traces.recent()]), 200
+
+
+@api_bp.route("/workflow/runs/<run_id>/trace", methods=["GET"])
+def get_workflow_run_trace(run_id):
+    """运行的追踪记录（Chrome trace event 格式），可在 chrome://tracing 或 Perfetto 中打开"""
+    trace = traces.get(run_id)
+    if trace is None:
+        return jsonify({"error": "运行不存在或已过期"}), 404
+    return jsonify(trace.to_chrome()), 200
+
+
 @api_bp.route("/nodes/<node_id>/execute", methods=["POST"])
 def execute_node(node_id):
     """执行单个节点"""
@@ -220,42 +614,74 @@ def execute_node(node_id):
         data = request.get_json() or {}
         input_data = data.get("input_data", {})
         
-        result = workflow_service.execute_node(node_id, input_data)
-        
-        # 通知前端节点执行完成
-        if result.get("status") == "completed":
-            socketio.emit("node_executed", {
-                "node_id": node_id,
-                "success": True,
-                "output": result.get("output")
-            })
-        else:
-            socketio.emit("node_execution_error", {
-                "node_id": node_id,
-                "error": result.get("error", "Unknown error")
-            })
+        with run_trace("node", node_id=node_id) as trace:
+            result = workflow_service.execute_node(node_id, input_data)
+            
+            # 通知前端节点执行完成
+            with span("broadcast", "socketio"):
+                if result.get("status") == "completed":
+                    broadcast("node_executed", {
+                        "node_id": node_id,
+                        "success": True,
+                        "output": result.get("output")
+                    })
+                else:
+                    broadcast("node_execution_error", {
+                        "node_id": node_id,
+                        "error": result.get("error", "Unknown error")
+                    })
+        result["run_id"] = trace.id
             
         return jsonify(result), 200
     except Exception as e:
-        print(f"Error in execute_node: {e}")
+        logger.exception("Error in execute_node")
         return jsonify({"error": str(e)}), 500
 
 
 # Socket.IO事件处理
 @socketio.on("node_move")
+@project_scoped
 def handle_node_move(data):
     """处理节点移动事件"""
     node_id = data.get("nodeId")
     x = data.get("x")
     y = data.get("y")
-    if node_service.update_node_position(node_id, x, y):
-        socketio.emit("node_updated", {"nodeId": node_id, "x": x, "y": y}, include_self=False)
+    old_position = _current_position(node_id)
+    node = node_service.update_node_position(node_id, x, y)
+    if node:
+        emit_node_event(
+            "node_updated", {"nodeId": node_id, "x": x, "y": y},
+            old_position, position_of(node), skip_sid=request.sid
+        )
 
 
 @socketio.on("node_status_update")
+@project_scoped
 def handle_node_status_update(data):
     """处理节点状态更新事件"""
     node_id = data.get("nodeId")
     status = data.get("status")
-    if node_service.update_node_status(node_id, status):
-        socketio.emit("node_status_push", {"nodeId": node_id, "status": status})
+    node = node_service.update_node_status(node_id, status)
+    if node:
+        emit_node_event("node_status_push", {"nodeId": node_id, "status": status}, position_of(node))
+
+
+@socketio.on("viewport_subscribe")
+@project_scoped
+def handle_viewport_subscribe(data):
+    """订阅可视区域 {"bbox": [x1, y1, x2, y2]}，此后只接收区域内节点的移动和编辑事件"""
+    try:
+        bbox = _parse_bbox((data or {}).get("bbox"))
+    except ValueError as e:
+        emit("viewport_error", {"error": str(e)})
+        return
+    set_viewport(request.sid, bbox)
+    leave_room(graph_room(client_projects.get(request.sid)))
+    emit("viewport_nodes", {"bbox": list(bbox), "nodes": node_service.get_all_nodes(bbox=bbox)})
+
+
+@socketio.on("viewport_unsubscribe")
+def handle_viewport_unsubscribe():
+    """取消可视区域订阅，恢复接收全部节点事件"""
+    set_viewport(request.sid, None)
+    join_room(graph_room(client_projects.get(request.sid)))
@@ -0,0 +1,203 @@
+"""
+Story Factory 后端启动入口
+
+开发模式（默认）与直接运行 backend/app.py 相同：Werkzeug开发服务器、调试和自动重载。
+生产模式（--prod）关闭调试和重载，使用eventlet或gevent的协程服务器处理HTTP和
+WebSocket连接，并直接提供预先构建的 frontend/build。
+
+    python -m backend.server --prod [--host 0.0.0.0] [--port 5000] [--async-mode eventlet]
+
+多进程模式（--prod --workers N）由监督进程启动消息总线代理（backend/bus.py）和N个
+工作进程，工作进程通过SO_REUSEPORT共同监听同一端口，由内核分配连接。
+Socket.IO广播经总线转发到所有工作进程，图的修改经总线同步（见 backend/cluster.py）。
+多进程模式只支持WebSocket传输：轮询请求可能被分配到不同的进程。
+"""
+import argparse
+import importlib.util
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.config import (
+    DEBUG, PORT, PROD_HOST, PROD_ASYNC_MODES, PROD_MAX_CONNECTIONS, PROD_LISTEN_BACKLOG, STATIC_FOLDER
+)
+
+
+def select_async_mode(preferred=None):
+    """选择已安装的异步服务器，都未安装时返回None"""
+    for mode in (preferred,) if preferred else PROD_ASYNC_MODES:
+        if importlib.util.find_spec(mode) is not None:
+            return mode
+    return None
+
+
+def _monkey_patch(async_mode):
+    """在导入应用之前替换标准库的阻塞调用，使线程锁、socket等与协程协作"""
+    if async_mode == "eventlet":
+        import eventlet
+        eventlet.monkey_patch()
+    elif async_mode == "gevent":
+        from gevent import monkey
+        monkey.patch_all()
+
+
+def frontend_build_dir():
+    """预先构建的前端目录（npm run build 的输出）"""
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), STATIC_FOLDER))
+
+
+def _server_options(async_mode):
+    """各异步服务器限制同时处理的连接数的参数"""
+    if async_mode == "eventlet":
+        return {"max_size": PROD_MAX_CONNECTIONS}
+    return {"spawn": PROD_MAX_CONNECTIONS}
+
+
+def _check_production(async_mode):
+    """检查生产模式的依赖，返回选用的异步服务器，缺少时退出"""
+    async_mode = select_async_mode(async_mode)
+    if async_mode is None:
+        print(f"错误: 生产模式需要安装 {' 或 '.join(PROD_ASYNC_MODES)}，例如 pip install gevent")
+        sys.exit(1)
+    if not os.path.exists(os.path.join(frontend_build_dir(), "index.html")):
+        print(f"错误: 未找到前端构建 {frontend_build_dir()}，请先在 frontend 目录运行 npm run build")
+        sys.exit(1)
+    return async_mode
+
+
+def _reuseport_listener(host, port):
+    """创建设置了SO_REUSEPORT的监听socket，多个工作进程可同时监听同一端口"""
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+    listener.bind((host, port))
+    listener.listen(PROD_LISTEN_BACKLOG)
+    return listener
+
+
+def _serve_listener(app, listener, async_mode):
+    """在已创建的监听socket上运行协程服务器"""
+    if async_mode == "eventlet":
+        import eventlet.wsgi
+        eventlet.wsgi.server(listener, app, log_output=False, **_server_options(async_mode))
+        return
+    from gevent import pywsgi
+    options = _server_options(async_mode)
+    if importlib.util.find_spec("geventwebsocket") is not None:
+        from geventwebsocket.handler import WebSocketHandler
+        options["handler_class"] = WebSocketHandler
+    pywsgi.WSGIServer(listener, app, log=None, **options).serve_forever()
+
+
+def run_production(host, port, async_mode=None, bus=None):
+    """单进程生产模式；bus为消息总线地址时作为多进程模式的工作进程运行"""
+    async_mode = _check_production(async_mode)
+    _monkey_patch(async_mode)
+
+    from backend.app import create_app
+    from backend.extensions import socketio
+    from backend.log import get_logger
+
+    logger = get_logger(__name__)
+    url = f"http://{host}:{port}"
+
+    if bus is not None:
+        from backend.cluster import join
+
+        app = create_app(async_mode=async_mode, client_manager=join(bus))
+        app.config["DEBUG"] = False
+        logger.info("Story Factory 工作进程已启动", extra={"async_mode": async_mode, "url": url})
+        _serve_listener(app, _reuseport_listener(host, port), async_mode)
+        return
+
+    app = create_app(async_mode=async_mode)
+    app.config["DEBUG"] = False
+    logger.info("Story Factory 生产模式已启动", extra={"async_mode": async_mode, "url": url})
+    socketio.run(app, host=host, port=port, debug=False, use_reloader=False, log_output=False,
+                 **_server_options(async_mode))
+
+
+def run_workers(host, port, workers, async_mode=None):
+    """多进程模式：启动消息总线代理和workers个工作进程，任一工作进程退出时全部停止"""
+    async_mode = _check_production(async_mode)
+    from backend.bus import BusBroker
+    from backend.log import configure, get_logger
+    from backend.workspace import workspace
+
+    # 监督进程不创建应用，需要自行启用日志写出
+    configure()
+    logger = get_logger(__name__)
+
+    with tempfile.TemporaryDirectory(prefix="storyfactory-") as directory:
+        # 项目不再被任何工作进程载入时，代理把共享副本写回项目目录后丢弃
+        broker = BusBroker(os.path.join(directory, "bus.sock"), persist=workspace.write).start()
+        command = [sys.executable, "-m", "backend.server", "--prod", "--host", host, "--port", str(port),
+                   "--async-mode", async_mode, "--bus", broker.path]
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+        processes = [subprocess.Popen(command, cwd=root) for _ in range(workers)]
+        logger.info("Story Factory 多进程模式已启动", extra={
+            "workers": workers, "async_mode": async_mode, "url": f"http://{host}:{port}",
+            "worker_pids": [process.pid for process in processes],
+        })
+
+        def stop(signum, frame):
+            raise KeyboardInterrupt
+        signal.signal(signal.SIGTERM, stop)
+        try:
+            while all(process.poll() is None for process in processes):
+                time.sleep(0.5)
+            logger.error("有工作进程已退出，停止全部工作进程", extra={
+                "exit_codes": {process.pid: process.returncode for process in processes if process.returncode is not None},
+            })
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for process in processes:
+                if process.poll() is None:
+                    process.terminate()
+            for process in processes:
+                try:
+                    process.wait(timeout=10)
+                except subprocess.TimeoutExpired:
+                    process.kill()
+            broker.stop()
+
+
+def run_development(host, port):
+    from backend.app import create_app
+    from backend.extensions import socketio
+
+    app = create_app()
+    socketio.run(app, host=host, port=port, debug=DEBUG)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Story Factory 后端服务")
+    parser.add_argument("--prod", action="store_true", help="生产模式：协程服务器、关闭调试并提供前端构建")
+    parser.add_argument("--host", help=f"监听地址，开发模式默认127.0.0.1，生产模式默认{PROD_HOST}")
+    parser.add_argument("--port", type=int, default=PORT, help="监听端口")
+    parser.add_argument("--async-mode", choices=PROD_ASYNC_MODES, help="生产模式使用的异步服务器")
+    parser.add_argument("--workers", type=int, default=1, help="生产模式的工作进程数，大于1时为多进程模式")
+    parser.add_argument("--bus", help=argparse.SUPPRESS)  # 工作进程连接的消息总线，由监督进程传入
+    args = parser.parse_args(argv)
+
+    if args.workers < 1:
+        parser.error("--workers 至少为1")
+    if (args.workers > 1 or args.bus) and not args.prod:
+        parser.error("多进程模式需要同时指定 --prod")
+    if args.prod and args.workers > 1:
+        run_workers(args.host or PROD_HOST, args.port, args.workers, args.async_mode)
+    elif args.prod:
+        run_production(args.host or PROD_HOST, args.port, args.async_mode, bus=args.bus)
+    else:
+        run_development(args.host or "127.0.0.1", args.port)
+
+
+if __name__ == "__main__":
+    main()
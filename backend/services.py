@@ -1,21 +1,171 @@
-from typing import Dict, List, Any, Optional, Tuple
-from backend.database import NodeDatabase, EdgeDatabase
+import copy
+import threading
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Any, Optional, Tuple
+import numpy as np
+from backend.database import NodeDatabase, EdgeDatabase, transaction, graph_snapshot
 from backend.models import Node, Edge
+from backend.persistent import SnapshotTable
+from backend.layout import DIRECTIONS, layered_layout
+from backend.topology import TopologyIndex
+from backend.config import LAYOUT_LAYER_SPACING, LAYOUT_NODE_SPACING
 from backend.api_generate import Generator
+from backend.project_io import iter_project_json, gzip_chunks, read_project
+from backend.metrics import workflow_duration, workflow_runs
 
 # 移除循环导入
 # from backend.execution_engine import WorkflowEngine, NodeStatus
 
 
+def _project(item: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """按字段列表裁剪对象，支持 data.label 形式的二级字段，id始终保留"""
+    if not fields:
+        return item
+    projected: Dict[str, Any] = {"id": item["id"]}
+    for field in fields:
+        key, _, sub_key = field.partition(".")
+        if key not in item:
+            continue
+        if sub_key:
+            value = item[key]
+            if isinstance(value, dict) and sub_key in value:
+                projected.setdefault(key, {})[sub_key] = value[sub_key]
+        else:
+            projected[key] = item[key]
+    return projected
+
+
+def _select(
+    table: SnapshotTable,
+    items: Iterable[Any],
+    limit: Optional[int] = None,
+    after: Optional[str] = None,
+    fields: Optional[List[str]] = None,
+    types: Optional[List[str]] = None,
+) -> List[Dict[str, Any]]:
+    """对table中的记录按类型过滤、游标分页，并转换为字典后裁剪字段；items为快照时按索引直接定位游标"""
+    if after is not None:
+        if isinstance(items, SnapshotTable):
+            if after not in items:
+                raise ValueError(f"无效的分页游标: {after}")
+            items = items.iter_after(after)
+        else:
+            items = list(items)
+            start = next((i + 1 for i, item in enumerate(items) if item.id == after), -1)
+            if start < 0:
+                raise ValueError(f"无效的分页游标: {after}")
+            items = items[start:]
+
+    type_set = set(types) if types else None
+    selected = []
+    for item in items:
+        if type_set is not None and item.type not in type_set:
+            continue
+        selected.append(_project(table.to_dict(item), fields))
+        if limit is not None and len(selected) >= limit:
+            break
+    return selected
+
+
+def _number(params: Dict[str, Any], key: str, default: Optional[float] = None) -> float:
+    """读取数值参数"""
+    value = params.get(key, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise ValueError(f"{key}必须为数值")
+    return float(value)
+
+
+def _number_list(params: Dict[str, Any], key: str, length: int) -> List[float]:
+    """读取定长数值列表参数"""
+    value = params.get(key)
+    if not isinstance(value, list) or len(value) != length:
+        raise ValueError(f"{key}必须为{length}个数值")
+    return [_number({key: item}, key) for item in value]
+
+
+def _position_transform(params: Dict[str, Any], count: Optional[int]):
+    """根据批量坐标请求构造 (k, 2) 坐标数组上的向量化变换"""
+    op = params.get("op")
+    if op == "set":
+        positions = params.get("positions")
+        if count is None or not isinstance(positions, list) or len(positions) != count:
+            raise ValueError("set操作需要与ids等长的positions")
+        coords = np.array([_number_list({"positions": p}, "positions", 2) for p in positions]).reshape(-1, 2)
+        return lambda current: coords
+    if op == "translate":
+        offset = np.array([_number(params, "dx", 0), _number(params, "dy", 0)])
+        return lambda current: current + offset
+    if op == "scale":
+        sx = _number(params, "sx")
+        factor = np.array([sx, _number(params, "sy", sx)])
+        origin = np.array(_number_list(params, "origin", 2) if "origin" in params else [0.0, 0.0])
+        return lambda current: (current - origin) * factor + origin
+    if op == "snap":
+        grid = _number(params, "grid")
+        if grid <= 0:
+            raise ValueError("grid必须大于0")
+        return lambda current: np.round(current / grid) * grid
+    if op == "fit":
+        x1, y1, x2, y2 = _number_list(params, "bounds", 4)
+        lower = np.array([min(x1, x2), min(y1, y2)])
+        target = np.array([abs(x2 - x1), abs(y2 - y1)])
+    
+        def fit(current):
+            valid = current[~np.isnan(current[:, 0])]
+            if not len(valid):
+                return current
+            low, size = valid.min(axis=0), np.ptp(valid, axis=0)
+            # 等比缩放到目标范围内并居中
+            ratios = [t / s for t, s in zip(target, size) if s > 0]
+            scale = min(ratios) if ratios else 1.0
+            return (current - low) * scale + lower + (target - size * scale) / 2
+        return fit
+    raise ValueError(f"未知的坐标操作: {op}")
+
+
+class LazyService:
+    """服务的延迟实例：首次访问属性时才调用factory创建服务，之后直接转发"""
+    
+    def __init__(self, factory):
+        self._factory = factory
+        self._instance = None
+        self._lock = threading.Lock()
+    
+    def __getattr__(self, name: str) -> Any:
+        instance = self._instance
+        if instance is None:
+            with self._lock:
+                if self._instance is None:
+                    self._instance = self._factory()
+                instance = self._instance
+        return getattr(instance, name)
+
+
 class NodeService:
     """节点服务类"""
     
-    def __init__(self):
-        self.db = NodeDatabase()
+    @property
+    def db(self) -> NodeDatabase:
+        """当前项目的节点存储"""
+        return NodeDatabase()
     
-    def get_all_nodes(self) -> List[Dict[str, Any]]:
-        """获取所有节点"""
-        return self.db.get_all()
+    def get_all_nodes(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        types: Optional[List[str]] = None,
+        bbox: Optional[Tuple[float, float, float, float]] = None,
+        snapshot: Optional[SnapshotTable] = None,
+    ) -> List[Dict[str, Any]]:
+        """获取节点，可选按类型过滤、游标分页（after为上一页最后一个节点ID）、字段裁剪
+        和矩形范围 (x1, y1, x2, y2) 查询；指定snapshot时从该快照读取"""
+        if bbox is not None:
+            table, nodes = self.db.query_bbox(*bbox)
+        else:
+            table = nodes = snapshot if snapshot is not None else self.db.snapshot()
+            if limit is None and after is None and not fields and not types:
+                return table.dicts()
+        return _select(table, nodes, limit, after, fields, types)
     
     def get_node(self, node_id: str) -> Optional[Dict[str, Any]]:
         """获取指定节点"""
@@ -72,27 +222,65 @@ class NodeService:
         """更新节点状态"""
         return self.db.update_status(node_id, status)
     
+    def transform_positions(self, params: Dict[str, Any]) -> List[str]:
+        """批量修改节点坐标，参数格式见 POST /api/nodes/positions/bulk，返回被修改的节点ID
+    
+        ids省略时作用于全部有坐标的节点（set操作除外）；有节点不存在时抛出KeyError。
+        """
+        node_ids = params.get("ids")
+        if node_ids is not None and (
+            not isinstance(node_ids, list) or not all(isinstance(node_id, str) for node_id in node_ids)
+        ):
+            raise ValueError("ids必须为字符串列表")
+        transform = _position_transform(params, None if node_ids is None else len(node_ids))
+        return self.db.transform_positions(node_ids, transform)
+    
     def delete_node(self, node_id: str) -> bool:
         """删除节点"""
         return self.db.delete(node_id)
+    
+    def delete_nodes(self, node_ids: List[str], cascade: bool = True) -> Dict[str, List[str]]:
+        """原子地删除一组节点，cascade为True时同时删除与它们相连的边
+        
+        不存在的节点ID会被忽略。返回 {"nodes": 被删除的节点ID, "edges": 被删除的边ID}。
+        """
+        if not isinstance(node_ids, list) or not all(isinstance(node_id, str) for node_id in node_ids):
+            raise ValueError("ids必须为字符串列表")
+        with transaction() as (node_db, edge_db):
+            deleted_nodes = node_db.delete_many(node_ids)
+            deleted_edges = edge_db.delete_related_to_nodes(deleted_nodes) if cascade else []
+        return {"nodes": deleted_nodes, "edges": deleted_edges}
 
 
 class EdgeService:
     """边缘服务类"""
     
-    def __init__(self):
-        self.db = EdgeDatabase()
+    @property
+    def db(self) -> EdgeDatabase:
+        """当前项目的边存储"""
+        return EdgeDatabase()
     
-    def get_all_edges(self) -> List[Dict[str, Any]]:
-        """获取所有边"""
-        return self.db.get_all()
+    def get_all_edges(
+        self,
+        limit: Optional[int] = None,
+        after: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        types: Optional[List[str]] = None,
+        snapshot: Optional[SnapshotTable] = None,
+    ) -> List[Dict[str, Any]]:
+        """获取边，可选按类型过滤、游标分页（after为上一页最后一条边ID）和字段裁剪；
+        指定snapshot时从该快照读取"""
+        edges = snapshot if snapshot is not None else self.db.snapshot()
+        if limit is None and after is None and not fields and not types:
+            return edges.dicts()
+        return _select(edges, edges, limit, after, fields, types)
     
     def get_edge(self, edge_id: str) -> Optional[Dict[str, Any]]:
         """获取指定边"""
         return self.db.get_by_id(edge_id)
     
     def create_edge(self, edge_data: Dict[str, Any]) -> Dict[str, Any]:
-        """创建新边"""
+        """创建新边，会形成环时抛出CycleError"""
         try:
             source = edge_data["source"]
             target = edge_data["target"]
@@ -104,7 +292,7 @@ class EdgeService:
             raise ValueError(f"创建边时缺少必要参数: {e}")
     
     def update_edge(self, edge_id: str, edge_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """更新边"""
+        """更新边，修改端点后会形成环时抛出CycleError"""
         return self.db.update(edge_id, edge_data)
     
     def delete_edge(self, edge_id: str) -> bool:
@@ -116,6 +304,279 @@ class EdgeService:
         return self.db.delete_related_to_node(node_id)
 
 
+class GraphService:
+    """图结构服务：校验整个图的结构，查询节点的祖先和后代，复制子图"""
+    
+    @property
+    def node_db(self) -> NodeDatabase:
+        """当前项目的节点存储"""
+        return NodeDatabase()
+    
+    @property
+    def edge_db(self) -> EdgeDatabase:
+        """当前项目的边存储"""
+        return EdgeDatabase()
+    
+    def related_nodes(self, node_id: str, forward: bool, depth: Optional[int] = None) -> Optional[List[Dict[str, Any]]]:
+        """获取节点的后代（forward为False时为祖先），可选限制最大距离
+        
+        返回按距离、ID排序的 [{"id": ..., "depth": ...}]，节点不存在时返回None。
+        """
+        nodes = self.node_db.snapshot()
+        if node_id not in nodes:
+            return None
+        distances = self.edge_db.reachable(node_id, forward)
+        related = [
+            {"id": related_id, "depth": distance} for related_id, distance in distances.items()
+            if (depth is None or distance <= depth) and related_id in nodes
+        ]
+        related.sort(key=lambda item: (item["depth"], item["id"]))
+        return related
+    
+    def clone_subgraph(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """在一个事务中复制一组节点及两端都在其中的边，参数格式见 POST /api/subgraph/clone
+        
+        副本按 Node.create / Edge.create 生成新的ID，坐标平移 (dx, dy)，节点的其他字段（style、width等）和边一样原样复制；
+        有节点不存在时抛出KeyError。
+        返回 {"id_map": 原ID到新ID的映射, "nodes": 新节点, "edges": 新边}。
+        """
+        node_ids = params.get("ids")
+        if not isinstance(node_ids, list) or not node_ids or not all(isinstance(node_id, str) for node_id in node_ids):
+            raise ValueError("ids必须为非空的字符串列表")
+        dx, dy = _number(params, "dx", 0), _number(params, "dy", 0)
+        
+        id_map: Dict[str, str] = {}
+        nodes = []
+        with transaction() as (node_db, edge_db):
+            table = node_db.snapshot()
+            for node_id in dict.fromkeys(node_ids):
+                record = table.get(node_id)
+                if record is None:
+                    raise KeyError(node_id)
+                point = table.point(node_id)
+                if point is not None:
+                    position = {"x": point[0] + dx, "y": point[1] + dy}
+                else:
+                    # 无法识别的坐标原样复制
+                    position = table.to_dict(record).get("position")
+                clone = Node.create(
+                    node_type=record.type,
+                    data=copy.deepcopy(record.data),
+                    position=position,
+                    source_position=record.source_position,
+                    target_position=record.target_position,
+                )
+                if record.extra:
+                    clone.update(
+                        (key, copy.deepcopy(value)) for key, value in record.extra.items() if key != "position"
+                    )
+                id_map[node_id] = clone["id"]
+                nodes.append(node_db.add(clone))
+            edges = [
+                edge_db.add(Edge.create(source=id_map[edge.source], target=id_map[edge.target], edge_data=edge.to_dict()))
+                for edge in edge_db.edges_between(id_map)
+            ]
+        return {"id_map": id_map, "nodes": nodes, "edges": edges}
+    
+    def validate(self) -> Dict[str, Any]:
+        """基于当前快照检查环、从开始节点不可达的节点和端点不存在的悬空边"""
+        snapshot = graph_snapshot()
+        nodes = snapshot.nodes
+        topology = TopologyIndex()
+        topology.rebuild((edge.id, edge.source, edge.target) for edge in snapshot.edges)
+        dangling = [edge.id for edge in snapshot.edges if edge.source not in nodes or edge.target not in nodes]
+        
+        start_nodes = [record.id for record in nodes if record.type == "start"]
+        reachable = set(start_nodes)
+        pending = list(start_nodes)
+        while pending:
+            for node_id in topology.successors(pending.pop()):
+                if node_id not in reachable and node_id in nodes:
+                    reachable.add(node_id)
+                    pending.append(node_id)
+        unreachable = [record.id for record in nodes if record.id not in reachable]
+        
+        return {
+            "valid": topology.acyclic and bool(start_nodes) and not unreachable and not dangling,
+            "acyclic": topology.acyclic,
+            "start_nodes": start_nodes,
+            "unreachable_nodes": unreachable,
+            "dangling_edges": dangling,
+        }
+
+
+class BatchOperationError(ValueError):
+    """批量操作中某一项失败"""
+    
+    def __init__(self, index: int, message: str):
+        super().__init__(f"第 {index} 项操作失败: {message}")
+        self.index = index
+
+
+class BatchService:
+    """批量修改服务：在一个事务中执行多个节点/边操作
+
+    创建操作可以带 temp_id，后续操作的 id/source/target 可以直接引用该临时ID。
+    """
+    
+    def __init__(self):
+        self.node_service = NodeService()
+        self.edge_service = EdgeService()
+        self._handlers = {
+            "create_node": self._create_node,
+            "update_node": self._update_node,
+            "delete_node": self._delete_node,
+            "create_edge": self._create_edge,
+            "update_edge": self._update_edge,
+            "delete_edge": self._delete_edge,
+        }
+    
+    def apply(self, operations: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """原子地执行一组操作，任一操作失败时全部回滚并抛出BatchOperationError"""
+        if not isinstance(operations, list):
+            raise ValueError("operations必须为列表")
+        
+        id_map: Dict[str, str] = {}
+        results = []
+        changed = set()
+        with transaction():
+            for index, operation in enumerate(operations):
+                try:
+                    op = operation["op"]
+                    handler = self._handlers.get(op)
+                    if handler is None:
+                        raise ValueError(f"未知的操作类型: {op}")
+                    results.append(handler(operation, id_map))
+                except BatchOperationError:
+                    raise
+                except (KeyError, TypeError, ValueError, LookupError) as e:
+                    raise BatchOperationError(index, str(e))
+                changed.add("nodes" if op.endswith("_node") else "edges")
+        
+        return {
+            "results": results,
+            "id_map": id_map,
+            "nodes_changed": "nodes" in changed,
+            "edges_changed": "edges" in changed,
+        }
+    
+    @staticmethod
+    def _resolve(value: Any, id_map: Dict[str, str]) -> Any:
+        return id_map.get(value, value) if isinstance(value, str) else value
+    
+    def _register(self, operation: Dict[str, Any], created: Dict[str, Any], id_map: Dict[str, str]) -> None:
+        temp_id = operation.get("temp_id")
+        if temp_id is not None:
+            if temp_id in id_map:
+                raise ValueError(f"重复的临时ID: {temp_id}")
+            id_map[temp_id] = created["id"]
+    
+    def _create_node(self, operation: Dict[str, Any], id_map: Dict[str, str]) -> Dict[str, Any]:
+        node = self.node_service.create_node(operation.get("node") or {})
+        self._register(operation, node, id_map)
+        return node
+    
+    def _update_node(self, operation: Dict[str, Any], id_map: Dict[str, str]) -> Dict[str, Any]:
+        node_id = self._resolve(operation["id"], id_map)
+        node = self.node_service.update_node(node_id, operation.get("node") or {})
+        if node is None:
+            raise LookupError(f"节点 {node_id} 不存在")
+        return node
+    
+    def _delete_node(self, operation: Dict[str, Any], id_map: Dict[str, str]) -> Dict[str, Any]:
+        node_id = self._resolve(operation["id"], id_map)
+        if not self.node_service.delete_node(node_id):
+            raise LookupError(f"节点 {node_id} 不存在")
+        return {"deleted": node_id}
+    
+    def _create_edge(self, operation: Dict[str, Any], id_map: Dict[str, str]) -> Dict[str, Any]:
+        edge_data = dict(operation.get("edge") or {})
+        for key in ("source", "target"):
+            if key in edge_data:
+                edge_data[key] = self._resolve(edge_data[key], id_map)
+        edge = self.edge_service.create_edge(edge_data)
+        self._register(operation, edge, id_map)
+        return edge
+    
+    def _update_edge(self, operation: Dict[str, Any], id_map: Dict[str, str]) -> Dict[str, Any]:
+        edge_id = self._resolve(operation["id"], id_map)
+        edge_data = dict(operation.get("edge") or {})
+        for key in ("source", "target"):
+            if key in edge_data:
+                edge_data[key] = self._resolve(edge_data[key], id_map)
+        edge = self.edge_service.update_edge(edge_id, edge_data)
+        if edge is None:
+            raise LookupError(f"边 {edge_id} 不存在")
+        return edge
+    
+    def _delete_edge(self, operation: Dict[str, Any], id_map: Dict[str, str]) -> Dict[str, Any]:
+        edge_id = self._resolve(operation["id"], id_map)
+        if not self.edge_service.delete_edge(edge_id):
+            raise LookupError(f"边 {edge_id} 不存在")
+        return {"deleted": edge_id}
+
+
+class LayoutService:
+    """自动布局服务：根据边的连接关系在后端计算分层布局"""
+    
+    @property
+    def node_db(self) -> NodeDatabase:
+        """当前项目的节点存储"""
+        return NodeDatabase()
+    
+    def apply_layout(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        """对全部节点做分层布局并一次性写入坐标，参数格式见 POST /api/layout"""
+        direction = params.get("direction", "LR")
+        if direction not in DIRECTIONS:
+            raise ValueError(f"direction必须为{'/'.join(DIRECTIONS)}之一")
+        layer_spacing = _number(params, "layer_spacing", LAYOUT_LAYER_SPACING)
+        node_spacing = _number(params, "node_spacing", LAYOUT_NODE_SPACING)
+        if layer_spacing <= 0 or node_spacing <= 0:
+            raise ValueError("间距必须大于0")
+        origin = _number_list(params, "origin", 2) if "origin" in params else (0.0, 0.0)
+        
+        # 在写锁内计算，保证写入的坐标与计算时的图一致
+        with transaction() as (node_db, edge_db):
+            nodes, edges = node_db.snapshot(), edge_db.snapshot()
+            node_ids = [record.id for record in nodes]
+            coords, layers = layered_layout(
+                node_ids, ((edge.source, edge.target) for edge in edges),
+                direction=direction, layer_spacing=layer_spacing,
+                node_spacing=node_spacing, origin=tuple(origin)
+            )
+            changed = node_db.transform_positions(node_ids, lambda current: coords)
+        return {"updated": len(changed), "layers": layers}
+
+
+class ProjectService:
+    """项目文件（.storyfactory）的流式导入导出服务"""
+    
+    @property
+    def node_db(self) -> NodeDatabase:
+        """当前项目的节点存储"""
+        return NodeDatabase()
+    
+    @property
+    def edge_db(self) -> EdgeDatabase:
+        """当前项目的边存储"""
+        return EdgeDatabase()
+    
+    def export_chunks(self, compress: bool = False) -> Iterator[bytes]:
+        """按块导出当前图数据，compress为True时输出gzip格式"""
+        # 导出开始时的快照，导出期间的编辑不会影响输出，也不会被阻塞
+        snapshot = graph_snapshot()
+        chunks = iter_project_json(snapshot.nodes.iter_dicts(), snapshot.edges.iter_dicts())
+        return gzip_chunks(chunks) if compress else chunks
+    
+    def import_stream(self, stream: BinaryIO) -> Dict[str, int]:
+        """从流中增量解析项目文件并整体替换当前图数据"""
+        nodes, edges = read_project(stream)
+        with transaction() as (node_db, edge_db):
+            node_db.replace_all(nodes)
+            edge_db.replace_all(edges)
+        return {"nodes": len(nodes), "edges": len(edges)}
+
+
 class GenerationService:
     """文本生成服务类"""
     
@@ -130,22 +591,22 @@ class GenerationService:
     
     def generate_text_from_connected_node(self, node_id: str) -> Tuple[Optional[str], Optional[str], Optional[str]]:
         """从连接的节点生成文本"""
-        # 查找连接到当前节点的边
-        edges = self.edge_service.get_all_edges()
-        related_edge = next((edge for edge in edges if edge["target"] == node_id), None)
+        # 在同一快照中查找连接到当前节点的边和源节点
+        snapshot = graph_snapshot()
+        related_edge = next((edge for edge in snapshot.edges if edge.target == node_id), None)
         
         if not related_edge:
             return None, None, None
             
         # 查找源文本节点
-        source_id = related_edge["source"]
-        source_node = self.node_service.get_node(source_id)
+        source_id = related_edge.source
+        source_node = snapshot.nodes.get(source_id)
         
-        if not source_node or source_node["type"] != "text":
+        if not source_node or source_node.type != "text":
             return None, None, None
             
         # 生成文本
-        text = source_node["data"].get("text", "")
+        text = (source_node.data or {}).get("text", "")
         generated_text = self.generator.generate_with_default_messages(text)
         
         return generated_text, node_id, source_id 
@@ -161,7 +622,10 @@ class WorkflowExecutionService:
     
     def execute_workflow(self, start_node_id: Optional[str] = None) -> Dict[str, Any]:
         """执行工作流"""
-        return self.workflow_engine.execute_workflow(start_node_id)
+        with workflow_duration.time():
+            result = self.workflow_engine.execute_workflow(start_node_id)
+        workflow_runs.inc("success" if result.get("success") else "failed")
+        return result
     
     def execute_node(self, node_id: str, input_data: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """执行单个节点"""
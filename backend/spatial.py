@@ -0,0 +1,139 @@
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+Point = Tuple[float, float]
+BBox = Tuple[float, float, float, float]
+
+
+def position_of(node: Dict) -> Optional[Point]:
+    """读取节点坐标，坐标缺失或非数值时返回None"""
+    position = node.get("position")
+    if not isinstance(position, dict):
+        return None
+    x, y = position.get("x"), position.get("y")
+    if isinstance(x, bool) or isinstance(y, bool):
+        return None
+    if not isinstance(x, (int, float)) or not isinstance(y, (int, float)):
+        return None
+    return float(x), float(y)
+
+
+def normalize_bbox(x1: float, y1: float, x2: float, y2: float) -> BBox:
+    """规范化矩形，保证左上角坐标不大于右下角"""
+    return min(x1, x2), min(y1, y2), max(x1, x2), max(y1, y2)
+
+
+def bbox_contains(bbox: BBox, point: Point) -> bool:
+    """判断点是否在矩形内（含边界）"""
+    return bbox[0] <= point[0] <= bbox[2] and bbox[1] <= point[1] <= bbox[3]
+
+
+class GridIndex:
+    """均匀网格空间索引，用于按矩形范围查询节点"""
+
+    def __init__(self, cell_size: float = 512.0):
+        self.cell_size = cell_size
+        self._cells: Dict[Tuple[int, int], Set[str]] = {}
+        self._points: Dict[str, Point] = {}
+
+    def __len__(self) -> int:
+        return len(self._points)
+
+    def _cell(self, point: Point) -> Tuple[int, int]:
+        return math.floor(point[0] / self.cell_size), math.floor(point[1] / self.cell_size)
+
+    def get(self, item_id: str) -> Optional[Point]:
+        """获取已索引的坐标"""
+        return self._points.get(item_id)
+
+    def insert(self, item_id: str, point: Optional[Point]) -> None:
+        """插入或移动一个点，point为None时从索引中移除"""
+        self.remove(item_id)
+        if point is None:
+            return
+        self._points[item_id] = point
+        self._cells.setdefault(self._cell(point), set()).add(item_id)
+
+    def remove(self, item_id: str) -> None:
+        """移除一个点"""
+        point = self._points.pop(item_id, None)
+        if point is None:
+            return
+        cell = self._cell(point)
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(item_id)
+            if not members:
+                del self._cells[cell]
+
+    def clear(self) -> None:
+        """清空索引"""
+        self._cells.clear()
+        self._points.clear()
+
+    def rebuild(self, items: Iterable[Tuple[str, Optional[Point]]]) -> None:
+        """根据 (id, 坐标) 序列重建索引"""
+        self.clear()
+        for item_id, point in items:
+            if point is not None:
+                self._points[item_id] = point
+                self._cells.setdefault(self._cell(point), set()).add(item_id)
+
+    def query(self, bbox: BBox) -> List[str]:
+        """返回矩形范围内的所有ID"""
+        x1, y1, x2, y2 = bbox
+        cx1, cy1 = self._cell((x1, y1))
+        cx2, cy2 = self._cell((x2, y2))
+
+        # 矩形覆盖的网格数多于已占用的网格时，直接遍历已占用的网格
+        if (cx2 - cx1 + 1) * (cy2 - cy1 + 1) > len(self._cells):
+            candidates = (
+                members for (cx, cy), members in self._cells.items()
+                if cx1 <= cx <= cx2 and cy1 <= cy <= cy2
+            )
+        else:
+            candidates = (
+                self._cells[(cx, cy)]
+                for cx in range(cx1, cx2 + 1)
+                for cy in range(cy1, cy2 + 1)
+                if (cx, cy) in self._cells
+            )
+
+        result = []
+        for members in candidates:
+            for item_id in members:
+                if bbox_contains(bbox, self._points[item_id]):
+                    result.append(item_id)
+        return result
+
+
+class ViewportRegistry:
+    """记录各个Socket.IO客户端订阅的可视区域"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._viewports: Dict[str, BBox] = {}
+
+    def subscribe(self, sid: str, bbox: BBox) -> None:
+        """订阅（或更新）客户端的可视区域"""
+        with self._lock:
+            self._viewports[sid] = bbox
+
+    def unsubscribe(self, sid: str) -> bool:
+        """取消订阅，返回客户端此前是否有订阅"""
+        with self._lock:
+            return self._viewports.pop(sid, None) is not None
+
+    def is_subscribed(self, sid: str) -> bool:
+        with self._lock:
+            return sid in self._viewports
+
+    def subscribers_for(self, *points: Optional[Point]) -> List[str]:
+        """返回可视区域包含任一给定坐标的客户端"""
+        points = tuple(point for point in points if point is not None)
+        with self._lock:
+            return [
+                sid for sid, bbox in self._viewports.items()
+                if any(bbox_contains(bbox, point) for point in points)
+            ]
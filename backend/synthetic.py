@@ -0,0 +1,284 @@
+"""
+合成故事图
+
+按随机种子生成可复现的大规模故事图，用于在接近生产规模的数据上测量性能：
+图由若干个故事组成，每个故事从start节点出发，由以下片段依次连接而成，最后汇入end节点：
+
+  chain    章节链：20~200个节点首尾相连
+  branch   分支：从若干个末端各分出2~6条支线，未被继续的支线成为故事的结局
+  diamond  菱形：分出2~6条长短不一的支线后再汇合到一个节点
+  dag      深层DAG：逐层生成，每个节点连接前三层中的1~3个节点
+
+shape为mixed时每个片段随机选取，其他取值时只使用对应的片段。
+边总是从先生成的节点指向后生成的节点，图中没有环。文本长度服从对数正态分布（中位数约200字），
+少数节点为空文本；生成节点只跟在文本节点之后，工作流可以从任一start节点完整执行。
+
+命令行用法：python -m backend.synthetic --nodes 100000 --project big 生成项目文件，
+或在代码中用 generate_story_graph() 生成后以 load_into_store() 载入当前图。
+"""
+import argparse
+import os
+import random
+import uuid
+from collections import Counter, deque
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from backend.database import silent_changes, transaction
+from backend.models import Edge, Node
+from backend.project_io import gzip_chunks, iter_project_json
+
+SHAPES = ("mixed", "chain", "branch", "diamond", "dag")
+
+LAYER_SPACING = 250  # 相邻深度的节点横向间距
+LANE_SPACING = 150  # 同一深度的节点纵向间距
+STORY_SPACING = 600  # 相邻两个故事之间的纵向间距
+GENERATE_RATIO = 0.15  # 单一前驱为文本节点的节点中生成节点的比例
+EMPTY_TEXT_RATIO = 0.05  # 空文本节点的比例
+MAX_TEXT_LENGTH = 20000
+MAX_END_INPUTS = 16  # end节点最多汇入的末端数量，其余末端作为结局保留
+
+_PHRASES = (
+    "夜色渐深，", "她推开那扇旧木门，", "远处传来钟声。", "他没有回答，只是望着窗外。", "雨一直下到天亮。",
+    "城里的人都说", "那封信上只有一句话：", "“我们还会再见的。”", "山路比想象中更长，", "灯火一盏盏熄灭。",
+    "他终于明白了真相。", "风从海上吹来，", "她把钥匙藏进口袋，", "谁也没有注意到", "第二天清晨，",
+    "The door creaked open. ", "Nobody remembered the old map. ", "She smiled and walked away. ",
+)
+
+
+class SyntheticGraph(NamedTuple):
+    """生成的图：节点和边为API中的字典形式，starts为各故事的start节点ID"""
+    nodes: List[Dict[str, Any]]
+    edges: List[Dict[str, Any]]
+    starts: List[str]
+
+
+class _Builder:
+    """按生成顺序添加节点和边，并记录布局需要的深度和各深度已用的行"""
+
+    def __init__(self, rng: random.Random, corpus: str):
+        self.rng = rng
+        self.corpus = corpus
+        self.nodes: List[Dict[str, Any]] = []
+        self.edges: List[Dict[str, Any]] = []
+        self.types: Dict[str, str] = {}
+        self.depth: Dict[str, int] = {}
+        self.lanes: Counter = Counter()
+        self.base_y = 0
+
+    def _id(self) -> str:
+        return str(uuid.UUID(int=self.rng.getrandbits(128), version=4))
+
+    def _text(self) -> str:
+        if self.rng.random() < EMPTY_TEXT_RATIO:
+            return ""
+        length = min(int(self.rng.lognormvariate(5.3, 1.0)), MAX_TEXT_LENGTH)
+        start = self.rng.randrange(len(self.corpus) - MAX_TEXT_LENGTH)
+        return self.corpus[start:start + length]
+
+    def add(self, parents: List[str], node_type: Optional[str] = None) -> str:
+        """添加一个连接自parents的节点，未指定类型时为文本节点或（前驱为单个文本节点时）生成节点"""
+        if node_type is None:
+            single_text_parent = len(parents) == 1 and self.types[parents[0]] == "text"
+            node_type = "generate" if single_text_parent and self.rng.random() < GENERATE_RATIO else "text"
+        node_id = self._id()
+        depth = max((self.depth[parent] + 1 for parent in parents), default=0)
+        lane = self.lanes[depth]
+        self.lanes[depth] += 1
+        data: Dict[str, Any] = {"label": f"{node_type} {len(self.nodes) + 1}"}
+        if node_type == "text":
+            data["text"] = self._text()
+        elif node_type == "generate" and self.rng.random() < 0.5:
+            # 已经生成过文本的生成节点
+            data["text"] = self._text()
+        self.nodes.append(Node.create(
+            node_type=node_type, data=data,
+            position={"x": depth * LAYER_SPACING, "y": self.base_y + lane * LANE_SPACING},
+            source_position="right", target_position="left", node_id=node_id,
+        ))
+        self.types[node_id] = node_type
+        self.depth[node_id] = depth
+        for parent in parents:
+            self.edges.append(Edge.create(source=parent, target=node_id, edge_id=self._id()))
+        return node_id
+
+    def next_story(self) -> None:
+        """之后的节点放在已生成的故事下方"""
+        self.base_y += max(self.lanes.values(), default=0) * LANE_SPACING + STORY_SPACING
+        self.lanes.clear()
+
+
+# 片段：从当前末端tails出发添加不超过budget个节点，返回新的末端
+
+def _chain(builder: _Builder, tails: List[str], budget: int) -> List[str]:
+    length = min(builder.rng.randint(20, 200), budget)
+    current = builder.add(tails)
+    for _ in range(length - 1):
+        current = builder.add([current])
+    return [current]
+
+
+def _branch(builder: _Builder, tails: List[str], budget: int) -> List[str]:
+    rng = builder.rng
+    # 只从部分末端继续，其余成为结局
+    roots = rng.sample(tails, min(len(tails), rng.randint(1, 4)))
+    leaves: List[str] = []
+    for root in roots:
+        for _ in range(rng.randint(2, 6)):
+            if budget <= 0:
+                return leaves or roots
+            leaves.append(builder.add([root]))
+            budget -= 1
+    return leaves
+
+
+def _diamond(builder: _Builder, tails: List[str], budget: int) -> List[str]:
+    rng = builder.rng
+    split = builder.add(tails)
+    budget -= 1
+    ends = []
+    for _ in range(rng.randint(2, 6)):
+        if budget <= 1:
+            break
+        current = split
+        for _ in range(min(rng.randint(1, 12), budget - 1)):
+            current = builder.add([current])
+            budget -= 1
+        ends.append(current)
+    if not ends:
+        return [split]
+    return [builder.add(ends, "text")]
+
+
+def _dag(builder: _Builder, tails: List[str], budget: int) -> List[str]:
+    rng = builder.rng
+    layers = [list(tails)]
+    for _ in range(rng.randint(5, 40)):
+        if budget <= 0:
+            break
+        candidates = [node_id for layer in layers[-3:] for node_id in layer]
+        layer = []
+        for _ in range(min(rng.randint(1, 10), budget)):
+            parents = rng.sample(candidates, min(len(candidates), rng.randint(1, 3)))
+            layer.append(builder.add(parents))
+            budget -= 1
+        layers.append(layer)
+    return layers[-1]
+
+
+_SEGMENTS: Dict[str, Callable[[_Builder, List[str], int], List[str]]] = {
+    "chain": _chain,
+    "branch": _branch,
+    "diamond": _diamond,
+    "dag": _dag,
+}
+
+
+def generate_story_graph(nodes: int, seed: int = 0, shape: str = "mixed", story_size: int = 1000) -> SyntheticGraph:
+    """生成约nodes个节点的图，每个故事约story_size个节点；相同参数总是生成相同的图"""
+    if shape not in SHAPES:
+        raise ValueError(f"未知的图形状: {shape}，可选 {', '.join(SHAPES)}")
+    if nodes < 3 or story_size < 3:
+        raise ValueError("nodes 和 story_size 至少为3（start、一个内容节点和end）")
+    rng = random.Random(seed)
+    corpus = "".join(rng.choice(_PHRASES) for _ in range(MAX_TEXT_LENGTH // 4))
+    while len(corpus) < MAX_TEXT_LENGTH * 2:
+        corpus += corpus
+    builder = _Builder(rng, corpus)
+    starts = []
+    remaining = nodes
+    while remaining >= 3:
+        size = min(story_size, remaining)
+        # 余下的节点不足一个故事时并入本故事
+        if remaining - size < 3:
+            size = remaining
+        start = builder.add([], "start")
+        starts.append(start)
+        tails = [start]
+        budget = size - 2
+        while budget > 0:
+            segment = _SEGMENTS[rng.choice(list(_SEGMENTS)) if shape == "mixed" else shape]
+            before = len(builder.nodes)
+            tails = segment(builder, tails, budget)
+            budget -= len(builder.nodes) - before
+        builder.add(rng.sample(tails, min(len(tails), MAX_END_INPUTS)), "end")
+        builder.next_story()
+        remaining -= size
+    return SyntheticGraph(builder.nodes, builder.edges, starts)
+
+
+def describe(graph: SyntheticGraph) -> Dict[str, Any]:
+    """图的规模和形状：节点类型分布、最长路径、最大出度和入度、汇合节点数量和文本总长度"""
+    successors: Dict[str, List[str]] = {node["id"]: [] for node in graph.nodes}
+    in_degree: Counter = Counter()
+    for edge in graph.edges:
+        successors[edge["source"]].append(edge["target"])
+        in_degree[edge["target"]] += 1
+    # 按拓扑序计算最长路径（边数）
+    longest = {node_id: 0 for node_id in successors}
+    pending = Counter(in_degree)
+    queue = deque(node_id for node_id in successors if not pending[node_id])
+    while queue:
+        node_id = queue.popleft()
+        for target in successors[node_id]:
+            longest[target] = max(longest[target], longest[node_id] + 1)
+            pending[target] -= 1
+            if not pending[target]:
+                queue.append(target)
+    return {
+        "nodes": len(graph.nodes),
+        "edges": len(graph.edges),
+        "stories": len(graph.starts),
+        "types": dict(Counter(node["type"] for node in graph.nodes)),
+        "longest_path": max(longest.values(), default=0),
+        "max_out_degree": max((len(targets) for targets in successors.values()), default=0),
+        "max_in_degree": max(in_degree.values(), default=0),
+        "merge_nodes": sum(1 for count in in_degree.values() if count > 1),
+        "text_chars": sum(len(node["data"].get("text", "")) for node in graph.nodes),
+    }
+
+
+def load_into_store(graph: SyntheticGraph) -> None:
+    """用生成的图替换当前图（默认图或 use_graph 指定的项目图）的全部节点和边，不通知修改监听函数"""
+    with silent_changes(), transaction() as (node_db, edge_db):
+        node_db.replace_all(graph.nodes)
+        edge_db.replace_all(graph.edges)
+
+
+def write_project_file(graph: SyntheticGraph, path: str, compress: bool = False) -> None:
+    """写出 .storyfactory 项目文件，compress为True时以gzip压缩（导入时自动识别）"""
+    chunks = iter_project_json(graph.nodes, graph.edges)
+    if compress:
+        chunks = gzip_chunks(chunks)
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "wb") as output:
+        for chunk in chunks:
+            output.write(chunk)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="生成 Story Factory 合成故事图")
+    parser.add_argument("--nodes", type=int, default=10000, help="节点数量")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子，相同参数生成相同的图")
+    parser.add_argument("--shape", choices=SHAPES, default="mixed", help="图的形状")
+    parser.add_argument("--story-size", type=int, default=1000, help="每个故事的节点数量")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--output", help="写出的 .storyfactory 文件路径")
+    target.add_argument("--project", help="写到项目目录中的项目ID，之后可通过 /api/projects/<ID> 访问")
+    parser.add_argument("--gzip", action="store_true", help="以gzip压缩")
+    args = parser.parse_args()
+
+    if args.project is not None:
+        from backend.workspace import validate_project_id, workspace
+        path = workspace.path_for(validate_project_id(args.project))
+    else:
+        path = args.output
+    graph = generate_story_graph(args.nodes, args.seed, args.shape, args.story_size)
+    write_project_file(graph, path, compress=args.gzip)
+    print(f"已写出 {path}")
+    for key, value in describe(graph).items():
+        print(f"  {key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import threading
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from backend.config import REACHABILITY_CACHE_SIZE
+from backend.metrics import cache_requests
+
+
+class CycleError(ValueError):
+    """添加的边会使图中形成环"""
+
+    def __init__(self, source: str, target: str):
+        super().__init__(f"边 {source} -> {target} 会形成环")
+        self.source = source
+        self.target = target
+
+
+class TopologyIndex:
+    """边的邻接索引，同时增量维护节点的拓扑序（Pearce–Kelly 算法）
+
+    插入边 x -> y 时，若拓扑序中x已在y之前则无需调整；否则只在两者序号之间的区间内
+    从y向后、从x向前搜索，搜索到x即说明会形成环，否则只重排搜索到的这部分节点的序号。
+    图中已经有环时（例如导入的项目）拓扑序失效，改为按可达性搜索检测，
+    删除边之后再尝试重新建立拓扑序。
+
+    祖先/后代查询的结果按LRU缓存。边 u -> v 变化时只清除受影响的条目：
+    包含u（或从u出发）的后代结果，以及包含v（或从v出发）的祖先结果。
+    """
+
+    def __init__(self):
+        self._edges: Dict[str, Tuple[str, str]] = {}
+        # 节点 -> {边ID: 另一端节点}
+        self._out: Dict[str, Dict[str, str]] = {}
+        self._in: Dict[str, Dict[str, str]] = {}
+        self._order: Dict[str, int] = {}
+        self._next = 0
+        self._acyclic = True
+        self._retry = False
+        # (节点, 是否沿边方向) -> {可达节点: 最短距离}
+        self._reachable: "OrderedDict[Tuple[str, bool], Dict[str, int]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._edges)
+
+    @property
+    def acyclic(self) -> bool:
+        """图中是否没有环"""
+        if not self._acyclic and self._retry:
+            self._rebuild_order()
+        return self._acyclic
+
+    def rebuild(self, edges: Iterable[Tuple[str, str, str]]) -> None:
+        """由 (边ID, 起点, 终点) 序列整体重建，允许已有的环"""
+        self.__init__()
+        for edge_id, source, target in edges:
+            self._link(edge_id, source, target)
+        self._rebuild_order()
+
+    def add(self, edge_id: str, source: str, target: str, allow_cycle: bool = False) -> None:
+        """加入或替换一条边，会形成环且不允许时抛出CycleError，索引保持不变"""
+        previous = self._edges.get(edge_id)
+        if previous is not None:
+            self.remove(edge_id)
+        try:
+            if self.creates_cycle(source, target):
+                if not allow_cycle:
+                    raise CycleError(source, target)
+                self._acyclic = False
+        except CycleError:
+            if previous is not None:
+                self._link(edge_id, *previous)
+            raise
+        self._link(edge_id, source, target)
+
+    def remove(self, edge_id: str) -> Optional[Tuple[str, str]]:
+        """删除一条边，返回其 (起点, 终点)"""
+        ends = self._edges.pop(edge_id, None)
+        if ends is None:
+            return None
+        source, target = ends
+        self._invalidate(source, target)
+        del self._out[source][edge_id]
+        del self._in[target][edge_id]
+        for node_id in ends:
+            if not self._out.get(node_id) and not self._in.get(node_id):
+                self._out.pop(node_id, None)
+                self._in.pop(node_id, None)
+                self._order.pop(node_id, None)
+        if not self._acyclic:
+            self._retry = True
+        return ends
+
+    def creates_cycle(self, source: str, target: str) -> bool:
+        """判断加入边 source -> target 是否会形成环；不会时按需调整拓扑序"""
+        if source == target:
+            return True
+        if not self.acyclic:
+            return self._reaches(target, source)
+        lower, upper = self._position(target), self._position(source)
+        if upper < lower:
+            return False
+        forward = self._search(target, self._out, lambda order: order <= upper)
+        if source in forward:
+            return True
+        backward = self._search(source, self._in, lambda order: order >= lower)
+        self._reorder(backward, forward)
+        return False
+
+    def edges_of(self, node_id: str) -> List[str]:
+        """与节点相连的全部边ID"""
+        return list({**self._out.get(node_id, {}), **self._in.get(node_id, {})})
+
+    def links(self, node_id: str, forward: bool = True) -> List[str]:
+        """节点出边的终点（forward为False时为入边的起点），按边的添加顺序，平行边各出现一次"""
+        return list((self._out if forward else self._in).get(node_id, {}).values())
+
+    def successors(self, node_id: str) -> Set[str]:
+        """节点的直接后继"""
+        return set(self._out.get(node_id, {}).values())
+
+    def predecessors(self, node_id: str) -> Set[str]:
+        """节点的直接前驱"""
+        return set(self._in.get(node_id, {}).values())
+
+    def reachable(self, node_id: str, forward: bool = True) -> Dict[str, int]:
+        """从节点沿边的方向（forward为False时逆向）可达的节点及其最短距离，返回值不得修改"""
+        key = (node_id, forward)
+        with self._cache_lock:
+            cached = self._reachable.get(key)
+            if cached is not None:
+                self._reachable.move_to_end(key)
+                cache_requests.inc("reachability", "hit")
+                return cached
+        cache_requests.inc("reachability", "miss")
+        adjacency = self._out if forward else self._in
+        distances: Dict[str, int] = {}
+        visited = {node_id}
+        frontier = [node_id]
+        depth = 0
+        while frontier:
+            depth += 1
+            next_frontier = []
+            for current in frontier:
+                for neighbor in adjacency.get(current, {}).values():
+                    if neighbor not in visited:
+                        visited.add(neighbor)
+                        distances[neighbor] = depth
+                        next_frontier.append(neighbor)
+            frontier = next_frontier
+        with self._cache_lock:
+            self._reachable[key] = distances
+            while len(self._reachable) > REACHABILITY_CACHE_SIZE:
+                self._reachable.popitem(last=False)
+        return distances
+
+    def _invalidate(self, source: str, target: str) -> None:
+        """清除经过边 source -> target 的可达性缓存"""
+        with self._cache_lock:
+            stale = [
+                (node_id, forward) for (node_id, forward), distances in self._reachable.items()
+                if (source if forward else target) in distances or node_id == (source if forward else target)
+            ]
+            for key in stale:
+                del self._reachable[key]
+
+    def _link(self, edge_id: str, source: str, target: str) -> None:
+        self._invalidate(source, target)
+        self._edges[edge_id] = (source, target)
+        self._out.setdefault(source, {})[edge_id] = target
+        self._in.setdefault(target, {})[edge_id] = source
+        self._position(source)
+        self._position(target)
+
+    def _position(self, node_id: str) -> int:
+        """节点在拓扑序中的序号，新节点排在最后"""
+        order = self._order.get(node_id)
+        if order is None:
+            order = self._order[node_id] = self._next
+            self._next += 1
+        return order
+
+    def _search(self, start: str, adjacency: Dict[str, Dict[str, str]], within) -> Set[str]:
+        """从start沿adjacency搜索序号满足within的节点"""
+        visited = {start}
+        stack = [start]
+        while stack:
+            for neighbor in adjacency.get(stack.pop(), {}).values():
+                if neighbor not in visited and within(self._order[neighbor]):
+                    visited.add(neighbor)
+                    stack.append(neighbor)
+        return visited
+
+    def _reorder(self, backward: Set[str], forward: Set[str]) -> None:
+        """把可达x的节点整体排到y可达的节点之前，复用它们原有的序号"""
+        order = self._order
+        nodes = sorted(backward, key=order.__getitem__) + sorted(forward, key=order.__getitem__)
+        for node_id, position in zip(nodes, sorted(order[node_id] for node_id in nodes)):
+            order[node_id] = position
+
+    def _reaches(self, start: str, goal: str) -> bool:
+        visited = {start}
+        stack = [start]
+        while stack:
+            for neighbor in self._out.get(stack.pop(), {}).values():
+                if neighbor == goal:
+                    return True
+                if neighbor not in visited:
+                    visited.add(neighbor)
+                    stack.append(neighbor)
+        return False
+
+    def _rebuild_order(self) -> None:
+        """按Kahn算法重新计算拓扑序，有环时标记拓扑序失效"""
+        self._retry = False
+        nodes = set(self._out) | set(self._in)
+        indegree = {node_id: len(set(self._in.get(node_id, {}).values())) for node_id in nodes}
+        ready = [node_id for node_id in sorted(nodes, key=self._position) if not indegree[node_id]]
+        order: Dict[str, int] = {}
+        while ready:
+            node_id = ready.pop()
+            order[node_id] = len(order)
+            for neighbor in set(self._out.get(node_id, {}).values()):
+                indegree[neighbor] -= 1
+                if not indegree[neighbor]:
+                    ready.append(neighbor)
+        self._acyclic = len(order) == len(nodes)
+        if self._acyclic:
+            self._order = order
+            self._next = len(order)
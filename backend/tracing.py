@@ -0,0 +1,148 @@
+"""
+工作流执行的区间追踪
+
+一次运行（Trace）记录若干命名的时间区间（span），可导出为 Chrome trace event JSON，
+在 chrome://tracing 或 Perfetto 中以火焰图形式查看时间花在了哪里。
+当前上下文没有进行中的运行时 span() 不做任何记录，不影响其他调用路径。
+"""
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional
+
+from backend.config import TRACE_HISTORY
+
+
+class Trace:
+    """一次运行的全部区间"""
+
+    def __init__(self, name: str, args: Optional[Dict[str, Any]] = None):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.args = dict(args or {})
+        self.started_at = time.time()
+        self._origin = time.perf_counter()
+        self.duration: Optional[float] = None
+        self._events: List[Dict[str, Any]] = []
+        self._threads: Dict[int, str] = {}
+        self._lock = threading.Lock()
+
+    def now(self) -> float:
+        """用于 add() 的时间戳"""
+        return time.perf_counter()
+
+    def add(self, name: str, start: float, end: float, category: str = "", args: Optional[Dict[str, Any]] = None) -> None:
+        """记录一个区间，start和end为 now() 的返回值"""
+        thread = threading.current_thread()
+        event = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": round((start - self._origin) * 1e6, 3),
+            "dur": round((end - start) * 1e6, 3),
+            "pid": os.getpid(),
+            "tid": thread.ident,
+        }
+        if args:
+            event["args"] = args
+        with self._lock:
+            self._events.append(event)
+            self._threads.setdefault(thread.ident, thread.name)
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "name": self.name,
+            "args": self.args,
+            "started_at": self.started_at,
+            "duration": self.duration,
+        }
+
+    def to_chrome(self) -> Dict[str, Any]:
+        """Chrome trace event 格式"""
+        with self._lock:
+            events = list(self._events)
+            threads = dict(self._threads)
+        pid = os.getpid()
+        metadata = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": f"{self.name} {self.id}"}}]
+        metadata += [
+            {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+            for tid, name in threads.items()
+        ]
+        return {
+            "traceEvents": metadata + sorted(events, key=lambda event: (event["ts"], -event["dur"])),
+            "displayTimeUnit": "ms",
+            "otherData": self.summary(),
+        }
+
+
+class TraceStore:
+    """最近若干次运行的追踪记录"""
+
+    def __init__(self, capacity: int = TRACE_HISTORY):
+        self.capacity = capacity
+        self._traces: "OrderedDict[str, Trace]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, trace: Trace) -> None:
+        with self._lock:
+            self._traces[trace.id] = trace
+            while len(self._traces) > self.capacity:
+                self._traces.popitem(last=False)
+
+    def get(self, trace_id: str) -> Optional[Trace]:
+        with self._lock:
+            return self._traces.get(trace_id)
+
+    def recent(self) -> List[Trace]:
+        """由新到旧"""
+        with self._lock:
+            return list(reversed(self._traces.values()))
+
+
+traces = TraceStore()
+
+_current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def run_trace(name: str, **args: Any) -> Iterator[Trace]:
+    """在上下文内追踪一次运行；已有进行中的运行时并入该运行，作为其中的一个区间"""
+    trace = _current_trace.get()
+    if trace is not None:
+        with span(name, "run", **args):
+            yield trace
+        return
+    trace = Trace(name, args)
+    traces.add(trace)
+    token = _current_trace.set(trace)
+    start = trace.now()
+    try:
+        yield trace
+    finally:
+        end = trace.now()
+        trace.add(name, start, end, "run", args)
+        trace.duration = end - start
+        _current_trace.reset(token)
+
+
+@contextmanager
+def span(name: str, category: str = "", **args: Any) -> Iterator[None]:
+    """记录上下文内代码的区间，当前没有进行中的运行时不记录"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = trace.now()
+    try:
+        yield
+    finally:
+        trace.add(name, start, trace.now(), category, args)
@@ -0,0 +1,274 @@
+import atexit
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from backend.config import PROJECTS_DIR, WORKSPACE_ITEM_BYTES, WORKSPACE_MEMORY_BUDGET
+from backend.database import EdgeDatabase, NodeDatabase, ProjectGraph, graph_snapshot, use_graph
+from backend.log import get_logger
+from backend.metrics import register_gauge
+from backend.project_io import iter_project_json, read_project
+
+# 项目ID同时用作文件名，只允许字母、数字、下划线和连字符
+PROJECT_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,64}$")
+PROJECT_SUFFIX = ".storyfactory"
+
+logger = get_logger(__name__)
+
+
+def validate_project_id(project_id: str) -> str:
+    """校验项目ID，非法时抛出ValueError"""
+    if not isinstance(project_id, str) or not PROJECT_ID_PATTERN.match(project_id):
+        raise ValueError(f"无效的项目ID: {project_id!r}")
+    return project_id
+
+
+class _Entry:
+    """已载入内存的项目"""
+
+    __slots__ = ("graph", "pins", "saved_version", "size")
+
+    def __init__(self, graph: ProjectGraph, size: int):
+        self.graph = graph
+        self.pins = 0
+        self.saved_version = graph.version
+        self.size = size
+
+    @property
+    def dirty(self) -> bool:
+        return self.graph.version != self.saved_version
+
+
+class Workspace:
+    """按项目ID访问的项目图集合
+
+    项目首次访问时从 <目录>/<项目ID>.storyfactory 懒加载，不存在时为空项目。
+    载入的项目按最近使用顺序排列，估算的总大小超过内存预算时，
+    从最久未使用且没有请求正在使用的项目开始写回磁盘（仅在有修改时）并卸载。
+    正在写回的项目被再次访问时直接复用内存中的数据，不会读到旧文件。
+    """
+
+    def __init__(self, directory: str = PROJECTS_DIR, budget: int = WORKSPACE_MEMORY_BUDGET,
+                 item_bytes: int = WORKSPACE_ITEM_BYTES):
+        self.directory = directory
+        self.budget = budget
+        self.item_bytes = item_bytes
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._unloading: Dict[str, _Entry] = {}
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        # 多进程模式下由 backend.cluster 设置，载入时优先使用其他进程共享的最新数据
+        self.remote = None
+
+    def path_for(self, project_id: str) -> str:
+        """项目文件路径"""
+        return os.path.join(self.directory, validate_project_id(project_id) + PROJECT_SUFFIX)
+
+    def loaded(self) -> List[str]:
+        """已载入内存的项目ID，按最近使用顺序由旧到新"""
+        with self._lock:
+            return list(self._entries)
+
+    @property
+    def memory_usage(self) -> int:
+        """已载入项目的估算总大小（字节）"""
+        with self._lock:
+            return sum(entry.size for entry in self._entries.values())
+
+    def list_projects(self) -> List[Dict[str, object]]:
+        """磁盘上和内存中的全部项目"""
+        with self._lock:
+            loaded = set(self._entries) | set(self._unloading)
+        names = set(loaded)
+        if os.path.isdir(self.directory):
+            for filename in os.listdir(self.directory):
+                name = filename[:-len(PROJECT_SUFFIX)]
+                if filename.endswith(PROJECT_SUFFIX) and PROJECT_ID_PATTERN.match(name):
+                    names.add(name)
+        return [{"id": name, "loaded": name in loaded} for name in sorted(names)]
+
+    def _claim(self, project_id: str) -> Optional[_Entry]:
+        """在self._lock内取得已载入（或正在卸载）的项目并加一次引用"""
+        entry = self._entries.get(project_id)
+        if entry is None:
+            entry = self._unloading.get(project_id)
+            if entry is None:
+                return None
+            self._entries[project_id] = entry
+        self._entries.move_to_end(project_id)
+        entry.pins += 1
+        return entry
+
+    def acquire(self, project_id: str) -> ProjectGraph:
+        """取得项目图并加一次引用，未载入时从磁盘载入；使用完毕后须调用release"""
+        validate_project_id(project_id)
+        with self._lock:
+            entry = self._claim(project_id)
+            if entry is not None:
+                return entry.graph
+            load_lock = self._load_locks.setdefault(project_id, threading.Lock())
+
+        # 同一项目只载入一次，不同项目的载入互不阻塞
+        with load_lock:
+            with self._lock:
+                entry = self._claim(project_id)
+                if entry is not None:
+                    return entry.graph
+            try:
+                graph = self._read(project_id)
+            except BaseException:
+                with self._lock:
+                    self._load_locks.pop(project_id, None)
+                raise
+            with self._lock:
+                entry = _Entry(graph, self._estimate(graph))
+                self._entries[project_id] = entry
+                entry.pins += 1
+                self._load_locks.pop(project_id, None)
+        self._evict()
+        return graph
+
+    def release(self, project_id: str) -> None:
+        """释放一次引用，并按新的大小检查内存预算"""
+        with self._lock:
+            entry = self._entries.get(project_id)
+            if entry is None:
+                return
+            entry.pins -= 1
+            entry.size = self._estimate(entry.graph)
+        self._evict()
+
+    @contextmanager
+    def open(self, project_id: str) -> Iterator[ProjectGraph]:
+        """在上下文内将项目图设为当前图"""
+        graph = self.acquire(project_id)
+        try:
+            with use_graph(graph):
+                yield graph
+        finally:
+            self.release(project_id)
+
+    def flush(self) -> int:
+        """将所有有修改的已载入项目写回磁盘，返回写回的项目数量"""
+        with self._lock:
+            entries = list(self._entries.items())
+        saved = 0
+        for project_id, entry in entries:
+            if entry.dirty:
+                self._save(project_id, entry)
+                saved += 1
+        return saved
+
+    def unload_all(self) -> None:
+        """写回并卸载全部项目"""
+        self.flush()
+        with self._lock:
+            for project_id in self._entries:
+                self._forget(project_id)
+            self._entries.clear()
+
+    def _forget(self, project_id: str) -> None:
+        if self.remote is not None:
+            self.remote.uninstall(project_id)
+
+    def _estimate(self, graph: ProjectGraph) -> int:
+        return len(graph) * self.item_bytes
+
+    def _evict(self) -> None:
+        """超出内存预算时按LRU顺序卸载未被使用的项目"""
+        while True:
+            with self._lock:
+                total = sum(entry.size for entry in self._entries.values())
+                if total <= self.budget:
+                    return
+                victim = next(
+                    ((project_id, entry) for project_id, entry in self._entries.items() if not entry.pins), None
+                )
+                if victim is None:
+                    return
+                project_id, entry = victim
+                del self._entries[project_id]
+                if not entry.dirty:
+                    self._forget(project_id)
+                    continue
+                self._unloading[project_id] = entry
+            try:
+                self._save(project_id, entry)
+            except OSError:
+                # 写回失败时保留在内存中，避免丢失修改
+                logger.exception("写回项目失败", extra={"project_id": project_id})
+                with self._lock:
+                    self._entries.setdefault(project_id, entry)
+                    self._entries.move_to_end(project_id, last=False)
+                return
+            finally:
+                with self._lock:
+                    self._unloading.pop(project_id, None)
+                    if project_id not in self._entries:
+                        self._forget(project_id)
+
+    def _read(self, project_id: str) -> ProjectGraph:
+        if self.remote is None:
+            return ProjectGraph(project_id, *self._read_file(project_id))
+        nodes, edges = self.remote.load(project_id, lambda: self._read_file(project_id))
+        graph = ProjectGraph(project_id, nodes, edges)
+        self.remote.install(project_id, graph)
+        return graph
+
+    def _read_file(self, project_id: str) -> Tuple[List[Dict], List[Dict]]:
+        path = self.path_for(project_id)
+        if not os.path.exists(path):
+            return [], []
+        with open(path, "rb") as stream:
+            return read_project(stream)
+
+    def _save(self, project_id: str, entry: _Entry) -> None:
+        """将项目的一致快照写回项目文件"""
+        with use_graph(entry.graph):
+            snapshot = graph_snapshot()
+        version: Tuple[int, int] = (snapshot.nodes.version, snapshot.edges.version)
+        self.write(project_id, snapshot.nodes.iter_dicts(), snapshot.edges.iter_dicts())
+        entry.saved_version = version
+
+    def write(self, project_id: str, nodes: Iterable[Dict], edges: Iterable[Dict]) -> None:
+        """将节点和边写入临时文件后原子替换项目文件；多进程模式下代理也用它写回共享副本"""
+        os.makedirs(self.directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=f".{project_id}.", dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as output:
+                for chunk in iter_project_json(nodes, edges):
+                    output.write(chunk)
+            os.replace(temp_path, self.path_for(project_id))
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+
+
+    def graph_sizes(self) -> List[Tuple[Tuple[str, str], int]]:
+        """已载入项目（包括默认图，项目ID为空）的节点和边数量"""
+        with self._lock:
+            graphs = [(project_id, entry.graph.nodes, entry.graph.edges) for project_id, entry in self._entries.items()]
+        graphs.append(("", NodeDatabase(), EdgeDatabase()))
+        sizes = []
+        for project_id, nodes, edges in graphs:
+            sizes.append(((project_id, "nodes"), len(nodes.snapshot())))
+            sizes.append(((project_id, "edges"), len(edges.snapshot())))
+        return sizes
+
+
+workspace = Workspace()
+atexit.register(workspace.flush)
+
+register_gauge(
+    "storyfactory_graph_items", "已载入的图中的节点和边数量，默认图的project为空", ("project", "kind"),
+    workspace.graph_sizes,
+)
+register_gauge(
+    "storyfactory_workspace_memory_bytes", "已载入项目的估算内存占用", (),
+    lambda: [((), workspace.memory_usage)],
+)
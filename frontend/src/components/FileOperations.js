@@ -1,42 +1,35 @@
 /**
  * @file 定义了文件操作的自定义 hook
- * @description 提供项目文件的保存和打开功能
+ * @description 提供项目文件的保存和打开功能，文件由后端流式导出和导入
  */
+import { exportProjectUrl, importProjectApi, getNodes, getEdges } from '../utils/api';
 
-const useFileOperations = ({ nodes, edges, setNodesAndEdges }) => {
+const useFileOperations = ({ setNodesAndEdges }) => {
     const handleSave = () => {
         const filename = window.prompt("Enter filename (e.g., my_project):", "project");
         if (filename) {
-            const flowData = { nodes, edges };
-            const json = JSON.stringify(flowData);
-            const blob = new Blob([json], { type: 'application/json' });
-            const url = URL.createObjectURL(blob);
             const a = document.createElement('a');
-            a.href = url;
+            a.href = exportProjectUrl(filename);
             a.download = `${filename}.storyfactory`;
             a.click();
-            URL.revokeObjectURL(url);
         }
     };
 
     const handleOpen = () => {
         const input = document.createElement('input');
         input.type = 'file';
-        input.accept = '.storyfactory';
-        input.onchange = (event) => {
+        input.accept = '.storyfactory,.gz';
+        input.onchange = async (event) => {
             const file = event.target.files[0];
             if (file) {
-                const reader = new FileReader();
-                reader.onload = (e) => {
-                    try {
-                        const flowData = JSON.parse(e.target.result);
-                        setNodesAndEdges(flowData.nodes || [], flowData.edges || []);
-                    } catch (error) {
-                        console.error("Error parsing .storyfactory file:", error);
-                        alert("Error opening file. Please ensure it's a valid .storyfactory file.");
-                    }
-                };
-                reader.readAsText(file);
+                try {
+                    await importProjectApi(file);
+                    const [nodes, edges] = await Promise.all([getNodes(), getEdges()]);
+                    setNodesAndEdges(nodes || [], edges || []);
+                } catch (error) {
+                    console.error("Error importing .storyfactory file:", error);
+                    alert("Error opening file. Please ensure it's a valid .storyfactory file.");
+                }
             }
         };
         input.click();
@@ -45,4 +38,4 @@ const useFileOperations = ({ nodes, edges, setNodesAndEdges }) => {
     return { handleSave, handleOpen };
 };
 
-export default useFileOperations; 
\ No newline at end of file
+export default useFileOperations;
@@ -1 +1,4 @@
-export const API_BASE_URL = process.env.REACT_APP_API_BASE_URL || "http://127.0.0.1:5000";
\ No newline at end of file
+export const API_BASE_URL = process.env.REACT_APP_API_BASE_URL || "http://127.0.0.1:5000";
+
+// 页面地址中的 ?project= 指定使用的项目，省略时使用默认图
+export const PROJECT_ID = new URLSearchParams(window.location.search).get('project');
\ No newline at end of file
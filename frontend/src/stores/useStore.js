@@ -10,13 +10,14 @@ import {
   addNodeApi,
   addEdgeApi,
   deleteNodeApi,
-  deleteRelatedEdgesApi,
+  deleteNodesApi,
   updateNodeTextApi,
 } from '../utils/api';
 
-import { API_BASE_URL } from '../config';
+import { API_BASE_URL, PROJECT_ID } from '../config';
 
-const socket = io(API_BASE_URL);
+// 只使用WebSocket：多进程部署时轮询请求可能被分配到不同的后端进程
+const socket = io(API_BASE_URL, { transports: ['websocket'] });
 
 const useStore = create((set, get) => ({
   nodes: [],
@@ -88,20 +89,36 @@ const useStore = create((set, get) => ({
     }
   },
 
+  removeDeleted: (nodeIds, edgeIds = []) => {
+    const deletedNodes = new Set(nodeIds);
+    const deletedEdges = new Set(edgeIds);
+    set((state) => ({
+      nodes: state.nodes.filter((node) => !deletedNodes.has(node.id)),
+      edges: state.edges.filter((edge) =>
+        !deletedEdges.has(edge.id) && !deletedNodes.has(edge.source) && !deletedNodes.has(edge.target)
+      ),
+    }));
+  },
+
   deleteNode: async (nodeId) => {
     try {
-      await deleteNodeApi(nodeId);
-      await deleteRelatedEdgesApi(nodeId);
-
-      set((state) => ({
-        nodes: state.nodes.filter((node) => node.id !== nodeId),
-        edges: state.edges.filter((edge) => edge.source !== nodeId && edge.target !== nodeId),
-      }));
+      // 后端在同一操作中删除节点及其相连的边
+      const result = await deleteNodeApi(nodeId);
+      get().removeDeleted([nodeId], result.deleted_edges);
     } catch (error) {
       console.error('Error deleting node:', error);
     }
   },
 
+  deleteNodes: async (nodeIds) => {
+    try {
+      const result = await deleteNodesApi(nodeIds);
+      get().removeDeleted(result.deleted_nodes, result.deleted_edges);
+    } catch (error) {
+      console.error('Error deleting nodes:', error);
+    }
+  },
+
   updateNodeStatus: (nodeId, status) => {
     set((state) => ({
       nodes: state.nodes.map((node) =>
@@ -140,8 +157,26 @@ const useStore = create((set, get) => ({
       set({ edges: data.edges });
     });
 
+    socket.on('graph_delta', (data) => {
+      get().removeDeleted(data.deleted_nodes || [], data.deleted_edges || []);
+      if (data.added_nodes || data.added_edges) {
+        set((state) => {
+          // 发起请求的客户端可能已经加入了这些元素，按ID去重
+          const nodeIds = new Set(state.nodes.map((node) => node.id));
+          const edgeIds = new Set(state.edges.map((edge) => edge.id));
+          return {
+            nodes: state.nodes.concat((data.added_nodes || []).filter((node) => !nodeIds.has(node.id))),
+            edges: state.edges.concat((data.added_edges || []).filter((edge) => !edgeIds.has(edge.id))),
+          };
+        });
+      }
+    });
+
     socket.on('connect', () => {
       console.log('WebSocket connected');
+      if (PROJECT_ID) {
+        socket.emit('project_join', { projectId: PROJECT_ID });
+      }
     });
 
     socket.on('disconnect', () => {
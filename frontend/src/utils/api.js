@@ -1,6 +1,8 @@
-import { API_BASE_URL } from '../config';
+import { API_BASE_URL, PROJECT_ID } from '../config';
 
-const BASE_URL = `${API_BASE_URL}/api`;
+const BASE_URL = PROJECT_ID
+  ? `${API_BASE_URL}/api/projects/${encodeURIComponent(PROJECT_ID)}`
+  : `${API_BASE_URL}/api`;
 
 const handleResponse = async (response) => {
     if (!response.ok) {
@@ -11,7 +13,7 @@ const handleResponse = async (response) => {
             // If response is not JSON, use status text
             errorData = { message: response.statusText };
         }
-        const errorMessage = errorData.message || `HTTP error! status: ${response.status}`;
+        const errorMessage = errorData.error || errorData.message || `HTTP error! status: ${response.status}`;
         console.error('API Error:', errorMessage, errorData);
         alert(`操作失败: ${errorMessage}`); // 用户通知
         throw new Error(errorMessage);
@@ -45,10 +47,16 @@ export const addEdgeApi = (connection) => apiCall('/edges', {
     body: JSON.stringify(connection),
 });
 
-export const deleteNodeApi = (nodeId) => apiCall(`/nodes/${nodeId}`, {
+export const deleteNodeApi = (nodeId, cascade = true) => apiCall(`/nodes/${nodeId}${cascade ? '?cascade=1' : ''}`, {
     method: 'DELETE',
 });
 
+export const deleteNodesApi = (ids, cascade = true) => apiCall('/nodes/delete', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ ids, cascade }),
+});
+
 export const deleteRelatedEdgesApi = (nodeId) => apiCall(`/edges/related_to/${nodeId}`, {
     method: 'DELETE',
 });
@@ -57,4 +65,45 @@ export const updateNodeTextApi = (nodeId, text) => apiCall(`/nodes/${nodeId}/tex
     method: 'PUT',
     headers: { 'Content-Type': 'application/json' },
     body: JSON.stringify({ text }),
-});
\ No newline at end of file
+});
+
+export const applyBatchApi = (operations) => apiCall('/batch', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ operations }),
+});
+
+export const bulkUpdatePositionsApi = (request) => apiCall('/nodes/positions/bulk', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(request),
+});
+
+export const layoutGraphApi = (options = {}) => apiCall('/layout', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify(options),
+});
+
+export const getAncestorsApi = (nodeId, depth) =>
+    apiCall(`/nodes/${nodeId}/ancestors${depth ? `?depth=${depth}` : ''}`);
+
+export const getDescendantsApi = (nodeId, depth) =>
+    apiCall(`/nodes/${nodeId}/descendants${depth ? `?depth=${depth}` : ''}`);
+
+export const cloneSubgraphApi = (ids, dx = 0, dy = 0) => apiCall('/subgraph/clone', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ ids, dx, dy }),
+});
+
+export const validateGraphApi = () => apiCall('/graph/validate');
+
+export const exportProjectUrl = (filename, gzip = false) =>
+    `${BASE_URL}/project/export?filename=${encodeURIComponent(filename)}${gzip ? '&gzip=1' : ''}`;
+
+export const importProjectApi = (file) => apiCall('/project/import', {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/octet-stream' },
+    body: file,
+});
@@ -1,3 +1,6 @@
+import argparse
+import hashlib
+import json
 import subprocess
 import os
 import sys
@@ -5,9 +8,21 @@ import time
 import shutil
 import atexit
 import threading
+import urllib.error
+import urllib.request
 
 running_processes = []
 
+BACKEND_URL = "http://127.0.0.1:5000"
+FRONTEND_URL = "http://localhost:3000"
+# 就绪探测的路径（后端的就绪检查，全部通过时返回200）
+BACKEND_READY_PATH = "/readyz"
+READY_TIMEOUT = 120  # 等待服务就绪的最长时间（秒）
+
+# 已安装依赖和前端构建对应的输入文件哈希，未变化时跳过安装和构建
+INSTALL_CACHE = ".start_app_cache.json"
+FRONTEND_BUILD_INPUTS = ("package.json", "package-lock.json", "public", "src")
+
 
 def _get_npm_path():
     npm_path = shutil.which("npm")
@@ -34,37 +49,178 @@ def _cleanup_processes():
     print("清理完成。")
 
 
-def install_dependencies():
-    print("安装后端依赖...")
+def _hash_paths(paths, extra=""):
+    """文件（目录则递归其中全部文件）路径和内容的SHA-256，不存在的路径记为缺失"""
+    digest = hashlib.sha256(extra.encode("utf-8"))
+    for path in paths:
+        files = [path]
+        if os.path.isdir(path):
+            files = sorted(
+                os.path.join(root, name)
+                for root, dirs, names in os.walk(path)
+                for name in names
+            )
+        for file_path in files:
+            digest.update(os.path.relpath(file_path, os.path.dirname(__file__) or ".").encode("utf-8"))
+            if os.path.isfile(file_path):
+                with open(file_path, "rb") as f:
+                    digest.update(hashlib.sha256(f.read()).digest())
+            else:
+                digest.update(b"\0missing")
+    return digest.hexdigest()
+
+
+def _load_cache():
     try:
-        subprocess.check_call(
-            [sys.executable, "-m", "pip", "install", "Flask", "Flask-CORS"],
-            stdout=subprocess.DEVNULL,  # 隐藏pip的详细输出
-            stderr=subprocess.PIPE,
-        )
-        print("后端依赖安装成功。")
-    except subprocess.CalledProcessError as e:
-        print(f"后端依赖安装失败: {e.stderr.decode().strip()}")
-        sys.exit(1)
+        with open(_get_project_path(INSTALL_CACHE), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
 
-    print("安装前端依赖...")
+
+_cache_lock = threading.Lock()
+
+
+def _update_cache(key, value):
+    with _cache_lock:
+        cache = _load_cache()
+        cache[key] = value
+        with open(_get_project_path(INSTALL_CACHE), "w", encoding="utf-8") as f:
+            json.dump(cache, f, indent=2)
+
+
+def _cached_step(key, fingerprint, ready, step, force=False):
+    """fingerprint与上次成功执行时相同且ready()为真时跳过step，返回是否执行了step"""
+    if not force and ready() and _load_cache().get(key) == fingerprint:
+        return False
+    step()
+    _update_cache(key, fingerprint)
+    return True
+
+
+def _run_quiet(command, cwd, name):
     try:
         subprocess.check_call(
-            [_get_npm_path(), "install"],
-            cwd=_get_project_path("frontend"),
-            stdout=subprocess.DEVNULL,  # 隐藏npm的详细输出
+            command,
+            cwd=cwd,
+            stdout=subprocess.DEVNULL,  # 隐藏pip/npm的详细输出
             stderr=subprocess.PIPE,
         )
-        print("前端依赖安装成功。")
+        print(f"{name}安装成功。")
     except subprocess.CalledProcessError as e:
-        print(f"前端依赖安装失败: {e.stderr.decode().strip()}")
+        print(f"{name}安装失败: {e.stderr.decode().strip()}")
         sys.exit(1)
 
 
-def start_backend():
+def install_backend_dependencies(force=False):
+    requirements = _get_project_path(os.path.join("backend", "requirements.txt"))
+    # 更换Python解释器（例如新的虚拟环境）后需要重新安装
+    fingerprint = _hash_paths([requirements], extra=sys.executable)
+
+    def install():
+        print("安装后端依赖...")
+        _run_quiet([sys.executable, "-m", "pip", "install", "-r", requirements], _get_project_path("."), "后端依赖")
+
+    if not _cached_step("backend", fingerprint, lambda: True, install, force):
+        print("后端依赖未变化，跳过安装。")
+
+
+def install_frontend_dependencies(force=False):
+    frontend = _get_project_path("frontend")
+    fingerprint = _hash_paths([os.path.join(frontend, "package.json"), os.path.join(frontend, "package-lock.json")])
+
+    def install():
+        print("安装前端依赖...")
+        _run_quiet([_get_npm_path(), "install"], frontend, "前端依赖")
+
+    if not _cached_step("frontend", fingerprint, lambda: os.path.isdir(os.path.join(frontend, "node_modules")),
+                        install, force):
+        print("前端依赖未变化，跳过安装。")
+
+
+def install_dependencies(force=False):
+    """并行安装后端和前端依赖，requirements.txt和package-lock.json未变化时跳过"""
+    failures = []
+
+    def run(step):
+        try:
+            step(force)
+        except SystemExit as e:
+            failures.append(e)
+
+    threads = [
+        threading.Thread(target=run, args=(install_backend_dependencies,)),
+        threading.Thread(target=run, args=(install_frontend_dependencies,)),
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if failures:
+        sys.exit(1)
+
+
+def build_frontend(force=False):
+    """构建前端，源码和依赖未变化且已有构建时跳过"""
+    frontend = _get_project_path("frontend")
+    fingerprint = _hash_paths([os.path.join(frontend, name) for name in FRONTEND_BUILD_INPUTS])
+
+    def build():
+        print("构建前端...")
+        try:
+            subprocess.check_call([_get_npm_path(), "run", "build"], cwd=frontend)
+        except subprocess.CalledProcessError as e:
+            print(f"前端构建失败: {e}")
+            sys.exit(1)
+
+    if not _cached_step("build", fingerprint, lambda: os.path.exists(os.path.join(frontend, "build", "index.html")),
+                        build, force):
+        print("前端源码未变化，使用已有构建。")
+
+
+def wait_until_ready(url, process, timeout=READY_TIMEOUT, interval=0.1):
+    """轮询url直到返回200，返回等待的秒数；进程退出或超时时返回None"""
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        if process.poll() is not None:
+            return None
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.perf_counter() - started
+        except (urllib.error.URLError, OSError):
+            pass
+        time.sleep(interval)
+    return None
+
+
+def _wait_for_services(services):
+    """并行等待各服务就绪，任一服务未就绪时退出"""
+    results = {}
+
+    def wait(name, url, process):
+        results[name] = wait_until_ready(url, process)
+
+    threads = [threading.Thread(target=wait, args=service) for service in services]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    for name, url, _ in services:
+        if results[name] is None:
+            print(f"错误: {name}未能在{READY_TIMEOUT}秒内就绪 ({url})")
+            sys.exit(1)
+        print(f"{name}已就绪，用时 {results[name]:.1f}s: {url}")
+
+
+def start_backend(prod=False):
     print("启动后端服务...")
+    command = [sys.executable, _get_project_path(os.path.join("backend", "app.py"))]
+    if prod:
+        command = [sys.executable, "-m", "backend.server", "--prod"]
     process = subprocess.Popen(
-        [sys.executable, _get_project_path(os.path.join("backend", "app.py"))],
+        command,
+        cwd=os.path.dirname(os.path.abspath(__file__)),
         stdout=sys.stdout,
         stderr=sys.stderr,
     )
@@ -95,34 +251,71 @@ def start_frontend_async(result_holder):
     result_holder["frontend"] = start_frontend()
 
 
+def run_production():
+    """生产模式：后端以协程服务器运行并直接提供前端构建，不启动前端开发服务器"""
+    build_frontend()
+    backend_process = start_backend(prod=True)
+    _wait_for_services([("后端", BACKEND_URL + BACKEND_READY_PATH, backend_process)])
+    print(f"Story Factory: {BACKEND_URL}\n按 Ctrl+C 停止服务。")
+    try:
+        sys.exit(backend_process.wait())
+    except KeyboardInterrupt:
+        print("\n检测到 Ctrl+C，正在关闭服务。")
+        sys.exit(0)
+
+
+def start_prebuilt():
+    """开发后端直接提供前端构建，不启动前端开发服务器；构建与后端启动并行"""
+    build = threading.Thread(target=build_frontend)
+    build.start()
+    backend_process = start_backend()
+    build.join()
+    _wait_for_services([("后端", BACKEND_URL + BACKEND_READY_PATH, backend_process)])
+    print(f"Story Factory: {BACKEND_URL}")
+    return [backend_process]
+
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="启动 Story Factory 应用")
+    parser.add_argument("--prod", action="store_true", help="生产模式（需要安装gevent或eventlet），前端源码有变化时先执行npm run build")
+    parser.add_argument("--prebuilt", action="store_true", help="由后端提供前端构建，不启动前端开发服务器")
+    parser.add_argument("--install", action="store_true", help="安装依赖，requirements.txt和package-lock.json未变化时跳过")
+    parser.add_argument("--force-install", action="store_true", help="忽略缓存重新安装依赖和构建前端")
+    args = parser.parse_args()
+
     print("准备启动 Story Factory 应用...")
 
     atexit.register(_cleanup_processes)
-    # install_dependencies()  # 如需自动安装依赖，取消注释
+    if args.install or args.force_install:
+        install_dependencies(force=args.force_install)
+    if args.force_install:
+        _update_cache("build", None)
 
-    result = {}
-    threads = [
-        threading.Thread(target=start_backend_async, args=(result,)),
-        threading.Thread(target=start_frontend_async, args=(result,)),
-    ]
-    for t in threads:
-        t.start()
-    for t in threads:
-        t.join()
+    if args.prod:
+        run_production()
 
-    backend_process = result["backend"]
-    frontend_process = result["frontend"]
+    if args.prebuilt:
+        processes = start_prebuilt()
+    else:
+        result = {}
+        threads = [
+            threading.Thread(target=start_backend_async, args=(result,)),
+            threading.Thread(target=start_frontend_async, args=(result,)),
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        processes = [result["backend"], result["frontend"]]
+        _wait_for_services([
+            ("后端", BACKEND_URL + BACKEND_READY_PATH, result["backend"]),
+            ("前端", FRONTEND_URL, result["frontend"]),
+        ])
 
-    print(
-        "后端: http://127.0.0.1:5000\n前端: http://localhost:3000\n按 Ctrl+C 停止服务。"
-    )
+    print("按 Ctrl+C 停止服务。")
     try:
         while True:
-            if (
-                backend_process.poll() is not None
-                or frontend_process.poll() is not None
-            ):
+            if any(process.poll() is not None for process in processes):
                 break
             time.sleep(1)
     except KeyboardInterrupt:
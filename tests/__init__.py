@@ -22,7 +22,8 @@ from .performance_test import (
     GenerateTextTest,
     UpdateNodeTextTest,
     ComplexWorkflowTest,
-    BulkOperationsTest
+    BulkOperationsTest,
+    BatchOperationsTest
 )
 
 # 导出安全测试类（条件导入，如果文件不存在则跳过）
@@ -60,7 +61,8 @@ __all__ = [
     'GenerateTextTest',
     'UpdateNodeTextTest',
     'ComplexWorkflowTest',
-    'BulkOperationsTest'
+    'BulkOperationsTest',
+    'BatchOperationsTest'
 ]
 
 # 添加可选的测试类
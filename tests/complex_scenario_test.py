@@ -330,36 +330,39 @@ class ComplexScenarioTest(unittest.TestCase):
             response = requests.post(f"{self.api_url}/edges", json=edge_data)
             response.raise_for_status()
         
-        # 4. 创建子节点之间的环形连接
-        for i in range(len(child_nodes)):
-            next_idx = (i + 1) % len(child_nodes)
+        # 4. 依次连接子节点，闭合成环的最后一条边应被拒绝
+        for i in range(len(child_nodes) - 1):
             edge_data = {
                 "source": child_nodes[i]["id"],
-                "target": child_nodes[next_idx]["id"]
+                "target": child_nodes[i + 1]["id"]
             }
             response = requests.post(f"{self.api_url}/edges", json=edge_data)
             response.raise_for_status()
         
+        closing_edge = {"source": child_nodes[-1]["id"], "target": child_nodes[0]["id"]}
+        response = requests.post(f"{self.api_url}/edges", json=closing_edge)
+        self.assertEqual(response.status_code, 409)
+        
         # 5. 验证所有连接的正确性
         edges_response = requests.get(f"{self.api_url}/edges")
         edges_response.raise_for_status()
         all_edges = edges_response.json()
         
-        # 应该有中心到子节点的边 + 子节点之间的环形连接边
-        expected_edge_count = len(child_nodes) + len(child_nodes)
+        # 应该有中心到子节点的边 + 子节点之间的连接边
+        expected_edge_count = len(child_nodes) + len(child_nodes) - 1
         self.assertEqual(len(all_edges), expected_edge_count)
         
         # 验证从中心出发的边
         center_outgoing = [e for e in all_edges if e["source"] == center_id]
         self.assertEqual(len(center_outgoing), len(child_nodes))
         
-        # 验证每个子节点都有一个传入和一个传出的边（除了与中心的连接）
+        # 验证链上每个子节点都有一个传入和一个传出的边（除了与中心的连接和链的两端）
         for child in child_nodes:
             child_id = child["id"]
             incoming = [e for e in all_edges if e["target"] == child_id and e["source"] != center_id]
             outgoing = [e for e in all_edges if e["source"] == child_id]
-            self.assertEqual(len(incoming), 1)
-            self.assertEqual(len(outgoing), 1)
+            self.assertEqual(len(incoming), 0 if child is child_nodes[0] else 1)
+            self.assertEqual(len(outgoing), 0 if child is child_nodes[-1] else 1)
         
         logger.info("复杂节点关系测试完成")
     
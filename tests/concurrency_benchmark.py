@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+"""
+图存储并发基准测试
+
+在进程内直接调用 NodeDatabase，比较不同读线程数下的读吞吐量。
+每个读操作在读锁内模拟一段不占用GIL的耗时（如向客户端写出响应），
+同时有写线程持续更新节点。作为对照，同样的负载也会在一把互斥锁下运行。
+"""
+import sys
+import os
+import json
+import time
+import logging
+import argparse
+import threading
+from contextlib import contextmanager
+
+# 添加项目路径到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from backend.database import NodeDatabase, EdgeDatabase, graph_lock
+from backend.models import Node
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('concurrency_benchmark')
+
+
+class _MutexAdapter:
+    """以同样的接口包装普通互斥锁，作为对照组"""
+
+    def __init__(self):
+        self._lock = threading.RLock()
+
+    @contextmanager
+    def read(self):
+        with self._lock:
+            yield
+
+    write = read
+
+
+def _prepare(node_count):
+    db = NodeDatabase()
+    EdgeDatabase()._edges = []
+    db._nodes = [
+        Node.create(node_type="chapter", data={"text": ""}, position={"x": i, "y": 0}, node_id=f"bench-{i}")
+        for i in range(node_count)
+    ]
+    return db
+
+
+def run_mixed_load(lock, readers, writers, duration, read_io_ms, node_count):
+    """运行一轮读写混合负载，返回每秒读写次数"""
+    db = _prepare(node_count)
+    stop = threading.Event()
+    counts = {"reads": 0, "writes": 0}
+    counter_lock = threading.Lock()
+
+    def reader():
+        done = 0
+        while not stop.is_set():
+            with lock.read():
+                db.get_by_id(f"bench-{done % node_count}")
+                time.sleep(read_io_ms / 1000)
+            done += 1
+        with counter_lock:
+            counts["reads"] += done
+
+    def writer():
+        done = 0
+        while not stop.is_set():
+            with lock.write():
+                db.update_text(f"bench-{done % node_count}", f"write {done}")
+            done += 1
+            time.sleep(0.001)
+        with counter_lock:
+            counts["writes"] += done
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return {"reads_per_sec": counts["reads"] / duration, "writes_per_sec": counts["writes"] / duration}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Story Factory 图存储并发基准测试")
+    parser.add_argument("--threads", type=str, default="1,2,4,8,16", help="读线程数列表，逗号分隔")
+    parser.add_argument("--writers", type=int, default=2, help="写线程数")
+    parser.add_argument("--duration", type=float, default=2.0, help="每轮运行的秒数")
+    parser.add_argument("--read-io-ms", type=float, default=1.0, help="每次读取在读锁内模拟的耗时（毫秒）")
+    parser.add_argument("--nodes", type=int, default=1000, help="图中的节点数量")
+    parser.add_argument("--output", type=str, help="将结果保存为JSON文件")
+    args = parser.parse_args()
+
+    results = []
+    for readers in [int(value) for value in args.threads.split(",")]:
+        for name, lock in (("rwlock", graph_lock), ("mutex", _MutexAdapter())):
+            stats = run_mixed_load(lock, readers, args.writers, args.duration, args.read_io_ms, args.nodes)
+            stats.update({"lock": name, "readers": readers, "writers": args.writers})
+            results.append(stats)
+            logger.info(
+                f"{name:6s} 读线程 {readers:3d}: "
+                f"读 {stats['reads_per_sec']:10.1f}/s, 写 {stats['writes_per_sec']:8.1f}/s"
+            )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        logger.info(f"结果已保存到 {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+"""
+进程内基准测试
+
+不需要启动后端：通过 create_app() 的 Flask 测试客户端调用接口，并直接调用
+NodeDatabase、EdgeDatabase、DataFlowManager、WorkflowEngine 和 Generator，
+测量不同规模（默认1k/10k/100k节点）的合成图上各操作的耗时，不包括回环网络的开销。
+
+图由 backend.synthetic 按 --shape 和 --seed 生成，由若干个约100个节点的故事组成，
+工作流从第一个故事的start节点执行；工作流引擎每次运行由快照建立一次邻接表，之后按节点查找前驱和后继。生成节点使用不访问网络的桩客户端，
+测量的是生成器本身（指标、追踪）的开销。
+
+统计项与 pytest-benchmark 相同（min/max/mean/stddev/median/iqr/ops/rounds）。
+--json 把结果写成JSON文件，--compare 与之前的结果文件比较中位数，
+任一项变慢超过 --threshold 时以退出码1结束，可用于CI中比较两个版本。
+"""
+import sys
+import os
+import json
+import time
+import random
+import logging
+import argparse
+import platform
+import statistics
+import subprocess
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+# 添加项目路径到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from backend import log
+from backend.api_generate import Generator
+from backend.database import EdgeDatabase, NodeDatabase, graph_snapshot
+from backend.execution_engine import DataFlowManager, WorkflowEngine
+from backend.synthetic import SHAPES, generate_story_graph, load_into_store
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('inprocess_benchmark')
+
+RESULT_FORMAT = "storyfactory-inprocess-benchmark/1"
+
+STORY_SIZE = 100  # 每个故事的节点数，工作流从第一个故事的start节点执行
+
+
+class _StubCompletions:
+    """立即返回固定结果的 chat.completions，替代网络请求"""
+
+    def create(self, model, messages):
+        message = SimpleNamespace(content="生成的文本")
+        usage = SimpleNamespace(prompt_tokens=12, completion_tokens=4)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)], usage=usage)
+
+
+def _stub_generator(generator):
+    generator._client = SimpleNamespace(chat=SimpleNamespace(completions=_StubCompletions()))
+    return generator
+
+
+def _workflow(graph):
+    """第一个故事的 (start, start之后的节点, end)"""
+    start = graph.starts[0]
+    following = next(edge["target"] for edge in graph.edges if edge["source"] == start)
+    # 故事依次生成，第一个end节点属于第一个故事
+    end = next(node["id"] for node in graph.nodes if node["type"] == "end")
+    return start, following, end
+
+
+class Runner:
+    """按 pytest-benchmark 的方式重复调用并统计耗时"""
+
+    def __init__(self, min_time, min_rounds, max_rounds, name_filter=None):
+        self.min_time = min_time
+        self.min_rounds = min_rounds
+        self.max_rounds = max_rounds
+        self.name_filter = name_filter
+        self.results = []
+
+    def run(self, group, name, nodes, func):
+        fullname = f"{group}/{name}[{nodes}]"
+        if self.name_filter and self.name_filter not in fullname:
+            return
+        func()  # 预热
+        timings = []
+        started = time.perf_counter()
+        while len(timings) < self.max_rounds and (
+            len(timings) < self.min_rounds or time.perf_counter() - started < self.min_time
+        ):
+            begin = time.perf_counter()
+            func()
+            timings.append(time.perf_counter() - begin)
+        stats = _stats(timings)
+        self.results.append({
+            "group": group, "name": name, "fullname": fullname, "params": {"nodes": nodes}, "stats": stats,
+        })
+        logger.info(
+            f"{fullname:48s} median {stats['median'] * 1000:10.3f}ms  min {stats['min'] * 1000:10.3f}ms  "
+            f"rounds {stats['rounds']}"
+        )
+
+
+def _stats(timings):
+    quartiles = statistics.quantiles(timings, n=4) if len(timings) > 1 else [timings[0]] * 3
+    mean = statistics.mean(timings)
+    return {
+        "min": min(timings),
+        "max": max(timings),
+        "mean": mean,
+        "stddev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "median": statistics.median(timings),
+        "iqr": quartiles[2] - quartiles[0],
+        "ops": 1 / mean if mean else 0.0,
+        "rounds": len(timings),
+        "total": sum(timings),
+    }
+
+
+def run_suite(runner, sizes, seed, shape="mixed"):
+    from backend.app import create_app
+    from backend.routes import workflow_service
+
+    # 日志照常进入队列（计入耗时），但不写到标准输出
+    log.configure(handler=logging.NullHandler())
+    app = create_app()
+    app.config["TESTING"] = True
+    client = app.test_client()
+    _stub_generator(workflow_service.workflow_engine.node_executor.generation_service.generator)
+
+    for size in sizes:
+        graph = generate_story_graph(size, seed, shape, STORY_SIZE)
+        nodes, edges = graph.nodes, graph.edges
+        start, following, end = _workflow(graph)
+        logger.info(f"合成图({shape}): {len(nodes)} 个节点, {len(edges)} 条边")
+        rng = random.Random(seed)
+        node_ids = [node["id"] for node in nodes]
+
+        runner.run("store", "load", size, lambda: load_into_store(graph))
+        node_db, edge_db = NodeDatabase(), EdgeDatabase()
+        runner.run("store", "get_all_nodes", size, node_db.get_all)
+        runner.run("store", "get_by_id", size, lambda: node_db.get_by_id(rng.choice(node_ids)))
+        runner.run("store", "update_text", size, lambda: node_db.update_text(rng.choice(node_ids), "修改后的文本"))
+        runner.run("store", "update_position", size,
+                   lambda: node_db.update_position(rng.choice(node_ids), rng.uniform(0, 10000), rng.uniform(0, 10000)))
+        runner.run("store", "query_bbox", size, lambda: node_db.get_in_bbox(0, 0, 2500, 1500))
+        runner.run("store", "graph_snapshot", size, graph_snapshot)
+        runner.run("store", "reachable[cached]", size, lambda: edge_db.reachable(start))
+
+        def reachable_cold():
+            edge_db._topology._reachable.clear()
+            return edge_db.reachable(start, forward=True), edge_db.reachable(end, forward=False)
+        runner.run("store", "reachable[cold]", size, reachable_cold)
+
+        flow = DataFlowManager()
+        executed = {node_id: {"output": {"text": "文本"}} for node_id in node_ids}
+        runner.run("dataflow", "get_node_inputs[snapshot]", size,
+                   lambda: flow.get_node_inputs(end, executed, graph_snapshot()))
+        runner.run("dataflow", "get_node_inputs[store]", size, lambda: flow.get_node_inputs(end, executed))
+        runner.run("dataflow", "get_next_nodes[snapshot]", size, lambda: flow.get_next_nodes(start, graph_snapshot()))
+
+        engine = WorkflowEngine()
+        _stub_generator(engine.node_executor.generation_service.generator)
+        result = engine.execute_workflow(start)
+        if not result.get("success"):
+            raise RuntimeError(f"合成图上的工作流执行失败: {result.get('error')}")
+        runner.run("engine", "execute_workflow", size, lambda: engine.execute_workflow(start))
+        runner.run("engine", "execute_single_node", size, lambda: engine.execute_single_node(following))
+
+        generator = _stub_generator(Generator())
+        runner.run("generator", "generate_with_default_messages", size,
+                   lambda: generator.generate_with_default_messages("继续写"))
+
+        runner.run("http", "GET /api/nodes?limit=100", size, lambda: client.get("/api/nodes?limit=100"))
+        runner.run("http", "GET /api/nodes", size, lambda: client.get("/api/nodes"))
+        runner.run("http", "GET /api/nodes?bbox", size, lambda: client.get("/api/nodes?bbox=0,0,2500,1500"))
+        runner.run("http", "PUT /api/nodes/<id>/text", size,
+                   lambda: client.put(f"/api/nodes/{rng.choice(node_ids)}/text", json={"text": "修改后的文本"}))
+        runner.run("http", "POST /api/workflow/execute", size,
+                   lambda: client.post("/api/workflow/execute", json={"start_node_id": start}))
+
+
+def _machine_info():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=parent_dir, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "backend"], cwd=parent_dir,
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    machine = {
+        "python_version": platform.python_version(),
+        "python_implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+    }
+    return machine, {"id": commit, "dirty": dirty}
+
+
+def compare(baseline_path, results, threshold):
+    """与之前的结果比较中位数，返回变慢超过threshold的项"""
+    with open(baseline_path, encoding="utf-8") as stream:
+        baseline = {entry["fullname"]: entry["stats"] for entry in json.load(stream)["benchmarks"]}
+    regressions = []
+    for entry in results:
+        old = baseline.get(entry["fullname"])
+        if old is None:
+            continue
+        change = entry["stats"]["median"] / old["median"] - 1 if old["median"] else 0.0
+        marker = "  <-- 变慢" if change > threshold else ""
+        logger.info(f"{entry['fullname']:48s} {old['median'] * 1000:10.3f}ms -> "
+                    f"{entry['stats']['median'] * 1000:10.3f}ms ({change:+.1%}){marker}")
+        if change > threshold:
+            regressions.append(entry["fullname"])
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Story Factory 进程内基准测试")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="图的节点数量")
+    parser.add_argument("--seed", type=int, default=0, help="生成合成图的随机种子")
+    parser.add_argument("--shape", choices=SHAPES, default="mixed", help="合成图的形状")
+    parser.add_argument("--min-time", type=float, default=0.5, help="每项至少测量的时间（秒）")
+    parser.add_argument("--min-rounds", type=int, default=3, help="每项至少重复的次数")
+    parser.add_argument("--max-rounds", type=int, default=1000, help="每项最多重复的次数")
+    parser.add_argument("--filter", help="只运行全名包含该字符串的项，如 engine/ 或 [10000]")
+    parser.add_argument("--json", help="把结果写到该JSON文件")
+    parser.add_argument("--compare", help="与之前 --json 写出的结果文件比较")
+    parser.add_argument("--threshold", type=float, default=0.2, help="中位数变慢超过该比例时视为退化")
+    args = parser.parse_args()
+
+    runner = Runner(args.min_time, args.min_rounds, args.max_rounds, args.filter)
+    run_suite(runner, args.sizes, args.seed, args.shape)
+
+    if args.json:
+        machine_info, commit_info = _machine_info()
+        with open(args.json, "w", encoding="utf-8") as stream:
+            json.dump({
+                "format": RESULT_FORMAT,
+                "datetime": datetime.now(timezone.utc).isoformat(),
+                "machine_info": machine_info,
+                "commit_info": commit_info,
+                "options": {"sizes": args.sizes, "seed": args.seed, "shape": args.shape, "min_time": args.min_time},
+                "benchmarks": runner.results,
+            }, stream, ensure_ascii=False, indent=2)
+        logger.info(f"结果已写入 {args.json}")
+
+    if args.compare:
+        regressions = compare(args.compare, runner.results, args.threshold)
+        if regressions:
+            logger.error(f"{len(regressions)} 项变慢超过 {args.threshold:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
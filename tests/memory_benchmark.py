@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+图存储内存占用测试
+
+使用 tracemalloc 比较同一批节点和边以普通字典列表保存，与以存储内部的形式
+（NodeRecord / EdgeRecord 快照表和坐标列）保存时的内存占用。
+"""
+import sys
+import os
+import gc
+import json
+import logging
+import argparse
+import tracemalloc
+import uuid
+
+# 添加项目路径到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+from backend.columns import NodeTable
+from backend.models import Node, Edge, NodeRecord, EdgeRecord, node_point
+from backend.persistent import SnapshotTable
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('memory_benchmark')
+
+NODE_TYPES = ("start", "text", "generate", "chapter", "end")
+
+
+def _source_graph(count):
+    """以JSON文本形式生成图数据，模拟从请求或项目文件中解析出的独立对象"""
+    node_ids = [str(uuid.uuid4()) for _ in range(count)]
+    nodes = [
+        Node.create(
+            node_type=NODE_TYPES[i % len(NODE_TYPES)],
+            data={"label": f"Node {i}"},
+            position={"x": i * 10, "y": (i % 100) * 20},
+            source_position="right",
+            target_position="left",
+            node_id=node_ids[i],
+        )
+        for i in range(count)
+    ]
+    edges = [
+        Edge.create(source=node_ids[i], target=node_ids[i + 1], edge_data={"sourceHandle": "out", "targetHandle": "in"})
+        for i in range(count - 1)
+    ]
+    return json.dumps(nodes), json.dumps(edges)
+
+
+def _measure(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Story Factory 图存储内存占用测试")
+    parser.add_argument("--nodes", type=int, default=100000, help="节点数量")
+    args = parser.parse_args()
+
+    nodes_json, edges_json = _source_graph(args.nodes)
+    results = {}
+    for name, build in (
+        ("dict", lambda: (json.loads(nodes_json), json.loads(edges_json))),
+        ("record", lambda: (
+            NodeTable.build((NodeRecord.from_dict(node), node_point(node)) for node in json.loads(nodes_json)),
+            SnapshotTable.build(EdgeRecord.from_dict(edge) for edge in json.loads(edges_json)),
+        )),
+    ):
+        graph, size = _measure(build)
+        results[name] = size
+        logger.info(f"{name:6s}: {size / 1024 / 1024:8.1f} MiB, 每节点(含一条边) {size / args.nodes:6.0f} 字节")
+        del graph
+
+    saved = 1 - results["record"] / results["dict"]
+    logger.info(f"节省 {saved:.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -259,6 +259,48 @@ class BulkOperationsTest(PerformanceTest):
             requests.delete(f"{self.api_url}/nodes/{node_id}")
 
 
+class BatchOperationsTest(PerformanceTest):
+    """测试通过 /batch 接口一次性完成批量操作的性能，与BulkOperationsTest对比"""
+    
+    def __init__(self, api_url=DEFAULT_API_URL, bulk_size=20):
+        super().__init__(api_url)
+        self.bulk_size = bulk_size
+    
+    def _execute_test(self):
+        # 1. 一个请求创建所有节点和连接相邻节点的边
+        operations = [
+            {
+                "op": "create_node",
+                "temp_id": f"bulk-{i}",
+                "node": {
+                    "type": "text",
+                    "data": {"label": f"Batch Node {i}"},
+                    "position": {"x": i * 50, "y": i * 30}
+                }
+            }
+            for i in range(self.bulk_size)
+        ]
+        operations.extend(
+            {
+                "op": "create_edge",
+                "edge": {"source": f"bulk-{i}", "target": f"bulk-{i + 1}"}
+            }
+            for i in range(self.bulk_size - 1)
+        )
+        response = requests.post(f"{self.api_url}/batch", json={"operations": operations})
+        response.raise_for_status()
+        id_map = response.json()["id_map"]
+        
+        # 2. 一个请求清理创建的节点和边
+        operations = [
+            {"op": "delete_edge", "id": edge["id"]}
+            for edge in response.json()["results"] if "source" in edge
+        ]
+        operations.extend({"op": "delete_node", "id": node_id} for node_id in id_map.values())
+        response = requests.post(f"{self.api_url}/batch", json={"operations": operations})
+        response.raise_for_status()
+
+
 def run_concurrent_test(test_class, api_url, iterations, concurrent_users):
     """运行并发测试"""
     def worker(result_queue):
@@ -363,7 +405,8 @@ def main(iterations=DEFAULT_ITERATIONS, concurrent_users=DEFAULT_CONCURRENT_USER
         GenerateTextTest,
         UpdateNodeTextTest,  # 新增测试类
         ComplexWorkflowTest,  # 新增测试类
-        BulkOperationsTest    # 新增测试类
+        BulkOperationsTest,   # 新增测试类
+        BatchOperationsTest
     ]
     
     results = {}
@@ -390,7 +433,7 @@ def main(iterations=DEFAULT_ITERATIONS, concurrent_users=DEFAULT_CONCURRENT_USER
             logger.info(f"运行并发测试: {test_name}")
             
             # 跳过复杂工作流的并发测试，可能会引起冲突
-            if test_name in ["ComplexWorkflowTest", "BulkOperationsTest"]:
+            if test_name in ["ComplexWorkflowTest", "BulkOperationsTest", "BatchOperationsTest"]:
                 logger.info(f"跳过 {test_name} 的并发测试，避免资源冲突")
                 continue
                 
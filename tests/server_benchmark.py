@@ -0,0 +1,174 @@
+#!/usr/bin/env python
+"""
+后端服务模式基准测试
+
+分别以开发模式（Werkzeug开发服务器，与 python backend/app.py 相同）和生产模式
+（python -m backend.server --prod，协程服务器）启动后端，比较：
+  1. 并发WebSocket客户端：同时连接的客户端数、连接耗时，以及一次修改推送到全部客户端的耗时
+  2. HTTP吞吐量：多个线程持续请求 GET /api/nodes 的每秒请求数和延迟
+生产模式需要安装 gevent 或 eventlet，并已构建 frontend/build。
+"""
+import sys
+import os
+import pty
+import time
+import signal
+import logging
+import argparse
+import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import socketio
+
+# 添加项目路径到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('server_benchmark')
+
+MODES = {
+    "dev": [],
+    "prod": ["--prod", "--host", "127.0.0.1"],
+}
+
+
+def _start_server(mode, port, timeout=30):
+    """启动后端并等待其可以响应请求"""
+    # Flask-SocketIO只允许在终端中启动Werkzeug开发服务器，标准输入使用伪终端
+    _, terminal = pty.openpty()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "backend.server", "--port", str(port), *MODES[mode]],
+        cwd=parent_dir, start_new_session=True,
+        stdin=terminal, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"{mode} 模式启动失败，退出码 {process.returncode}")
+        try:
+            requests.get(f"http://127.0.0.1:{port}/api/nodes?limit=1", timeout=1)
+            return process
+        except requests.RequestException:
+            time.sleep(0.2)
+    _stop_server(process)
+    raise RuntimeError(f"{mode} 模式启动超时")
+
+
+def _stop_server(process):
+    # 开发模式的自动重载会启动子进程，需终止整个进程组
+    try:
+        os.killpg(process.pid, signal.SIGTERM)
+        process.wait(timeout=10)
+    except (ProcessLookupError, subprocess.TimeoutExpired):
+        os.killpg(process.pid, signal.SIGKILL)
+
+
+def bench_websockets(base_url, clients):
+    """并发连接WebSocket客户端，测量连接耗时和一次广播的送达耗时"""
+    received = threading.Semaphore(0)
+    connected = []
+    lock = threading.Lock()
+
+    def connect(_):
+        client = socketio.Client(reconnection=False)
+        client.on("nodes_update", lambda data: received.release())
+        try:
+            client.connect(base_url, transports=["websocket"], wait_timeout=10)
+        except Exception:
+            return
+        with lock:
+            connected.append(client)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(clients, 200)) as pool:
+        list(pool.map(connect, range(clients)))
+    connect_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    requests.post(f"{base_url}/api/nodes", json={"type": "text", "data": {}, "position": {"x": 0, "y": 0}})
+    delivered = 0
+    for _ in connected:
+        if not received.acquire(timeout=10):
+            break
+        delivered += 1
+    fanout_time = time.perf_counter() - started
+
+    for client in connected:
+        client.disconnect()
+    return {"connected": len(connected), "connect_s": connect_time, "delivered": delivered, "fanout_s": fanout_time}
+
+
+def bench_http(base_url, threads, duration):
+    """多线程持续请求节点列表，返回每秒请求数和延迟分位数"""
+    stop = time.perf_counter() + duration
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+
+    def worker():
+        session = requests.Session()
+        local = []
+        while time.perf_counter() < stop:
+            started = time.perf_counter()
+            try:
+                session.get(f"{base_url}/api/nodes?limit=50", timeout=10).raise_for_status()
+                local.append(time.perf_counter() - started)
+            except requests.RequestException:
+                with lock:
+                    errors[0] += 1
+        with lock:
+            latencies.extend(local)
+
+    workers = [threading.Thread(target=worker) for _ in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    latencies.sort()
+    count = len(latencies)
+    return {
+        "rps": count / duration,
+        "p50_ms": latencies[count // 2] * 1000 if count else 0,
+        "p95_ms": latencies[int(count * 0.95)] * 1000 if count else 0,
+        "errors": errors[0],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Story Factory 后端服务模式基准测试")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES), help="要测试的模式")
+    parser.add_argument("--clients", type=int, default=500, help="并发WebSocket客户端数")
+    parser.add_argument("--threads", type=int, default=32, help="HTTP请求线程数")
+    parser.add_argument("--duration", type=float, default=10, help="HTTP吞吐量测试时长（秒）")
+    parser.add_argument("--port", type=int, default=5100, help="开发模式使用的端口，生产模式使用该端口+1")
+    args = parser.parse_args()
+
+    for mode in args.modes:
+        port = args.port if mode == "dev" else args.port + 1
+        base_url = f"http://127.0.0.1:{port}"
+        try:
+            process = _start_server(mode, port)
+        except RuntimeError as e:
+            logger.error(e)
+            continue
+        try:
+            ws = bench_websockets(base_url, args.clients)
+            logger.info(
+                f"{mode:4s} WebSocket: 连接 {ws['connected']}/{args.clients} 个, 耗时 {ws['connect_s']:.2f}s; "
+                f"广播送达 {ws['delivered']} 个, 耗时 {ws['fanout_s'] * 1000:.0f}ms"
+            )
+            http = bench_http(base_url, args.threads, args.duration)
+            logger.info(
+                f"{mode:4s} HTTP: {http['rps']:8.1f} req/s, p50 {http['p50_ms']:.1f}ms, "
+                f"p95 {http['p95_ms']:.1f}ms, 错误 {http['errors']}"
+            )
+        finally:
+            _stop_server(process)
+
+
+if __name__ == "__main__":
+    main()
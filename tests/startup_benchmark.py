@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+"""
+后端冷启动基准测试
+
+  1. 导入耗时：以 python -X importtime 导入 backend.app，输出总耗时和耗时最多的模块
+  2. 首个成功响应耗时：从启动后端进程到 GET /api/nodes 首次返回200的时间
+
+自动扩缩容的新实例在冷启动完成前无法接收流量，任一中位数超出预算时以退出码1结束，
+可用于CI中检查冷启动是否退化。生产模式需要安装 gevent 或 eventlet，并已构建 frontend/build。
+"""
+import sys
+import os
+import pty
+import time
+import signal
+import logging
+import argparse
+import statistics
+import subprocess
+from collections import defaultdict
+
+import requests
+
+# 添加项目路径到系统路径
+current_dir = os.path.dirname(os.path.abspath(__file__))
+parent_dir = os.path.dirname(current_dir)
+sys.path.append(parent_dir)
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger('startup_benchmark')
+
+MODES = {
+    "dev": [],
+    "prod": ["--prod", "--host", "127.0.0.1"],
+}
+
+
+def measure_imports(module="backend.app"):
+    """以 -X importtime 导入模块，返回 (总耗时毫秒, {顶层包: 自身耗时毫秒})"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=parent_dir, capture_output=True, text=True, check=True,
+    )
+    total_us = 0
+    packages = defaultdict(int)
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        fields = line[len("import time:"):].split("|")
+        try:
+            self_us, cumulative_us = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue  # 表头
+        name = fields[2].strip()
+        packages[name.split(".")[0]] += self_us
+        if name == module:
+            total_us = cumulative_us
+    return total_us / 1000, {name: us / 1000 for name, us in packages.items()}
+
+
+def time_to_first_200(mode, port, timeout=60):
+    """启动后端并返回到首次成功响应的秒数"""
+    # Flask-SocketIO只允许在终端中启动Werkzeug开发服务器，标准输入使用伪终端
+    _, terminal = pty.openpty()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "backend.server", "--port", str(port), *MODES[mode]],
+        cwd=parent_dir, start_new_session=True,
+        stdin=terminal, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        session = requests.Session()
+        while time.perf_counter() - started < timeout:
+            if process.poll() is not None:
+                raise RuntimeError(f"{mode} 模式启动失败，退出码 {process.returncode}")
+            try:
+                if session.get(f"http://127.0.0.1:{port}/api/nodes?limit=1", timeout=1).status_code == 200:
+                    return time.perf_counter() - started
+            except requests.RequestException:
+                pass
+            time.sleep(0.01)
+        raise RuntimeError(f"{mode} 模式启动超时")
+    finally:
+        # 开发模式的自动重载会启动子进程，需终止整个进程组
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+            process.wait(timeout=10)
+        except (ProcessLookupError, subprocess.TimeoutExpired):
+            os.killpg(process.pid, signal.SIGKILL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Story Factory 后端冷启动基准测试")
+    parser.add_argument("--modes", nargs="+", choices=list(MODES), default=list(MODES), help="要测试的模式")
+    parser.add_argument("--runs", type=int, default=5, help="每项测量的重复次数，取中位数")
+    parser.add_argument("--top", type=int, default=10, help="输出导入耗时最多的顶层包数量")
+    parser.add_argument("--import-budget-ms", type=float, default=500, help="导入 backend.app 的耗时预算（毫秒）")
+    parser.add_argument("--first-200-budget-ms", type=float, default=3000, help="首个成功响应的耗时预算（毫秒）")
+    parser.add_argument("--port", type=int, default=5200, help="开发模式使用的端口，生产模式使用该端口+1")
+    args = parser.parse_args()
+
+    over_budget = False
+
+    totals = []
+    packages = {}
+    for _ in range(args.runs):
+        total, packages = measure_imports()
+        totals.append(total)
+    import_ms = statistics.median(totals)
+    logger.info(f"导入 backend.app: 中位数 {import_ms:.0f}ms (最小 {min(totals):.0f}ms)，预算 {args.import_budget_ms:.0f}ms")
+    for name, ms in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        logger.info(f"  {name:24s} {ms:8.1f}ms")
+    over_budget |= import_ms > args.import_budget_ms
+
+    for mode in args.modes:
+        port = args.port if mode == "dev" else args.port + 1
+        try:
+            samples = [time_to_first_200(mode, port) * 1000 for _ in range(args.runs)]
+        except RuntimeError as e:
+            logger.error(e)
+            continue
+        first_ms = statistics.median(samples)
+        logger.info(
+            f"{mode:4s} 首个200响应: 中位数 {first_ms:.0f}ms (最小 {min(samples):.0f}ms)，"
+            f"预算 {args.first_200_budget_ms:.0f}ms"
+        )
+        over_budget |= first_ms > args.first_200_budget_ms
+
+    if over_budget:
+        logger.error("冷启动超出预算")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import unittest
+import json
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.app import create_app
+from backend.database import NodeDatabase, EdgeDatabase
+from backend.extensions import socketio
+from backend.services import NodeService, EdgeService, BatchService, BatchOperationError
+
+
+class TestBatchOperations(unittest.TestCase):
+    """测试批量修改接口"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+        NodeDatabase()._nodes = []
+        EdgeDatabase()._edges = []
+        self.node_service = NodeService()
+        self.edge_service = EdgeService()
+        self.batch_service = BatchService()
+        self.existing = self.node_service.create_node({
+            "type": "chapter",
+            "data": {"label": "Existing"},
+            "position": {"x": 0, "y": 0}
+        })
+
+    def test_temp_id_references(self):
+        """测试后续操作可以引用临时ID"""
+        result = self.batch_service.apply([
+            {"op": "create_node", "temp_id": "a", "node": {"type": "start", "position": {"x": 1, "y": 1}}},
+            {"op": "create_node", "temp_id": "b", "node": {"type": "end", "position": {"x": 2, "y": 2}}},
+            {"op": "create_edge", "temp_id": "ab", "edge": {"source": "a", "target": "b"}},
+            {"op": "update_node", "id": "b", "node": {"data": {"label": "Renamed"}}},
+            {"op": "update_edge", "id": "ab", "edge": {"label": "a to b"}},
+        ])
+        id_map = result["id_map"]
+        self.assertEqual(set(id_map), {"a", "b", "ab"})
+        edge = self.edge_service.get_edge(id_map["ab"])
+        self.assertEqual((edge["source"], edge["target"]), (id_map["a"], id_map["b"]))
+        self.assertEqual(edge["label"], "a to b")
+        self.assertEqual(self.node_service.get_node(id_map["b"])["data"]["label"], "Renamed")
+        self.assertTrue(result["nodes_changed"])
+        self.assertTrue(result["edges_changed"])
+
+    def test_failed_batch_rolls_back(self):
+        """测试任一操作失败时全部回滚"""
+        nodes_before = json.dumps(self.node_service.get_all_nodes(), sort_keys=True)
+        with self.assertRaises(BatchOperationError) as context:
+            self.batch_service.apply([
+                {"op": "create_node", "temp_id": "a", "node": {"type": "start"}},
+                {"op": "update_node", "id": self.existing["id"], "node": {"position": {"x": 99, "y": 99}}},
+                {"op": "delete_node", "id": self.existing["id"]},
+                {"op": "create_edge", "edge": {"source": "a"}},
+            ])
+        self.assertEqual(context.exception.index, 3)
+        self.assertEqual(json.dumps(self.node_service.get_all_nodes(), sort_keys=True), nodes_before)
+        self.assertEqual(self.edge_service.get_all_edges(), [])
+        # 索引同样回滚
+        self.assertEqual(self.node_service.get_node(self.existing["id"])["position"], {"x": 0, "y": 0})
+        self.assertEqual(len(self.node_service.get_all_nodes(bbox=(-1, -1, 1, 1))), 1)
+
+    def test_batch_api_single_broadcast(self):
+        """测试批量接口只推送一次节点和边的更新"""
+        listener = socketio.test_client(self.app)
+        try:
+            listener.get_received()
+            operations = [
+                {"op": "create_node", "temp_id": f"n{i}", "node": {"type": "text", "position": {"x": i, "y": 0}}}
+                for i in range(20)
+            ]
+            operations += [
+                {"op": "create_edge", "edge": {"source": f"n{i}", "target": f"n{i + 1}"}}
+                for i in range(19)
+            ]
+            response = self.client.post('/api/batch', json={"operations": operations})
+            self.assertEqual(response.status_code, 200)
+            body = json.loads(response.data)
+            self.assertEqual(len(body["results"]), 39)
+            self.assertEqual(len(self.node_service.get_all_nodes()), 21)
+
+            names = [r["name"] for r in listener.get_received()]
+            self.assertEqual(names.count("nodes_update"), 1)
+            self.assertEqual(names.count("edges_update"), 1)
+        finally:
+            listener.disconnect()
+
+    def test_batch_api_errors(self):
+        """测试批量接口的错误处理"""
+        response = self.client.post('/api/batch', json={"operations": "not a list"})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post('/api/batch', json={"operations": [
+            {"op": "create_node", "node": {"type": "text"}},
+            {"op": "explode"},
+        ]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.data)["index"], 1)
+        self.assertEqual(len(self.node_service.get_all_nodes()), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
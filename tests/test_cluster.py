@@ -0,0 +1,205 @@
+import unittest
+import os
+import queue
+import shutil
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.bus import GRAPH_CHANNEL, BusBroker, BusClient
+from backend.cluster import GraphReplicator
+from backend.services import NodeService, EdgeService
+from backend.workspace import Workspace
+
+
+def _node(label):
+    return {"type": "text", "data": {"label": label, "text": ""}, "position": {"x": 0, "y": 0}}
+
+
+def _wait_for(condition, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.01)
+    return condition()
+
+
+class TestBus(unittest.TestCase):
+    """测试消息总线代理"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.broker = BusBroker(os.path.join(self.directory, "bus.sock")).start()
+        self.clients = []
+
+    def tearDown(self):
+        for client in self.clients:
+            client.close()
+        self.broker.stop()
+        shutil.rmtree(self.directory)
+
+    def _client(self):
+        client = BusClient(self.broker.path)
+        received = queue.Queue()
+        client.subscribe(GRAPH_CHANNEL, received.put)
+        client.start()
+        self.clients.append(client)
+        return client, received
+
+    def test_messages_have_one_global_order(self):
+        """测试所有进程（包括发布者）按同一顺序收到消息"""
+        (a, a_received), (b, b_received) = self._client(), self._client()
+        threads = [
+            threading.Thread(target=lambda c=c, name=name: [
+                c.publish(GRAPH_CHANNEL, {"type": "note", "graph": "p", "n": f"{name}{i}"}) for i in range(50)
+            ])
+            for c, name in ((a, "a"), (b, "b"))
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        a_order = [a_received.get(timeout=5)["n"] for _ in range(100)]
+        b_order = [b_received.get(timeout=5)["n"] for _ in range(100)]
+        self.assertEqual(a_order, b_order)
+
+    def test_shared_copy_uses_first_seed(self):
+        """测试代理只采用第一个种子，并把之后的修改应用到共享副本"""
+        a, received = self._client()
+        a.request_snapshot("p")
+        self.assertIsNone(received.get(timeout=5)["nodes"])
+        for label in ("first", "second"):
+            a.publish(GRAPH_CHANNEL, {"type": "seed", "graph": "p", "nodes": [{"id": label}], "edges": []})
+        a.publish(GRAPH_CHANNEL, {"type": "change", "graph": "p", "kind": "nodes", "origin": "x",
+                                  "items": [{"id": "n1"}], "deleted": ["first"], "replace": False})
+        a.request_snapshot("p")
+        messages = [received.get(timeout=5) for _ in range(4)]
+        self.assertEqual(messages[-1]["type"], "snapshot")
+        self.assertEqual(messages[-1]["nodes"], [{"id": "n1"}])
+
+    def test_stalled_connection_does_not_block_others(self):
+        """测试不读取消息的连接不会阻塞其他进程，断开的连接也不影响代理"""
+        stalled = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        stalled.connect(self.broker.path)
+        a, received = self._client()
+        payload = "x" * 50000
+        # 远超socket缓冲区的数据量，代理在锁内发送时会卡在stalled上
+        for i in range(200):
+            a.publish(GRAPH_CHANNEL, {"type": "note", "graph": "p", "n": i, "payload": payload})
+        self.assertEqual([received.get(timeout=5)["n"] for _ in range(200)], list(range(200)))
+        stalled.close()
+        b, _ = self._client()
+        b.request_snapshot("p")
+        b.close()
+        a.request_snapshot("p")
+        self.assertEqual(received.get(timeout=5)["type"], "snapshot")
+
+
+class TestGraphReplication(unittest.TestCase):
+    """测试两个工作进程之间的项目图同步（在同一进程内模拟）"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.persisted = {}
+        self.broker = BusBroker(
+            os.path.join(self.directory, "bus.sock"),
+            persist=lambda key, nodes, edges: self.persisted.__setitem__(key, nodes),
+        ).start()
+        self.workers = []
+        for name in ("a", "b"):
+            # 各自的项目目录，验证载入时使用的是共享副本而不是磁盘上的旧数据
+            workspace = Workspace(os.path.join(self.directory, name))
+            client = BusClient(self.broker.path)
+            replicator = GraphReplicator(client, workspace).start()
+            client.start()
+            self.workers.append((workspace, replicator))
+        self.node_service = NodeService()
+        self.edge_service = EdgeService()
+
+    def tearDown(self):
+        for workspace, replicator in self.workers:
+            replicator.stop()
+            workspace.unload_all()
+            replicator.client.close()
+        self.broker.stop()
+        shutil.rmtree(self.directory)
+
+    def _nodes(self, worker):
+        workspace, _ = self.workers[worker]
+        with workspace.open("story"):
+            return sorted(self.node_service.get_all_nodes(), key=lambda node: node["id"])
+
+    def test_changes_reach_other_worker(self):
+        """测试一个进程的新增、修改和删除同步到另一个进程"""
+        (a, _), (b, _) = self.workers
+        with a.open("story"):
+            first = self.node_service.create_node(_node("first"))
+            second = self.node_service.create_node(_node("second"))
+            self.edge_service.create_edge({"source": first["id"], "target": second["id"]})
+        self.assertTrue(_wait_for(lambda: len(self._nodes(1)) == 2))
+        with b.open("story"):
+            self.assertEqual(len(self.edge_service.get_all_edges()), 1)
+            self.node_service.update_node_text(first["id"], "updated by b")
+            self.node_service.delete_nodes([second["id"]])
+
+        def synced():
+            with a.open("story"):
+                node = self.node_service.get_node(first["id"])
+                return (node["data"]["text"] == "updated by b" and self.node_service.get_node(second["id"]) is None
+                        and self.edge_service.get_all_edges() == [])
+        self.assertTrue(_wait_for(synced))
+
+    def test_concurrent_writes_converge(self):
+        """测试两个进程同时修改同一节点时，最终都采用总线顺序中最后的修改"""
+        (a, _), (b, _) = self.workers
+        with a.open("story"):
+            node_id = self.node_service.create_node(_node("shared"))["id"]
+        self.assertTrue(_wait_for(lambda: len(self._nodes(1)) == 1))
+
+        def write(workspace, name):
+            for i in range(30):
+                with workspace.open("story"):
+                    self.node_service.update_node_text(node_id, f"{name}{i}")
+
+        threads = [threading.Thread(target=write, args=(a, "a")), threading.Thread(target=write, args=(b, "b"))]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertTrue(_wait_for(lambda: self._nodes(0) == self._nodes(1)))
+
+    def test_reload_uses_shared_copy(self):
+        """测试卸载后重新载入时取得其他进程在此期间的修改"""
+        (a, _), (b, _) = self.workers
+        with a.open("story"):
+            node_id = self.node_service.create_node(_node("shared"))["id"]
+        self.assertTrue(_wait_for(lambda: len(self._nodes(1)) == 1))
+        b.unload_all()
+        with a.open("story"):
+            self.node_service.update_node_text(node_id, "while unloaded")
+        # b写回磁盘的是修改前的数据，重新载入时应以代理的共享副本为准
+        self.assertTrue(_wait_for(lambda: self._nodes(1)[0]["data"]["text"] == "while unloaded"))
+
+    def test_shared_copy_is_dropped_when_no_worker_holds_it(self):
+        """测试所有进程都卸载项目后，代理写回并丢弃共享副本"""
+        (a, _), (b, _) = self.workers
+        with a.open("story"):
+            node_id = self.node_service.create_node(_node("shared"))["id"]
+        self.assertTrue(_wait_for(lambda: len(self._nodes(1)) == 1))
+        a.unload_all()
+        with b.open("story"):
+            self.node_service.update_node_text(node_id, "last change")
+        self.assertIn("story", self.broker._graphs)
+        b.unload_all()
+        self.assertTrue(_wait_for(lambda: "story" not in self.broker._graphs))
+        self.assertEqual([node["data"]["text"] for node in self.persisted["story"]], ["last change"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -7,6 +7,7 @@ from flask import Flask
 # 添加项目根目录到Python路径
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from backend.database import graph_snapshot
 from backend.execution_engine import WorkflowEngine, NodeExecutor, DataFlowManager, NodeStatus
 from backend.services import NodeService, EdgeService, WorkflowExecutionService
 from backend.models import Node, Edge
@@ -143,6 +144,21 @@ class TestExecutionEngine(unittest.TestCase):
         
         print("数据流管理器测试通过")
     
+    def test_data_flow_uses_snapshot_adjacency(self):
+        """测试基于快照的查找使用该快照的边，之后的修改只在新快照和边存储中可见"""
+        data_flow = DataFlowManager()
+        snapshot = graph_snapshot()
+        self.assertEqual(data_flow.get_next_nodes(self.text_node["id"], snapshot), [self.generate_node["id"]])
+        
+        self.edge_service.delete_edge(self.edge2["id"])
+        self._create_edge(self.text_node["id"], self.end_node["id"])
+        self.assertEqual(data_flow.get_next_nodes(self.text_node["id"], snapshot), [self.generate_node["id"]])
+        self.assertEqual(data_flow.get_next_nodes(self.text_node["id"], graph_snapshot()), [self.end_node["id"]])
+        self.assertEqual(data_flow.get_next_nodes(self.text_node["id"]), [self.end_node["id"]])
+        executed = {self.text_node["id"]: {"output": {"text": "文本"}}}
+        self.assertEqual(data_flow.get_node_inputs(self.end_node["id"], executed), {"text": "文本"})
+        self.assertEqual(data_flow.get_node_inputs(self.generate_node["id"], executed, snapshot), {"text": "文本"})
+    
     def test_workflow_engine(self):
         """测试工作流引擎"""
         print("\n测试工作流引擎...")
@@ -187,6 +203,13 @@ class TestExecutionEngine(unittest.TestCase):
         self.assertIn(self.start_node["id"], status["executed_nodes"])
         
         print("工作流服务测试通过")
+    
+    def test_workflow_finds_start_node(self):
+        """测试未指定开始节点时自动找到start类型的节点"""
+        result = WorkflowEngine().execute_workflow()
+        
+        self.assertTrue(result["success"], result.get("error"))
+        self.assertIn(self.start_node["id"], result["executed_nodes"])
 
 
 if __name__ == "__main__":
@@ -0,0 +1,190 @@
+import unittest
+import json
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.app import create_app
+from backend.database import NodeDatabase, EdgeDatabase
+from backend.services import NodeService, EdgeService
+from backend.extensions import socketio
+from backend.spatial import GridIndex
+
+
+class TestGraphListing(unittest.TestCase):
+    """测试节点和边列表的分页、字段裁剪与类型过滤"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+        NodeDatabase()._nodes = []
+        EdgeDatabase()._edges = []
+        self.node_service = NodeService()
+        self.edge_service = EdgeService()
+
+        self.nodes = []
+        for i in range(5):
+            self.nodes.append(self.node_service.create_node({
+                "type": "chapter" if i % 2 else "start",
+                "data": {"label": f"Node {i}", "text": "很长的章节内容" * 10},
+                "position": {"x": i * 100, "y": 0}
+            }))
+        for i in range(4):
+            self.edge_service.create_edge({
+                "source": self.nodes[i]["id"],
+                "target": self.nodes[i + 1]["id"],
+                "type": "smoothstep" if i % 2 else "default"
+            })
+
+    def test_service_pagination(self):
+        """测试服务层游标分页"""
+        first = self.node_service.get_all_nodes(limit=2)
+        self.assertEqual([n["id"] for n in first], [n["id"] for n in self.nodes[:2]])
+
+        second = self.node_service.get_all_nodes(limit=2, after=first[-1]["id"])
+        self.assertEqual([n["id"] for n in second], [n["id"] for n in self.nodes[2:4]])
+
+        with self.assertRaises(ValueError):
+            self.node_service.get_all_nodes(after="missing-id")
+
+    def test_service_projection_and_filter(self):
+        """测试服务层字段裁剪与类型过滤"""
+        nodes = self.node_service.get_all_nodes(fields=["type", "position", "data.label"], types=["chapter"])
+        self.assertEqual(len(nodes), 2)
+        for node in nodes:
+            self.assertEqual(set(node.keys()), {"id", "type", "position", "data"})
+            self.assertEqual(set(node["data"].keys()), {"label"})
+            self.assertEqual(node["type"], "chapter")
+
+        edges = self.edge_service.get_all_edges(types=["smoothstep"], fields=["source"])
+        self.assertEqual(len(edges), 2)
+        self.assertEqual(set(edges[0].keys()), {"id", "source"})
+
+    def test_api_pagination(self):
+        """测试节点列表API分页与下一页游标"""
+        collected = []
+        after = None
+        while True:
+            url = '/api/nodes?limit=2&fields=id,type'
+            if after:
+                url += f'&after={after}'
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            page = json.loads(response.data)
+            collected.extend(page)
+            after = response.headers.get("X-Next-Cursor")
+            if not after:
+                break
+        self.assertEqual([n["id"] for n in collected], [n["id"] for n in self.nodes])
+        self.assertNotIn("data", collected[0])
+
+    def test_api_invalid_arguments(self):
+        """测试无效的分页参数"""
+        self.assertEqual(self.client.get('/api/nodes?limit=abc').status_code, 400)
+        self.assertEqual(self.client.get('/api/nodes?limit=0').status_code, 400)
+        self.assertEqual(self.client.get('/api/edges?after=missing-id').status_code, 400)
+
+    def test_api_etag_varies_with_query(self):
+        """测试不同查询参数的ETag不同"""
+        full = self.client.get('/api/nodes')
+        filtered = self.client.get('/api/nodes?types=chapter')
+        self.assertNotEqual(full.headers["ETag"], filtered.headers["ETag"])
+        self.assertEqual(len(json.loads(filtered.data)), 2)
+
+
+class TestSpatialQueries(unittest.TestCase):
+    """测试基于空间索引的可视区域查询"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+        NodeDatabase()._nodes = []
+        EdgeDatabase()._edges = []
+        self.node_service = NodeService()
+        self.inside = self.node_service.create_node({"type": "chapter", "position": {"x": 100, "y": 100}})
+        self.outside = self.node_service.create_node({"type": "chapter", "position": {"x": 5000, "y": 5000}})
+
+    def test_grid_index(self):
+        """测试网格索引的插入、移动和删除"""
+        index = GridIndex(cell_size=10)
+        index.insert("a", (1, 1))
+        index.insert("b", (25, 25))
+        index.insert("c", (-15, 3))
+        self.assertEqual(sorted(index.query((0, 0, 30, 30))), ["a", "b"])
+        self.assertEqual(index.query((-20, 0, -10, 10)), ["c"])
+
+        index.insert("a", (100, 100))
+        self.assertEqual(index.query((0, 0, 30, 30)), ["b"])
+        index.remove("b")
+        self.assertEqual(index.query((0, 0, 30, 30)), [])
+        self.assertEqual(sorted(index.query((-1e9, -1e9, 1e9, 1e9))), ["a", "c"])
+
+    def test_bbox_follows_position_updates(self):
+        """测试位置更新后范围查询结果随之变化"""
+        nodes = self.node_service.get_all_nodes(bbox=(0, 0, 1000, 1000))
+        self.assertEqual([n["id"] for n in nodes], [self.inside["id"]])
+
+        self.node_service.update_node_position(self.outside["id"], 500, 500)
+        nodes = self.node_service.get_all_nodes(bbox=(0, 0, 1000, 1000))
+        self.assertEqual(len(nodes), 2)
+
+        self.node_service.delete_node(self.inside["id"])
+        self.node_service.update_node(self.outside["id"], {"position": {"x": -5, "y": 0}})
+        self.assertEqual(self.node_service.get_all_nodes(bbox=(0, 0, 1000, 1000)), [])
+
+    def test_bbox_api(self):
+        """测试节点列表API的bbox参数"""
+        response = self.client.get('/api/nodes?bbox=1000,1000,0,0&fields=id,position')
+        self.assertEqual(response.status_code, 200)
+        nodes = json.loads(response.data)
+        self.assertEqual([n["id"] for n in nodes], [self.inside["id"]])
+
+        self.assertEqual(self.client.get('/api/nodes?bbox=1,2,3').status_code, 400)
+        self.assertEqual(self.client.get('/api/nodes?bbox=a,b,c,d').status_code, 400)
+        self.assertEqual(self.client.get('/api/nodes?bbox=0,0,inf,1').status_code, 400)
+        self.assertEqual(self.client.get('/api/nodes?bbox=nan,0,1,1').status_code, 400)
+
+    def test_viewport_subscription(self):
+        """测试订阅可视区域的客户端只收到可见节点的移动事件"""
+        mover = socketio.test_client(self.app)
+        watcher = socketio.test_client(self.app)
+        full = socketio.test_client(self.app)
+        try:
+            watcher.emit("viewport_subscribe", {"bbox": [0, 0, 1000, 1000]})
+            received = watcher.get_received()
+            initial = next(r for r in received if r["name"] == "viewport_nodes")
+            self.assertEqual([n["id"] for n in initial["args"][0]["nodes"]], [self.inside["id"]])
+            full.get_received()
+
+            # 可视区域外的移动只推送给全图客户端
+            mover.emit("node_move", {"nodeId": self.outside["id"], "x": 6000, "y": 6000})
+            self.assertEqual([r for r in watcher.get_received() if r["name"] == "node_updated"], [])
+            self.assertEqual(len([r for r in full.get_received() if r["name"] == "node_updated"]), 1)
+
+            # 进入可视区域的移动两类客户端都会收到
+            mover.emit("node_move", {"nodeId": self.outside["id"], "x": 10, "y": 10})
+            self.assertEqual(len([r for r in watcher.get_received() if r["name"] == "node_updated"]), 1)
+            self.assertEqual(len([r for r in full.get_received() if r["name"] == "node_updated"]), 1)
+
+            # 发起移动的客户端不会收到自己的事件
+            self.assertEqual([r for r in mover.get_received() if r["name"] == "node_updated"], [])
+
+            # 取消订阅后恢复接收全部事件
+            watcher.emit("viewport_unsubscribe")
+            mover.emit("node_move", {"nodeId": self.outside["id"], "x": 9000, "y": 9000})
+            self.assertEqual(len([r for r in watcher.get_received() if r["name"] == "node_updated"]), 1)
+        finally:
+            for client in (mover, watcher, full):
+                client.disconnect()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import gzip
+import json
+import os
+import sys
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.app import create_app
+from backend.database import NodeDatabase, EdgeDatabase
+from backend.services import NodeService
+
+
+class TestHttpCache(unittest.TestCase):
+    """测试ETag与响应压缩"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+        NodeDatabase()._nodes = []
+        EdgeDatabase()._edges = []
+        self.node_service = NodeService()
+        self.node_service.create_node({
+            "type": "chapter",
+            "data": {"label": "Cached Node", "text": "x" * 2048},
+            "position": {"x": 0, "y": 0}
+        })
+
+    def test_nodes_etag_and_not_modified(self):
+        """测试节点列表的ETag与304响应"""
+        response = self.client.get('/api/nodes')
+        self.assertEqual(response.status_code, 200)
+        etag = response.headers.get("ETag")
+        self.assertIsNotNone(etag)
+
+        response = self.client.get('/api/nodes', headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+
+        # 修改数据后ETag应失效
+        self.node_service.create_node({"type": "start", "position": {"x": 1, "y": 1}})
+        response = self.client.get('/api/nodes', headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers.get("ETag"), etag)
+
+    def test_edges_etag(self):
+        """测试边列表的ETag"""
+        response = self.client.get('/api/edges')
+        etag = response.headers.get("ETag")
+        self.assertIsNotNone(etag)
+        response = self.client.get('/api/edges', headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_gzip_compression(self):
+        """测试较大的图数据响应被压缩"""
+        response = self.client.get('/api/nodes', headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers.get("Content-Encoding"), "gzip")
+        self.assertIn("Accept-Encoding", response.headers.get("Vary", ""))
+        nodes = json.loads(gzip.decompress(response.data))
+        self.assertEqual(len(nodes), 1)
+
+        # 压缩后的ETag同样可以用于条件请求
+        etag = response.headers.get("ETag")
+        response = self.client.get(
+            '/api/nodes', headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+        )
+        self.assertEqual(response.status_code, 304)
+
+        # 未声明支持压缩时返回原始内容
+        response = self.client.get('/api/nodes')
+        self.assertNotIn("Content-Encoding", response.headers)
+
+    def test_precompressed_static_files(self):
+        """测试优先使用预压缩的静态文件"""
+        with tempfile.TemporaryDirectory() as static_folder:
+            content = b"console.log('story factory');" * 100
+            with open(os.path.join(static_folder, "main.js"), "wb") as f:
+                f.write(content)
+            with open(os.path.join(static_folder, "main.js.gz"), "wb") as f:
+                f.write(gzip.compress(content))
+            self.app.static_folder = static_folder
+
+            response = self.client.get('/main.js', headers={"Accept-Encoding": "gzip"})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.headers.get("Content-Encoding"), "gzip")
+            self.assertIn("javascript", response.mimetype)
+            self.assertEqual(gzip.decompress(response.data), content)
+            response.close()
+
+            response = self.client.get('/main.js')
+            self.assertNotIn("Content-Encoding", response.headers)
+            self.assertEqual(response.data, content)
+            response.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
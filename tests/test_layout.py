@@ -0,0 +1,120 @@
+import unittest
+import json
+import os
+import random
+import sys
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.app import create_app
+from backend.database import NodeDatabase, EdgeDatabase
+from backend.extensions import socketio
+from backend.layout import layered_layout
+from backend.services import NodeService, EdgeService
+
+
+def _crossings(coords, edges, index):
+    """统计相邻两层之间的边交叉数"""
+    segments = [(coords[index[s]], coords[index[t]]) for s, t in edges]
+    count = 0
+    for i, (a1, b1) in enumerate(segments):
+        for a2, b2 in segments[i + 1:]:
+            if a1[0] == a2[0] and b1[0] == b2[0] and (a1[1] - a2[1]) * (b1[1] - b2[1]) < 0:
+                count += 1
+    return count
+
+
+class TestLayeredLayout(unittest.TestCase):
+    """测试分层布局算法"""
+
+    def test_layers_follow_edges(self):
+        """测试每条边都从较前的层指向较后的层"""
+        ids = ["start", "a", "b", "c", "end"]
+        edges = [("start", "a"), ("start", "b"), ("a", "c"), ("b", "end"), ("c", "end"), ("start", "end")]
+        coords, layers = layered_layout(ids, edges)
+        index = {node_id: i for i, node_id in enumerate(ids)}
+        self.assertEqual(layers, 4)
+        for source, target in edges:
+            self.assertLess(coords[index[source]][0], coords[index[target]][0])
+        self.assertEqual(coords[index["end"]][0], 3 * 250)
+        # 同层节点不重叠
+        self.assertEqual(len({tuple(point) for point in coords.tolist()}), len(ids))
+
+    def test_cycles_and_direction(self):
+        """测试有环的图也能布局，TB方向沿y轴分层"""
+        ids = ["a", "b", "c"]
+        coords, layers = layered_layout(ids, [("a", "b"), ("b", "c"), ("c", "a"), ("a", "a")], direction="TB")
+        self.assertEqual(layers, 3)
+        self.assertEqual(sorted(coords[:, 1].tolist()), [0, 250, 500])
+        with self.assertRaises(ValueError):
+            layered_layout(ids, [], direction="RL")
+
+    def test_barycenter_removes_crossings(self):
+        """测试重心法消除可以避免的交叉"""
+        ids = ["a", "b", "c", "d", "e"]
+        edges = [("b", "d"), ("b", "e"), ("c", "d")]
+        index = {node_id: i for i, node_id in enumerate(ids)}
+        unordered, _ = layered_layout(ids, edges, sweeps=0)
+        self.assertEqual(_crossings(unordered.tolist(), edges, index), 1)
+        coords, _ = layered_layout(ids, edges)
+        self.assertEqual(_crossings(coords.tolist(), edges, index), 0)
+
+    def test_large_graph_is_fast(self):
+        """测试一万个节点的布局耗时远小于一秒"""
+        rng = random.Random(3)
+        ids = [f"n{i}" for i in range(10000)]
+        edges = [(ids[i], ids[rng.randrange(i + 1, min(len(ids), i + 40))]) for i in range(len(ids) - 1)]
+        edges += [(rng.choice(ids), rng.choice(ids)) for _ in range(10000)]
+        started = time.perf_counter()
+        coords, _ = layered_layout(ids, edges)
+        self.assertLess(time.perf_counter() - started, 0.5)
+        self.assertEqual(coords.shape, (10000, 2))
+
+
+class TestLayoutAPI(unittest.TestCase):
+    """测试自动布局接口"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+        NodeDatabase()._nodes = []
+        EdgeDatabase()._edges = []
+        self.node_service = NodeService()
+        self.edge_service = EdgeService()
+        self.nodes = [
+            self.node_service.create_node({"type": "text", "position": {"x": 0, "y": 0}}) for _ in range(3)
+        ]
+        self.edge_service.create_edge({"source": self.nodes[0]["id"], "target": self.nodes[1]["id"]})
+        self.edge_service.create_edge({"source": self.nodes[1]["id"], "target": self.nodes[2]["id"]})
+
+    def test_layout_writes_positions_with_single_broadcast(self):
+        """测试布局写入全部坐标且只推送一次节点更新"""
+        listener = socketio.test_client(self.app)
+        try:
+            listener.get_received()
+            response = self.client.post('/api/layout', json={"origin": [100, 50], "layer_spacing": 300})
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.data), {"updated": 3, "layers": 3})
+            names = [r["name"] for r in listener.get_received()]
+            self.assertEqual(names.count("nodes_update"), 1)
+            self.assertEqual(names.count("node_updated"), 0)
+        finally:
+            listener.disconnect()
+        positions = [self.node_service.get_node(node["id"])["position"] for node in self.nodes]
+        self.assertEqual(positions, [{"x": 100, "y": 50}, {"x": 400, "y": 50}, {"x": 700, "y": 50}])
+        self.assertEqual(len(self.node_service.get_all_nodes(bbox=(650, 0, 750, 100))), 1)
+
+    def test_layout_errors(self):
+        """测试非法参数"""
+        self.assertEqual(self.client.post('/api/layout', json={"direction": "up"}).status_code, 400)
+        self.assertEqual(self.client.post('/api/layout', json={"node_spacing": 0}).status_code, 400)
+        self.assertEqual(self.node_service.get_node(self.nodes[2]["id"])["position"], {"x": 0, "y": 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
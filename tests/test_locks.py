@@ -0,0 +1,144 @@
+import unittest
+import os
+import sys
+import threading
+import time
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.database import NodeDatabase, EdgeDatabase
+from backend.locks import ReadWriteLock
+from backend.services import NodeService
+
+
+class TestReadWriteLock(unittest.TestCase):
+    """测试读写锁"""
+
+    def test_concurrent_readers(self):
+        """测试多个读者可以同时持有读锁"""
+        lock = ReadWriteLock()
+        barrier = threading.Barrier(4, timeout=2)
+        errors = []
+
+        def reader():
+            try:
+                with lock.read():
+                    # 所有读者都进入临界区后才能通过屏障
+                    barrier.wait()
+            except threading.BrokenBarrierError as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=reader) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+
+    def test_writer_is_exclusive(self):
+        """测试写者持锁期间读者被阻塞"""
+        lock = ReadWriteLock()
+        events = []
+        lock.acquire_write()
+
+        def reader():
+            with lock.read():
+                events.append("read")
+
+        thread = threading.Thread(target=reader)
+        thread.start()
+        time.sleep(0.05)
+        events.append("write done")
+        lock.release_write()
+        thread.join()
+        self.assertEqual(events, ["write done", "read"])
+
+    def test_read_timeout(self):
+        """测试写者持锁期间限时获取读锁超时返回False，释放后可以取得"""
+        lock = ReadWriteLock()
+        lock.acquire_write()
+        results = []
+        thread = threading.Thread(target=lambda: results.append(lock.acquire_read(0.05)))
+        thread.start()
+        thread.join(2)
+        self.assertEqual(results, [False])
+        lock.release_write()
+        self.assertTrue(lock.acquire_read(0.05))
+        lock.release_read()
+
+    def test_reentrancy(self):
+        """测试重入以及写者内部读取"""
+        lock = ReadWriteLock()
+        with lock.write():
+            with lock.write():
+                with lock.read():
+                    pass
+        with lock.read():
+            with lock.read():
+                with self.assertRaises(RuntimeError):
+                    lock.acquire_write()
+        # 全部释放后其他线程可以获取写锁
+        acquired = []
+        thread = threading.Thread(target=lambda: (lock.acquire_write(), acquired.append(True), lock.release_write()))
+        thread.start()
+        thread.join(2)
+        self.assertEqual(acquired, [True])
+
+
+class TestConcurrentStore(unittest.TestCase):
+    """测试并发修改图存储"""
+
+    def setUp(self):
+        """测试前准备"""
+        NodeDatabase()._nodes = []
+        EdgeDatabase()._edges = []
+        self.node_service = NodeService()
+
+    def test_no_lost_writes(self):
+        """测试并发更新、删除和遍历不会丢失写入"""
+        nodes = [
+            self.node_service.create_node({"type": "chapter", "data": {"text": ""}, "position": {"x": i, "y": 0}})
+            for i in range(40)
+        ]
+        victims = [self.node_service.create_node({"type": "chapter"}) for _ in range(40)]
+        errors = []
+
+        def writer(offset):
+            try:
+                for round_index in range(20):
+                    for node in nodes[offset::4]:
+                        self.node_service.update_node_text(node["id"], f"round {round_index}")
+            except Exception as e:
+                errors.append(e)
+
+        def deleter():
+            try:
+                for node in victims:
+                    self.node_service.delete_node(node["id"])
+            except Exception as e:
+                errors.append(e)
+
+        def reader():
+            try:
+                for _ in range(50):
+                    for node in self.node_service.get_all_nodes():
+                        node["data"]
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer, args=(i,)) for i in range(4)]
+        threads += [threading.Thread(target=deleter)] + [threading.Thread(target=reader) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(self.node_service.get_all_nodes()), 40)
+        for node in nodes:
+            self.assertEqual(self.node_service.get_node(node["id"])["data"]["text"], "round 19")
+
+
+if __name__ == '__main__':
+    unittest.main()
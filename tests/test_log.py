@@ -0,0 +1,95 @@
+import unittest
+import json
+import logging
+import os
+import queue
+import sys
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend import log
+from backend.app import create_app
+from backend.metrics import log_records_dropped
+from backend.tracing import run_trace
+
+
+class _ListHandler(logging.Handler):
+    """把格式化后的JSON记录保存在列表中"""
+
+    def __init__(self):
+        super().__init__()
+        self.setFormatter(log.JsonFormatter())
+        self.entries = []
+
+    def emit(self, record):
+        self.entries.append(json.loads(self.format(record)))
+
+
+class TestStructuredLog(unittest.TestCase):
+    """测试结构化日志"""
+
+    def setUp(self):
+        self.app = create_app()
+        self.app.config["TESTING"] = True
+        self.client = self.app.test_client()
+        # 换成保存记录的handler，shutdown会先写完队列中的记录
+        log.shutdown()
+        self.handler = _ListHandler()
+        log.configure(handler=self.handler)
+        self.logger = log.get_logger("tests")
+
+    def tearDown(self):
+        log.shutdown()
+
+    def _entries(self, event=None):
+        log.shutdown()
+        return [entry for entry in self.handler.entries if event is None or entry.get("event") == event]
+
+    def test_records_are_json_with_fields_and_run_id(self):
+        """测试记录输出为JSON，包括extra字段、异常和当前运行的run_id"""
+        with run_trace("workflow") as trace:
+            log.log_event(self.logger, "unit.done", node_id="n1", count=3)
+        try:
+            raise ValueError("坏数据")
+        except ValueError:
+            self.logger.exception("处理失败")
+        done, failed = self._entries()
+        self.assertEqual((done["event"], done["node_id"], done["count"]), ("unit.done", "n1", 3))
+        self.assertEqual(done["run_id"], trace.id)
+        self.assertEqual(done["logger"], "storyfactory.tests")
+        self.assertEqual(failed["level"], "ERROR")
+        self.assertIn("ValueError: 坏数据", failed["exc"])
+        self.assertNotIn("run_id", failed)
+
+    def test_high_frequency_events_are_sampled(self):
+        """测试配置了抽样的事件每N次只记录一次"""
+        with mock.patch.dict(log._sampler.every, {"unit.move": 10}):
+            for _ in range(25):
+                log.log_event(self.logger, "unit.move")
+        entries = self._entries("unit.move")
+        self.assertEqual(len(entries), 3)
+        self.assertTrue(all(entry["sample_every"] == 10 for entry in entries))
+
+    def test_request_id_is_logged_and_returned(self):
+        """测试访问日志带有request_id，请求头中的ID原样使用并在响应头中返回"""
+        response = self.client.get("/api/nodes", headers={"X-Request-ID": "req-1"})
+        self.assertEqual(response.headers["X-Request-ID"], "req-1")
+        generated = self.client.get("/api/edges").headers["X-Request-ID"]
+        self.assertEqual(len(generated), 32)
+        entries = self._entries("http.request")
+        self.assertEqual([entry["request_id"] for entry in entries], ["req-1", generated])
+        self.assertEqual((entries[0]["method"], entries[0]["path"], entries[0]["status"]), ("GET", "/api/nodes", 200))
+
+    def test_full_queue_drops_records(self):
+        """测试队列满时丢弃记录而不阻塞"""
+        handler = log._QueueHandler(queue.Queue(maxsize=1))
+        before = log_records_dropped.value()
+        for _ in range(3):
+            handler.emit(logging.LogRecord("storyfactory.tests", logging.INFO, "", 0, "msg", (), None))
+        self.assertEqual(log_records_dropped.value(), before + 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
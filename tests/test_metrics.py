@@ -0,0 +1,136 @@
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend import extensions, metrics
+from backend.app import create_app
+from backend.database import NodeDatabase, EdgeDatabase, graph_lock
+from backend.extensions import client_projects, socketio
+from backend.metrics import Counter, Histogram, Registry
+from backend.workspace import workspace
+
+
+class TestExposition(unittest.TestCase):
+    """测试Prometheus文本格式"""
+
+    def test_histogram_buckets_are_cumulative(self):
+        """测试直方图按上界累计计数，并输出总和与次数"""
+        registry = Registry()
+        histogram = registry.register(Histogram("latency_seconds", "耗时", ("route",), buckets=(0.1, 1)))
+        for value in (0.05, 0.5, 0.5, 3):
+            histogram.observe(value, "/api/nodes")
+        lines = registry.render().splitlines()
+        self.assertIn('latency_seconds_bucket{route="/api/nodes",le="0.1"} 1', lines)
+        self.assertIn('latency_seconds_bucket{route="/api/nodes",le="1"} 3', lines)
+        self.assertIn('latency_seconds_bucket{route="/api/nodes",le="+Inf"} 4', lines)
+        self.assertIn('latency_seconds_sum{route="/api/nodes"} 4.05', lines)
+        self.assertIn('latency_seconds_count{route="/api/nodes"} 4', lines)
+        self.assertIn("# TYPE latency_seconds histogram", lines)
+
+    def test_label_values_are_escaped(self):
+        """测试标签值中的引号、反斜杠和换行被转义"""
+        registry = Registry()
+        counter = registry.register(Counter("events_total", "事件", ("event",)))
+        counter.inc('a"b\\c\nd', amount=2)
+        self.assertIn('events_total{event="a\\"b\\\\c\\nd"} 2', registry.render().splitlines())
+
+
+class TestEndpoints(unittest.TestCase):
+    """测试健康检查、就绪检查和指标接口"""
+
+    def setUp(self):
+        self.app = create_app()
+        self.app.config["TESTING"] = True
+        self.client = self.app.test_client()
+        self.directory = tempfile.mkdtemp()
+        self.previous_directory = workspace.directory
+        workspace.directory = self.directory
+        NodeDatabase()._nodes = []
+        EdgeDatabase()._edges = []
+
+    def tearDown(self):
+        workspace.unload_all()
+        workspace.directory = self.previous_directory
+        shutil.rmtree(self.directory)
+
+    def test_health_and_ready(self):
+        """测试存活检查总是200，就绪检查有检查失败时返回503"""
+        self.assertEqual(self.client.get("/healthz").status_code, 200)
+        response = self.client.get("/readyz")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.get_json()["checks"]["graph"])
+        with mock.patch.dict(metrics._readiness_checks, {"broken": lambda: False}):
+            response = self.client.get("/readyz")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.get_json()["checks"]["broken"], False)
+
+    def test_ready_fails_while_write_lock_held(self):
+        """测试其他线程长时间持有图写锁时就绪检查返回503而不是阻塞"""
+        locked, release = threading.Event(), threading.Event()
+
+        def hold():
+            with graph_lock.write():
+                locked.set()
+                release.wait(10)
+
+        holder = threading.Thread(target=hold)
+        holder.start()
+        try:
+            locked.wait(5)
+            with mock.patch("backend.routes.READINESS_LOCK_TIMEOUT", 0.05):
+                response = self.client.get("/readyz")
+            self.assertEqual(response.status_code, 503)
+            self.assertFalse(response.get_json()["checks"]["graph"])
+        finally:
+            release.set()
+            holder.join()
+        self.assertEqual(self.client.get("/readyz").status_code, 200)
+
+    def test_metrics_cover_routes_events_and_graph(self):
+        """测试请求耗时按路由规则分组，并导出Socket.IO事件、连接数和图大小"""
+        node_id = self.client.post("/api/nodes", json={"type": "text", "data": {}}).get_json()["id"]
+        self.client.put(f"/api/nodes/{node_id}/text", json={"text": "更新"})
+        self.client.get("/api/projects/metrics-test/nodes")
+        etag = self.client.get("/api/nodes").headers["ETag"]
+        self.client.get("/api/nodes", headers={"If-None-Match": etag})
+
+        before = metrics.socketio_events.value("nodes_update_request")
+        client = socketio.test_client(self.app)
+        client.emit("nodes_update_request")
+        self.assertEqual(metrics.socketio_events.value("nodes_update_request"), before + 1)
+
+        body = self.client.get("/metrics").get_data(as_text=True)
+        client.disconnect()
+        self.assertIn('method="PUT",route="/api/nodes/<id>/text",status="200"', body)
+        self.assertIn('route="/api/projects/<project_id>/nodes"', body)
+        self.assertIn('storyfactory_cache_requests_total{cache="http_etag",result="hit"}', body)
+        self.assertIn('storyfactory_graph_items{project="",kind="nodes"} 1', body)
+        self.assertIn('storyfactory_graph_items{project="metrics-test",kind="nodes"} 0', body)
+        self.assertRegex(body, r"storyfactory_socketio_connected_clients [1-9]")
+        # 健康检查和指标接口本身不计入
+        self.assertNotIn('route="/metrics"', body)
+
+    def test_disconnect_updates_client_gauge(self):
+        """测试客户端断开（带断开原因参数）后连接数减少，客户端状态被清除，没有记录错误"""
+        before = metrics.socketio_clients.value()
+        client = socketio.test_client(self.app)
+        client.emit("project_join", {"projectId": "metrics-test"})
+        self.assertEqual(metrics.socketio_clients.value(), before + 1)
+        sids = [sid for sid, project_id in client_projects.items() if project_id == "metrics-test"]
+        self.assertEqual(len(sids), 1)
+        with mock.patch.object(extensions.logger, "exception") as log_exception:
+            client.disconnect()
+        log_exception.assert_not_called()
+        self.assertEqual(metrics.socketio_clients.value(), before)
+        self.assertNotIn(sids[0], client_projects)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import unittest
+import json
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.app import create_app
+from backend.database import NodeDatabase, EdgeDatabase, graph_snapshot
+from backend.extensions import socketio
+from backend.services import NodeService, EdgeService
+from backend.topology import CycleError
+
+
+class TestCascadeDeletion(unittest.TestCase):
+    """测试级联删除节点"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+        NodeDatabase()._nodes = []
+        EdgeDatabase()._edges = []
+        self.node_service = NodeService()
+        self.edge_service = EdgeService()
+        self.nodes = [
+            self.node_service.create_node({"type": "text", "position": {"x": i * 100, "y": 0}}) for i in range(4)
+        ]
+        ids = [node["id"] for node in self.nodes]
+        self.ids = ids
+        self.edges = [
+            self.edge_service.create_edge({"source": ids[0], "target": ids[1]}),
+            self.edge_service.create_edge({"source": ids[1], "target": ids[2]}),
+            self.edge_service.create_edge({"source": ids[0], "target": ids[2]}),
+            self.edge_service.create_edge({"source": ids[2], "target": ids[3]}),
+        ]
+
+    def _edge_ids(self):
+        return [edge["id"] for edge in self.edge_service.get_all_edges()]
+
+    def test_cascade_single_node(self):
+        """测试一次请求删除节点及其相连的边，只推送一次增量事件"""
+        listener = socketio.test_client(self.app)
+        try:
+            listener.get_received()
+            response = self.client.delete(f'/api/nodes/{self.ids[1]}?cascade=1')
+            self.assertEqual(response.status_code, 200)
+            body = json.loads(response.data)
+            self.assertEqual(sorted(body["deleted_edges"]), sorted([self.edges[0]["id"], self.edges[1]["id"]]))
+            received = listener.get_received()
+            self.assertEqual([r["name"] for r in received], ["graph_delta"])
+            self.assertEqual(received[0]["args"][0]["deleted_nodes"], [self.ids[1]])
+        finally:
+            listener.disconnect()
+        self.assertEqual(self._edge_ids(), [self.edges[2]["id"], self.edges[3]["id"]])
+        self.assertIsNone(self.node_service.get_node(self.ids[1]))
+        self.assertEqual(self.client.delete(f'/api/nodes/{self.ids[1]}?cascade=1').status_code, 404)
+
+    def test_delete_selection(self):
+        """测试删除一组节点，节点之间的边只删除一次"""
+        response = self.client.post('/api/nodes/delete', json={"ids": [self.ids[0], self.ids[2], "missing", self.ids[0]]})
+        self.assertEqual(response.status_code, 200)
+        body = json.loads(response.data)
+        self.assertEqual(body["deleted_nodes"], [self.ids[0], self.ids[2]])
+        self.assertEqual(sorted(body["deleted_edges"]), sorted(edge["id"] for edge in self.edges))
+        self.assertEqual(self._edge_ids(), [])
+        self.assertEqual(len(self.node_service.get_all_nodes(bbox=(-10, -10, 210, 10))), 1)
+        self.assertEqual(self.client.post('/api/nodes/delete', json={"ids": "x"}).status_code, 400)
+
+    def test_delete_without_cascade(self):
+        """测试不级联时保留边"""
+        result = self.node_service.delete_nodes([self.ids[3]], cascade=False)
+        self.assertEqual(result, {"nodes": [self.ids[3]], "edges": []})
+        self.assertEqual(len(self._edge_ids()), 4)
+
+    def test_deletion_is_atomic_snapshot(self):
+        """测试删除前取得的快照不受影响，删除后节点和边同时消失"""
+        before = graph_snapshot()
+        self.node_service.delete_nodes(self.ids[:2])
+        after = graph_snapshot()
+        self.assertEqual((len(before.nodes), len(before.edges)), (4, 4))
+        self.assertEqual((len(after.nodes), len(after.edges)), (2, 1))
+        # 邻接索引已同步：剩余的边 2 -> 3 仍然参与环检测
+        with self.assertRaises(CycleError):
+            self.edge_service.create_edge({"source": self.ids[3], "target": self.ids[2]})
+        self.assertTrue(self.edge_service.delete_related_to_node(self.ids[3]))
+        self.assertEqual(self._edge_ids(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+import unittest
+import json
+import math
+import os
+import sys
+
+import numpy as np
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.app import create_app
+from backend.columns import NodeTable, PositionColumn
+from backend.database import NodeDatabase, EdgeDatabase
+from backend.extensions import socketio
+from backend.models import NodeRecord
+from backend.services import NodeService
+
+
+class TestPositionColumn(unittest.TestCase):
+    """测试坐标列和带坐标列的节点快照表"""
+
+    def test_column_copy_on_write(self):
+        """测试修改生成的新列不影响旧列"""
+        column = PositionColumn.from_points([(float(i), -float(i)) for i in range(5000)])
+        changed = column.set(4999, (1.0, 2.0)).set(9000, None).set(9001, (3.0, 4.0))
+        self.assertEqual(column.get(4999), (4999.0, -4999.0))
+        self.assertEqual(changed.get(4999), (1.0, 2.0))
+        self.assertIsNone(changed.get(9000))
+        self.assertEqual(changed.get(9001), (3.0, 4.0))
+        self.assertEqual((len(column), len(changed)), (5000, 9002))
+        self.assertEqual(changed.to_array().shape, (9002, 2))
+        self.assertIsNone(column.get(9001))
+
+    def test_table_keeps_positions_by_slot(self):
+        """测试删除、重新加入和压缩后坐标仍与节点对应"""
+        table = NodeTable.build(
+            (NodeRecord.from_dict({"id": f"n{i}", "type": "text"}), (float(i), 0.0)) for i in range(200)
+        )
+        old = table
+        for i in range(150):
+            table = table.remove(f"n{i}")
+        table = table.put(NodeRecord.from_dict({"id": "n3", "type": "text"}), (7.0, 7.0))
+        self.assertEqual(len(table), 51)
+        self.assertEqual(table.point("n3"), (7.0, 7.0))
+        self.assertEqual(table.point("n199"), (199.0, 0.0))
+        self.assertEqual(table.to_dict(table.get("n150"))["position"], {"x": 150.0, "y": 0.0})
+        self.assertEqual(old.point("n3"), (3.0, 0.0))
+        with self.assertRaises(KeyError):
+            table.slots_for(["n1"])
+
+
+class TestBulkPositions(unittest.TestCase):
+    """测试批量坐标接口"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+        NodeDatabase()._nodes = []
+        EdgeDatabase()._edges = []
+        self.node_service = NodeService()
+        self.nodes = [
+            self.node_service.create_node({"type": "text", "position": {"x": i * 10, "y": i * 5}})
+            for i in range(4)
+        ]
+        self.ids = [node["id"] for node in self.nodes]
+
+    def _positions(self):
+        return [tuple(self.node_service.get_node(node_id)["position"].values()) for node_id in self.ids]
+
+    def _post(self, payload):
+        return self.client.post('/api/nodes/positions/bulk', json=payload)
+
+    def test_translate_scale_snap(self):
+        """测试平移、缩放和对齐网格"""
+        self._post({"op": "translate", "dx": 1, "dy": -1})
+        self.assertEqual(self._positions(), [(1, -1), (11, 4), (21, 9), (31, 14)])
+        self._post({"op": "scale", "sx": 2, "ids": self.ids[:2], "origin": [1, -1]})
+        self.assertEqual(self._positions()[:2], [(1, -1), (21, 9)])
+        self._post({"op": "snap", "grid": 10})
+        self.assertEqual(self._positions(), [(0, 0), (20, 10), (20, 10), (30, 10)])
+
+    def test_set_and_fit(self):
+        """测试直接设置坐标和缩放到指定范围"""
+        response = self._post({"op": "set", "ids": self.ids[:2], "positions": [[0, 0], [100, 50]]})
+        self.assertEqual(json.loads(response.data), {"updated": 2})
+        self._post({"op": "fit", "ids": self.ids[:2], "bounds": [0, 0, 10, 10]})
+        self.assertEqual(self._positions()[:2], [(0, 2.5), (10, 7.5)])
+        self.assertTrue(all(not math.isnan(v) for point in self._positions() for v in point))
+
+    def test_spatial_index_follows_transform(self):
+        """测试变换后范围查询与新坐标一致"""
+        self._post({"op": "translate", "dx": 1000, "ids": [self.ids[0]]})
+        inside = self.node_service.get_all_nodes(bbox=(990, -10, 1010, 10))
+        self.assertEqual([node["id"] for node in inside], [self.ids[0]])
+        self.assertEqual(len(self.node_service.get_all_nodes(bbox=(-1, -1, 1, 1))), 0)
+
+    def test_snapshot_unaffected(self):
+        """测试变换不影响之前取得的快照"""
+        snapshot = NodeDatabase().snapshot()
+        self._post({"op": "translate", "dx": 5})
+        self.assertEqual(snapshot.point(self.ids[1]), (10.0, 5.0))
+        self.assertEqual(NodeDatabase().snapshot().point(self.ids[1]), (15.0, 5.0))
+
+    def test_errors(self):
+        """测试未知节点和非法参数"""
+        self.assertEqual(self._post({"op": "translate", "dx": 1, "ids": ["missing"]}).status_code, 404)
+        self.assertEqual(self._post({"op": "rotate"}).status_code, 400)
+        self.assertEqual(self._post({"op": "snap", "grid": 0}).status_code, 400)
+        self.assertEqual(self._post({"op": "set", "ids": self.ids[:1], "positions": [[1]]}).status_code, 400)
+        self.assertEqual(self._post({"op": "translate", "dx": "1"}).status_code, 400)
+        self.assertEqual(self._positions(), [(0, 0), (10, 5), (20, 10), (30, 15)])
+
+    def test_single_broadcast(self):
+        """测试批量修改只推送一次节点更新"""
+        listener = socketio.test_client(self.app)
+        try:
+            listener.get_received()
+            self._post({"op": "translate", "dx": 3})
+            names = [r["name"] for r in listener.get_received()]
+            self.assertEqual(names.count("nodes_update"), 1)
+            self.assertEqual(names.count("node_updated"), 0)
+        finally:
+            listener.disconnect()
+
+    def test_large_transform_is_vectorized(self):
+        """测试大批量节点的变换结果"""
+        NodeDatabase()._nodes = [
+            {"id": f"n{i}", "type": "text", "data": {}, "position": {"x": i, "y": 0}} for i in range(20000)
+        ]
+        changed = self.node_service.transform_positions({"op": "scale", "sx": 0.5})
+        self.assertEqual(len(changed), 20000)
+        coords = NodeDatabase().snapshot().positions.to_array()
+        np.testing.assert_allclose(coords[:, 0], np.arange(20000) * 0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+import os
+import sys
+import threading
+import time
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend import profiler, routes
+from backend.app import create_app
+
+
+def _busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+class TestSamplingProfile(unittest.TestCase):
+    """测试采样分析"""
+
+    def setUp(self):
+        self.stop = threading.Event()
+        self.worker = threading.Thread(target=_busy_loop, args=(self.stop,), name="busy-worker")
+        self.worker.start()
+
+    def tearDown(self):
+        self.stop.set()
+        self.worker.join()
+
+    def test_samples_other_threads(self):
+        """测试采样到其他线程的调用栈，不包括发起采样的线程"""
+        result = profiler.sample(0.2, 0.005)
+        self.assertIn("busy-worker", result.samples)
+        self.assertNotIn(threading.current_thread().name, result.samples)
+        stacks = result.samples["busy-worker"]
+        self.assertTrue(all("_busy_loop" in [frame[2] for frame in stack] for stack in stacks))
+
+        collapsed = result.collapsed().splitlines()
+        self.assertTrue(any(line.startswith("busy-worker;") and "_busy_loop (test_profiler.py:" in line
+                            for line in collapsed))
+
+        speedscope = result.speedscope()
+        profile = next(p for p in speedscope["profiles"] if p["name"] == "busy-worker")
+        self.assertEqual(len(profile["samples"]), len(profile["weights"]))
+        frames = speedscope["shared"]["frames"]
+        self.assertTrue(all(0 <= index < len(frames) for sample in profile["samples"] for index in sample))
+
+    def test_one_profile_at_a_time(self):
+        """测试已有分析在进行时拒绝新的分析"""
+        with profiler._lock:
+            with self.assertRaises(RuntimeError):
+                profiler.sample(0.01, 0.005)
+
+
+class TestProfileEndpoints(unittest.TestCase):
+    """测试分析接口"""
+
+    def setUp(self):
+        self.app = create_app()
+        self.app.config["TESTING"] = True
+        self.client = self.app.test_client()
+
+    def test_admin_profile_requires_token(self):
+        """测试未配置令牌时接口不可用，令牌错误时返回403"""
+        with mock.patch.object(routes, "ADMIN_TOKEN", None):
+            self.assertEqual(self.client.post("/admin/profile").status_code, 404)
+        with mock.patch.object(routes, "ADMIN_TOKEN", "secret"):
+            response = self.client.post("/admin/profile", headers={"X-Admin-Token": "wrong"})
+            self.assertEqual(response.status_code, 403)
+
+    def test_admin_profile_formats(self):
+        """测试返回speedscope JSON或折叠栈"""
+        headers = {"X-Admin-Token": "secret"}
+        with mock.patch.object(routes, "ADMIN_TOKEN", "secret"):
+            response = self.client.post("/admin/profile?seconds=0.05&interval_ms=5", headers=headers)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn("profiles", response.get_json())
+            response = self.client.post("/admin/profile?seconds=0.05&format=collapsed", headers=headers)
+            self.assertEqual(response.mimetype, "text/plain")
+            response = self.client.post("/admin/profile?seconds=3600", headers=headers)
+            self.assertEqual(response.status_code, 400)
+
+    def test_request_profile_only_in_debug(self):
+        """测试调试模式下带管理令牌的 ?profile=1 返回耗时最多的函数，非调试模式下返回原响应"""
+        headers = {"X-Admin-Token": "secret"}
+        response = self.client.get("/api/nodes?profile=1", headers=headers)
+        self.assertIsInstance(response.get_json(), list)
+        self.app.debug = True
+        with mock.patch.object(profiler, "ADMIN_TOKEN", "secret"):
+            self.assertEqual(self.client.get("/api/nodes?profile=1").status_code, 403)
+            response = self.client.get("/api/nodes?profile=1&sort=tottime", headers=headers)
+            body = response.get_json()
+            self.assertEqual((body["status"], body["sort"]), (200, "tottime"))
+            self.assertTrue(body["functions"])
+            self.assertTrue(any("get_nodes" in entry["function"] for entry in body["functions"]))
+            tottimes = [entry["tottime_ms"] for entry in body["functions"]]
+            self.assertEqual(tottimes, sorted(tottimes, reverse=True))
+            self.assertEqual(self.client.get("/api/nodes?profile=1&sort=bogus", headers=headers).status_code, 400)
+        with mock.patch.object(profiler, "ADMIN_TOKEN", None):
+            self.assertEqual(self.client.get("/api/nodes?profile=1", headers=headers).status_code, 404)
+        # 分析结束后释放，可以再次分析
+        self.assertFalse(profiler._lock.locked())
+
+    def test_request_profile_releases_lock_on_failure(self):
+        """测试请求在after_request阶段失败时分析锁也会释放"""
+        @self.app.after_request
+        def _fail(response):
+            raise RuntimeError("after_request失败")
+
+        self.app.debug = True
+        self.app.config["PROPAGATE_EXCEPTIONS"] = False
+        with mock.patch.object(profiler, "ADMIN_TOKEN", "secret"):
+            response = self.client.get("/api/nodes?profile=1", headers={"X-Admin-Token": "secret"})
+        self.assertEqual(response.status_code, 500)
+        self.assertFalse(profiler._lock.locked())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,115 @@
+import unittest
+import gzip
+import io
+import json
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.app import create_app
+from backend.database import NodeDatabase, EdgeDatabase
+from backend.models import Node, Edge
+from backend.project_io import ProjectStreamParser, iter_project_json, read_project
+from backend.services import NodeService, EdgeService
+
+
+def _sample_graph():
+    nodes = [
+        Node.create(
+            node_type="chapter",
+            data={"label": f"第{i}章 😀", "text": "故事内容" * i, "weight": i * 1.5},
+            position={"x": i * 123456, "y": -i},
+            node_id=f"n{i}"
+        )
+        for i in range(12)
+    ]
+    edges = [
+        Edge.create(source=f"n{i}", target=f"n{i + 1}", edge_id=f"e{i}", edge_data={"label": "→"})
+        for i in range(11)
+    ]
+    return nodes, edges
+
+
+class TestProjectStreaming(unittest.TestCase):
+    """测试项目文件的增量读写"""
+
+    def test_writer_produces_valid_json(self):
+        """测试流式写出的文档是合法JSON"""
+        nodes, edges = _sample_graph()
+        document = b"".join(iter_project_json(nodes, edges))
+        self.assertEqual(json.loads(document), {"nodes": nodes, "edges": edges})
+
+    def test_parser_with_tiny_chunks(self):
+        """测试极小块读取时跨块的字符串、多字节字符和数字都能正确解析"""
+        nodes, edges = _sample_graph()
+        document = json.dumps({"version": 1, "nodes": nodes, "meta": {"a": [1, 2]}, "edges": edges}).encode()
+        for chunk_size in (1, 3, 7, 64):
+            items = list(ProjectStreamParser(io.BytesIO(document), chunk_size=chunk_size))
+            self.assertEqual([item for section, item in items if section == "nodes"], nodes)
+            self.assertEqual([item for section, item in items if section == "edges"], edges)
+
+    def test_read_gzip_project(self):
+        """测试自动识别gzip压缩的项目文件"""
+        nodes, edges = _sample_graph()
+        data = gzip.compress(b"".join(iter_project_json(nodes, edges)))
+        self.assertEqual(read_project(io.BytesIO(data)), (nodes, edges))
+
+    def test_invalid_documents(self):
+        """测试无效文档"""
+        for document in (b"", b"[]", b'{"nodes": [{"id": "a"} {"id": "b"}]}', b'{"nodes": [{"id": "a"'):
+            with self.assertRaises(ValueError):
+                read_project(io.BytesIO(document))
+        with self.assertRaises(ValueError):
+            read_project(io.BytesIO(b'{"edges": [{"id": "e1", "source": "a"}]}'))
+        self.assertEqual(read_project(io.BytesIO(b" {} ")), ([], []))
+
+
+class TestProjectApi(unittest.TestCase):
+    """测试项目导入导出接口"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+        nodes, edges = _sample_graph()
+        NodeDatabase()._nodes = nodes
+        EdgeDatabase()._edges = edges
+        self.node_service = NodeService()
+        self.edge_service = EdgeService()
+
+    def test_export_and_import_round_trip(self):
+        """测试导出后再导入得到相同的图"""
+        for query, decode in (("", lambda data: data), ("?gzip=1", gzip.decompress)):
+            response = self.client.get(f'/api/project/export{query}')
+            self.assertEqual(response.status_code, 200)
+            self.assertIn("attachment", response.headers["Content-Disposition"])
+            document = decode(response.data)
+            expected = {"nodes": self.node_service.get_all_nodes(), "edges": self.edge_service.get_all_edges()}
+            self.assertEqual(json.loads(document), json.loads(json.dumps(expected)))
+
+            NodeDatabase()._nodes = []
+            EdgeDatabase()._edges = []
+            response = self.client.post(
+                '/api/project/import', data=response.data, content_type='application/octet-stream'
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(json.loads(response.data)["nodes"], 12)
+            self.assertEqual(len(self.edge_service.get_all_edges()), 11)
+            self.assertIsNotNone(self.node_service.get_node("n5"))
+
+    def test_invalid_import_keeps_graph(self):
+        """测试导入失败时保留原有数据"""
+        response = self.client.post(
+            '/api/project/import', data=b'{"nodes": [{"label": "no id"}]}',
+            content_type='application/octet-stream'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(len(self.node_service.get_all_nodes()), 12)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,100 @@
+import unittest
+import json
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.app import create_app
+from backend.database import NodeDatabase, EdgeDatabase
+from backend.services import NodeService, EdgeService
+from backend.topology import TopologyIndex
+
+
+class TestReachabilityCache(unittest.TestCase):
+    """测试可达性缓存的精确失效"""
+
+    def setUp(self):
+        """测试前准备：a -> b -> c -> d，x -> y"""
+        self.index = TopologyIndex()
+        self.index.rebuild([("ab", "a", "b"), ("bc", "b", "c"), ("cd", "c", "d"), ("xy", "x", "y")])
+
+    def test_distances(self):
+        """测试最短距离"""
+        self.assertEqual(self.index.reachable("a"), {"b": 1, "c": 2, "d": 3})
+        self.assertEqual(self.index.reachable("d", forward=False), {"c": 1, "b": 2, "a": 3})
+        self.index.add("ad", "a", "d")
+        self.assertEqual(self.index.reachable("a")["d"], 1)
+
+    def test_only_affected_entries_are_invalidated(self):
+        """测试边变化只清除经过该边的缓存结果"""
+        for node_id in "abcdxy":
+            self.index.reachable(node_id)
+            self.index.reachable(node_id, forward=False)
+        cached = set(self.index._reachable)
+        self.index.add("cy", "c", "y")
+        stale = cached - set(self.index._reachable)
+        # 后代结果中 a、b、c 经过c，祖先结果中 y 经过y
+        self.assertEqual(stale, {("a", True), ("b", True), ("c", True), ("y", False)})
+        self.assertEqual(self.index.reachable("a"), {"b": 1, "c": 2, "d": 3, "y": 3})
+        self.assertEqual(self.index.reachable("y", forward=False), {"x": 1, "c": 1, "b": 2, "a": 3})
+
+        self.index.remove("bc")
+        self.assertEqual(self.index.reachable("a"), {"b": 1})
+        self.assertEqual(self.index.reachable("y", forward=False), {"x": 1, "c": 1})
+        self.assertIn(("x", True), self.index._reachable)
+
+
+class TestReachabilityAPI(unittest.TestCase):
+    """测试祖先/后代查询接口"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+        NodeDatabase()._nodes = []
+        EdgeDatabase()._edges = []
+        node_service = NodeService()
+        self.edge_service = EdgeService()
+        self.ids = [node_service.create_node({"type": "text"})["id"] for _ in range(4)]
+        for source, target in ((0, 1), (1, 2), (0, 2), (2, 3)):
+            self.edge_service.create_edge({"source": self.ids[source], "target": self.ids[target]})
+
+    def _get(self, url):
+        response = self.client.get(url)
+        return response.status_code, json.loads(response.data)
+
+    def test_descendants_and_ancestors(self):
+        """测试查询结果和深度限制"""
+        status, body = self._get(f'/api/nodes/{self.ids[0]}/descendants')
+        self.assertEqual(status, 200)
+        self.assertEqual(
+            [(item["id"], item["depth"]) for item in body["descendants"]],
+            sorted([(self.ids[1], 1), (self.ids[2], 1)]) + [(self.ids[3], 2)]
+        )
+        _, body = self._get(f'/api/nodes/{self.ids[3]}/ancestors?depth=1')
+        self.assertEqual(body["ancestors"], [{"id": self.ids[2], "depth": 1}])
+
+    def test_results_follow_edits(self):
+        """测试边修改后查询结果随之更新"""
+        _, before = self._get(f'/api/nodes/{self.ids[3]}/ancestors')
+        self.assertEqual(len(before["ancestors"]), 3)
+        self.edge_service.delete_related_to_node(self.ids[2])
+        _, after = self._get(f'/api/nodes/{self.ids[3]}/ancestors')
+        self.assertEqual(after["ancestors"], [])
+        self.client.delete(f'/api/nodes/{self.ids[1]}?cascade=1')
+        _, body = self._get(f'/api/nodes/{self.ids[0]}/descendants')
+        self.assertEqual(body["descendants"], [])
+
+    def test_errors(self):
+        """测试节点不存在和非法深度"""
+        self.assertEqual(self.client.get('/api/nodes/missing/ancestors').status_code, 404)
+        self.assertEqual(self.client.get(f'/api/nodes/{self.ids[0]}/descendants?depth=0').status_code, 400)
+        self.assertEqual(self.client.get(f'/api/nodes/{self.ids[0]}/descendants?depth=a').status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.database import NodeDatabase, EdgeDatabase
+from backend.models import Node, Edge, NodeRecord, EdgeRecord, node_point
+
+
+class TestRecords(unittest.TestCase):
+    """测试节点和边的紧凑记录"""
+
+    def test_node_round_trip(self):
+        """测试节点字典与记录互相转换"""
+        node = Node.create(
+            node_type="chapter", data={"label": "第一章"}, position={"x": 3, "y": -1.5},
+            source_position="right", target_position="left", node_id="n1"
+        )
+        node["width"] = 120
+        record = NodeRecord.from_dict(node)
+        point = node_point(node)
+        self.assertEqual(point, (3.0, -1.5))
+        self.assertIsInstance(point[0], float)
+        self.assertEqual(record.to_dict(point), node)
+        self.assertEqual(list(record.to_dict(point)), list(node))
+        self.assertFalse(hasattr(record, "__dict__"))
+
+    def test_unusual_positions_are_preserved(self):
+        """测试无法识别的坐标原样保留"""
+        for position in ({"x": "1", "y": 2}, {"x": 1, "y": 2, "z": 3}, {"x": float("nan"), "y": 0}, None):
+            node = {"id": "n1", "type": "text", "data": {}, "position": position}
+            self.assertIsNone(node_point(node))
+            self.assertEqual(NodeRecord.from_dict(node).to_dict()["position"], position)
+        record = NodeRecord.from_dict({"id": "n1", "position": {"x": "a", "y": 0}}).without_position()
+        self.assertEqual(record.to_dict((5.0, 6.0)), {"id": "n1", "position": {"x": 5.0, "y": 6.0}})
+
+    def test_edge_round_trip_and_interning(self):
+        """测试边的转换和字符串驻留"""
+        source = "".join(["node", "-", "a"])
+        edge = Edge.create(source=source, target="node-b", edge_id="e1",
+                           edge_data={"sourceHandle": "out", "animated": True, "label": "下一步"})
+        record = EdgeRecord.from_dict(edge)
+        self.assertEqual(record.to_dict(), edge)
+        self.assertIs(record.source, sys.intern("node-a"))
+
+    def test_store_returns_fresh_dicts(self):
+        """测试存储对外返回字典，修改返回值或传入的字典不影响存储和快照"""
+        db = NodeDatabase()
+        data = {"text": "", "tags": ["a"]}
+        db._nodes = [Node.create(node_type="text", data=data, position={"x": 0, "y": 0}, node_id="n1")]
+        edge_db = EdgeDatabase()
+        edge_db._edges = [Edge.create(source="n1", target="n1", edge_id="e1", edge_data={"data": {"weight": 1}})]
+        snapshot, version = db.snapshot(), db.version
+        data["tags"].append("传入的字典")
+        node = db.get_by_id("n1")
+        node["position"]["x"] = 99
+        node["data"]["text"] = "改写"
+        node["data"]["tags"].append("b")
+        edge_db.get_by_id("e1")["data"]["weight"] = 2
+        self.assertEqual(db.get_by_id("n1")["position"], {"x": 0, "y": 0})
+        self.assertEqual(db.get_by_id("n1")["data"], {"text": "", "tags": ["a"]})
+        self.assertEqual(snapshot.get("n1").data, {"text": "", "tags": ["a"]})
+        self.assertEqual(edge_db.get_by_id("e1")["data"], {"weight": 1})
+        self.assertEqual(db.version, version)
+        self.assertIsInstance(db.snapshot().get("n1"), NodeRecord)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+import os
+import subprocess
+import sys
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend import server
+from backend.app import create_app
+from backend.extensions import socketio
+
+
+class TestServerModes(unittest.TestCase):
+    """测试后端启动模式"""
+
+    def test_default_app_uses_threading(self):
+        """测试开发模式和测试中固定使用线程模式，不受是否安装了协程库影响"""
+        create_app()
+        self.assertEqual(socketio.server.eio.async_mode, "threading")
+
+    def test_select_async_mode(self):
+        """测试按顺序选用已安装的协程服务器"""
+        installed = {"eventlet"}
+        with mock.patch("importlib.util.find_spec", side_effect=lambda name: object() if name in installed else None):
+            self.assertEqual(server.select_async_mode(), "eventlet")
+            self.assertIsNone(server.select_async_mode("gevent"))
+            installed.clear()
+            self.assertIsNone(server.select_async_mode())
+
+    def test_production_requires_async_server_and_build(self):
+        """测试缺少协程服务器或前端构建时退出，而不是回退到开发服务器"""
+        with mock.patch.object(server, "select_async_mode", return_value=None), \
+                self.assertRaises(SystemExit):
+            server.run_production("127.0.0.1", 5000)
+        with mock.patch.object(server, "select_async_mode", return_value="gevent"), \
+                mock.patch.object(server, "frontend_build_dir", return_value="/nonexistent"), \
+                mock.patch.object(server, "_monkey_patch") as patch, \
+                self.assertRaises(SystemExit):
+            server.run_production("127.0.0.1", 5000)
+        patch.assert_not_called()
+
+    def test_workers_require_production_mode(self):
+        """测试多进程模式只能与生产模式一起使用"""
+        with mock.patch.object(server, "run_workers") as run_workers, \
+                mock.patch.object(server, "run_production") as run_production:
+            with self.assertRaises(SystemExit):
+                server.main(["--workers", "2"])
+            server.main(["--prod", "--workers", "2"])
+            run_workers.assert_called_once()
+            run_production.assert_not_called()
+
+    def test_worker_exit_is_logged(self):
+        """测试有工作进程退出时记录日志并停止其余工作进程"""
+        exited, running = mock.Mock(pid=101, returncode=3), mock.Mock(pid=102, returncode=None)
+        exited.poll.return_value = 3
+        running.poll.return_value = None
+        with mock.patch.object(server, "_check_production", return_value="gevent"), \
+                mock.patch("backend.bus.BusBroker") as broker, \
+                mock.patch("subprocess.Popen", side_effect=[exited, running]), \
+                mock.patch("signal.signal"), \
+                self.assertLogs("storyfactory.server", "INFO") as logs:
+            broker.return_value.start.return_value.path = "bus.sock"
+            server.run_workers("127.0.0.1", 5000, 2)
+        self.assertEqual([record.levelname for record in logs.records], ["INFO", "ERROR"])
+        self.assertEqual(logs.records[1].exit_codes, {101: 3})
+        running.terminate.assert_called_once()
+        broker.return_value.start.return_value.stop.assert_called_once()
+
+
+class TestColdStart(unittest.TestCase):
+    """测试后端冷启动时不加载只在使用时才需要的依赖"""
+
+    def test_import_app_is_lazy(self):
+        """测试导入应用不会导入openai、创建生成器或工作流引擎"""
+        root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+        code = (
+            "import sys, backend.app, backend.routes as routes; "
+            "print(sorted(m for m in ('openai', 'backend.execution_engine') if m in sys.modules)); "
+            "print(routes.generation_service._instance, routes.workflow_service._instance)"
+        )
+        output = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+        self.assertEqual(output.stdout.split("\n")[:2], ["[]", "None None"])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,168 @@
+import unittest
+import os
+import random
+import sys
+import threading
+from types import SimpleNamespace as Item
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.database import NodeDatabase, EdgeDatabase, graph_snapshot, transaction
+from backend.execution_engine import WorkflowEngine
+from backend.models import Node
+from backend.persistent import PersistentVector, SnapshotTable
+from backend.services import NodeService, EdgeService
+
+
+class TestPersistentStructures(unittest.TestCase):
+    """测试持久化向量和快照表"""
+
+    def test_vector_versions_are_independent(self):
+        """测试修改生成的新版本不影响旧版本"""
+        versions = [(PersistentVector(), [])]
+        rng = random.Random(7)
+        for _ in range(3000):
+            vector, model = versions[-1]
+            if model and rng.random() < 0.3:
+                index = rng.randrange(len(model))
+                value = rng.random()
+                vector = vector.set(index, value)
+                model = model[:index] + [value] + model[index + 1:]
+            else:
+                vector = vector.append(len(model))
+                model = model + [len(model)]
+            versions.append((vector, model))
+        for vector, model in versions[::97] + versions[-3:]:
+            self.assertEqual(list(vector), model)
+            self.assertEqual(len(vector), len(model))
+        self.assertEqual(list(PersistentVector.from_list(list(range(1100)))), list(range(1100)))
+
+    def test_table_snapshots_match_model(self):
+        """测试随机增删改后，每个历史快照仍与当时的数据一致"""
+        rng = random.Random(11)
+        table = SnapshotTable.build([Item(id=f"n{i}", v=0) for i in range(50)])
+        model = {item.id: item for item in table}
+        history = []
+        for step in range(2000):
+            item_id = f"n{rng.randrange(120)}"
+            if rng.random() < 0.4:
+                table = table.remove(item_id)
+                model.pop(item_id, None)
+            else:
+                item = Item(id=item_id, v=step)
+                table = table.put(item)
+                model[item_id] = item
+            if step % 50 == 0:
+                history.append((table, dict(model)))
+        for snapshot, expected in history + [(table, model)]:
+            self.assertEqual(len(snapshot), len(expected))
+            self.assertEqual({item.id: item for item in snapshot}, expected)
+            for item_id in (f"n{i}" for i in range(120)):
+                self.assertEqual(snapshot.get(item_id), expected.get(item_id))
+
+    def test_iter_after(self):
+        """测试从游标之后遍历"""
+        table = SnapshotTable.build([Item(id=str(i)) for i in range(100)]).remove("41")
+        self.assertEqual([item.id for item in table.iter_after("40")][:2], ["42", "43"])
+        self.assertEqual(list(table.iter_after("99")), [])
+        with self.assertRaises(KeyError):
+            list(table.iter_after("41"))
+
+
+class TestGraphSnapshots(unittest.TestCase):
+    """测试图存储快照"""
+
+    def setUp(self):
+        """测试前准备"""
+        NodeDatabase()._nodes = []
+        EdgeDatabase()._edges = []
+        self.node_service = NodeService()
+        self.edge_service = EdgeService()
+
+    def _create_node(self, node_type, text=""):
+        return self.node_service.create_node({"type": node_type, "data": {"label": node_type, "text": text}})
+
+    def test_snapshot_is_point_in_time(self):
+        """测试快照不受之后的修改影响"""
+        node = self._create_node("chapter", "v1")
+        snapshot = graph_snapshot()
+        self.node_service.update_node_text(node["id"], "v2")
+        self._create_node("chapter")
+        self.node_service.delete_node(node["id"])
+        self.assertEqual(snapshot.nodes.get(node["id"]).data["text"], "v1")
+        self.assertEqual(len(snapshot.nodes), 1)
+        self.assertEqual(len(self.node_service.get_all_nodes()), 1)
+        self.assertGreater(self.node_service.db.version, snapshot.nodes.version)
+
+    def test_transaction_is_invisible_until_commit(self):
+        """测试其他线程在事务提交前看不到中间状态，且读取不会被阻塞"""
+        node = self._create_node("chapter", "before")
+        seen = []
+        with transaction() as (node_db, edge_db):
+            node_db.update_text(node["id"], "during")
+            self.assertEqual(node_db.get_by_id(node["id"])["data"]["text"], "during")
+            reader = threading.Thread(
+                target=lambda: seen.append(NodeDatabase().get_by_id(node["id"])["data"]["text"])
+            )
+            reader.start()
+            reader.join(2)
+        self.assertEqual(seen, ["before"])
+        self.assertEqual(self.node_service.get_node(node["id"])["data"]["text"], "during")
+
+    def test_snapshot_survives_rollback_and_new_writes(self):
+        """测试事务回滚后继续修改，回滚前取得的快照仍能找到其中的元素"""
+        node_db = NodeDatabase()
+
+        def add(node_id, label):
+            node_db.add(Node.create(node_type="text", data={"label": label}, position={"x": 0, "y": 0}, node_id=node_id))
+
+        add("a", "A")
+        with self.assertRaises(RuntimeError):
+            with transaction():
+                add("b", "B")
+                snapshot = node_db.snapshot()
+                raise RuntimeError("回滚")
+        add("c", "C")
+        add("b", "B2")
+        self.assertEqual(snapshot.get("b").data["label"], "B")
+        self.assertEqual([record.id for record in snapshot], ["a", "b"])
+        self.assertEqual(node_db.get_by_id("b")["data"]["label"], "B2")
+
+    def test_rollback_outside_transaction_is_noop(self):
+        """测试不在事务中时回滚不重建索引，节点和边的存储行为一致"""
+        edge_db = EdgeDatabase()
+        with mock.patch.object(edge_db, "_rebuild_topology") as rebuild, \
+                mock.patch.object(NodeDatabase(), "_rebuild_spatial") as rebuild_spatial:
+            edge_db.rollback()
+            NodeDatabase().rollback()
+        rebuild.assert_not_called()
+        rebuild_spatial.assert_not_called()
+
+    def test_workflow_runs_on_snapshot(self):
+        """测试工作流执行期间的编辑不影响本次运行"""
+        start = self._create_node("start")
+        first = self.node_service.update_node_text(self._create_node("text")["id"], "first")
+        second = self.node_service.update_node_text(self._create_node("text")["id"], "original")
+        self.edge_service.create_edge({"source": start["id"], "target": first["id"]})
+        self.edge_service.create_edge({"source": first["id"], "target": second["id"]})
+
+        engine = WorkflowEngine()
+        execute_text = engine.node_executor._executors["text"]
+
+        def edit_while_running(node, input_data):
+            # 执行第一个文本节点时修改下游节点
+            if node["id"] == first["id"]:
+                self.node_service.update_node_text(second["id"], "edited")
+            return execute_text(node, input_data)
+
+        engine.node_executor._executors["text"] = edit_while_running
+        result = engine.execute_workflow(start["id"])
+        self.assertTrue(result["success"])
+        self.assertEqual(result["executed_nodes"][second["id"]]["output"]["text"], "original")
+        self.assertEqual(self.node_service.get_node(second["id"])["data"]["text"], "edited")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import start_app
+
+
+class _Process:
+    """模拟仍在运行或已退出的子进程"""
+
+    def __init__(self, returncode=None):
+        self.returncode = returncode
+
+    def poll(self):
+        return self.returncode
+
+
+class TestStartApp(unittest.TestCase):
+    """测试启动脚本的依赖缓存和就绪探测"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.requirements = os.path.join(self.directory, "requirements.txt")
+        with open(self.requirements, "w") as f:
+            f.write("flask\n")
+        patcher = mock.patch.object(start_app, "INSTALL_CACHE", os.path.join(self.directory, "cache.json"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_step_skipped_until_inputs_change(self):
+        """测试输入文件未变化时跳过安装，变化或强制时重新执行"""
+        step = mock.Mock()
+
+        def run(force=False):
+            fingerprint = start_app._hash_paths([self.requirements])
+            return start_app._cached_step("backend", fingerprint, lambda: True, step, force)
+
+        self.assertTrue(run())
+        self.assertFalse(run())
+        with open(self.requirements, "a") as f:
+            f.write("numpy\n")
+        self.assertTrue(run())
+        self.assertTrue(run(force=True))
+        self.assertEqual(step.call_count, 3)
+
+    def test_failed_step_is_not_cached(self):
+        """测试安装失败时不记录缓存，下次启动重新安装"""
+        fingerprint = start_app._hash_paths([self.requirements])
+        with self.assertRaises(SystemExit):
+            start_app._cached_step("backend", fingerprint, lambda: True, mock.Mock(side_effect=SystemExit(1)))
+        self.assertNotIn("backend", start_app._load_cache())
+
+    def test_wait_until_ready(self):
+        """测试轮询到200时返回，进程退出时不再等待"""
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self.send_response(200)
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            url = f"http://127.0.0.1:{server.server_port}/"
+            self.assertIsNotNone(start_app.wait_until_ready(url, _Process(), timeout=5))
+        finally:
+            server.shutdown()
+            server.server_close()
+        self.assertIsNone(start_app.wait_until_ready(url, _Process(returncode=1), timeout=5))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+import unittest
+import json
+import os
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.app import create_app
+from backend.database import NodeDatabase, EdgeDatabase
+from backend.extensions import socketio
+from backend.services import NodeService, EdgeService
+
+
+class TestSubgraphClone(unittest.TestCase):
+    """测试子图复制接口"""
+
+    def setUp(self):
+        """测试前准备：a -> b -> c，另有 x -> a"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+        NodeDatabase()._nodes = []
+        EdgeDatabase()._edges = []
+        self.node_service = NodeService()
+        self.edge_service = EdgeService()
+        self.a, self.b, self.c, self.x = (
+            self.node_service.create_node({
+                "type": "chapter", "data": {"label": label, "text": ""},
+                "position": {"x": i * 100, "y": 0}, "sourcePosition": "right"
+            })
+            for i, label in enumerate("abcx")
+        )
+        self.edge_service.create_edge({"source": self.a["id"], "target": self.b["id"], "sourceHandle": "out"})
+        self.edge_service.create_edge({"source": self.b["id"], "target": self.c["id"]})
+        self.edge_service.create_edge({"source": self.x["id"], "target": self.a["id"]})
+
+    def _clone(self, payload):
+        response = self.client.post('/api/subgraph/clone', json=payload)
+        return response.status_code, json.loads(response.data)
+
+    def test_clone_copies_internal_edges(self):
+        """测试复制节点和内部的边，外部的边不复制，只推送一次增量事件"""
+        listener = socketio.test_client(self.app)
+        try:
+            listener.get_received()
+            status, body = self._clone({"ids": [self.a["id"], self.b["id"]], "dx": 10, "dy": 500})
+            received = listener.get_received()
+        finally:
+            listener.disconnect()
+        self.assertEqual(status, 201)
+        self.assertEqual([r["name"] for r in received], ["graph_delta"])
+        self.assertEqual(len(received[0]["args"][0]["added_nodes"]), 2)
+
+        id_map = body["id_map"]
+        self.assertEqual(set(id_map), {self.a["id"], self.b["id"]})
+        self.assertTrue(set(id_map.values()).isdisjoint({self.a["id"], self.b["id"]}))
+        clone_a = self.node_service.get_node(id_map[self.a["id"]])
+        self.assertEqual(clone_a["position"], {"x": 10, "y": 500})
+        self.assertEqual(clone_a["data"], {"label": "a", "text": ""})
+        self.assertEqual(clone_a["sourcePosition"], "right")
+
+        self.assertEqual(len(body["edges"]), 1)
+        edge = body["edges"][0]
+        self.assertEqual((edge["source"], edge["target"]), (id_map[self.a["id"]], id_map[self.b["id"]]))
+        self.assertEqual(edge["sourceHandle"], "out")
+        self.assertEqual(len(self.edge_service.get_all_edges()), 4)
+        self.assertEqual(len(self.node_service.get_all_nodes(bbox=(0, 400, 200, 600))), 2)
+
+    def test_clone_is_independent(self):
+        """测试修改副本不影响原节点"""
+        _, body = self._clone({"ids": [self.c["id"]]})
+        clone_id = body["id_map"][self.c["id"]]
+        self.node_service.update_node_text(clone_id, "changed")
+        self.assertEqual(self.node_service.get_node(self.c["id"])["data"]["text"], "")
+
+    def test_clone_keeps_extra_fields(self):
+        """测试复制节点的其他字段（导入或同步得到的React Flow的style、width等）"""
+        node = NodeDatabase().add({
+            "id": "styled", "type": "chapter", "data": {"label": "styled"}, "position": {"x": 0, "y": 300},
+            "style": {"background": "#fff"}, "width": 180, "className": "highlight",
+        })
+        _, body = self._clone({"ids": [node["id"]], "dx": 10})
+        clone = self.node_service.get_node(body["id_map"][node["id"]])
+        self.assertEqual(
+            (clone["style"], clone["width"], clone["className"]), ({"background": "#fff"}, 180, "highlight")
+        )
+        self.assertEqual(clone["position"], {"x": 10, "y": 300})
+
+    def test_errors(self):
+        """测试节点不存在时不做任何修改"""
+        status, _ = self._clone({"ids": [self.a["id"], "missing"]})
+        self.assertEqual(status, 404)
+        self.assertEqual(len(self.node_service.get_all_nodes()), 4)
+        self.assertEqual(self._clone({"ids": []})[0], 400)
+        self.assertEqual(self._clone({"ids": [self.a["id"]], "dx": "1"})[0], 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
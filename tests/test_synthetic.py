@@ -0,0 +1,88 @@
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.database import EdgeDatabase, NodeDatabase, ProjectGraph, use_graph
+from backend.project_io import read_project
+from backend.synthetic import SHAPES, describe, generate_story_graph, load_into_store, write_project_file
+
+
+class TestSyntheticGraph(unittest.TestCase):
+    """测试合成故事图的生成"""
+
+    def test_same_seed_same_graph(self):
+        """测试相同参数生成相同的图，不同种子生成不同的图"""
+        first = generate_story_graph(2000, seed=7)
+        self.assertEqual(first, generate_story_graph(2000, seed=7))
+        self.assertNotEqual(first.nodes, generate_story_graph(2000, seed=8).nodes)
+
+    def test_graphs_are_runnable_stories(self):
+        """测试每种形状都生成指定数量的节点，边只指向后生成的节点，生成节点的前驱是文本节点"""
+        for shape in SHAPES:
+            with self.subTest(shape=shape):
+                graph = generate_story_graph(3000, seed=1, shape=shape, story_size=500)
+                self.assertEqual(len(graph.nodes), 3000)
+                self.assertEqual(len(graph.starts), 6)
+                order = {node["id"]: index for index, node in enumerate(graph.nodes)}
+                types = {node["id"]: node["type"] for node in graph.nodes}
+                parents = {}
+                for edge in graph.edges:
+                    self.assertLess(order[edge["source"]], order[edge["target"]])
+                    parents.setdefault(edge["target"], []).append(edge["source"])
+                for node in graph.nodes:
+                    if node["type"] == "generate":
+                        self.assertEqual([types[parent] for parent in parents[node["id"]]], ["text"])
+                    elif node["type"] != "start":
+                        self.assertIn(node["id"], parents)
+                self.assertEqual(sorted(types[start] for start in graph.starts), ["start"] * 6)
+
+    def test_shapes(self):
+        """测试各形状的结构特征"""
+        chain = describe(generate_story_graph(2000, shape="chain", story_size=1000))
+        self.assertEqual((chain["max_out_degree"], chain["merge_nodes"]), (1, 0))
+        self.assertEqual(chain["longest_path"], 999)
+        branch = describe(generate_story_graph(2000, shape="branch"))
+        self.assertGreater(branch["max_out_degree"], 1)
+        for shape in ("diamond", "dag"):
+            self.assertGreater(describe(generate_story_graph(2000, shape=shape))["merge_nodes"], 10)
+        with self.assertRaises(ValueError):
+            generate_story_graph(100, shape="star")
+
+
+class TestSyntheticGraphOutput(unittest.TestCase):
+    """测试载入图存储和写出项目文件"""
+
+    def setUp(self):
+        self.graph = generate_story_graph(1500, seed=3)
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_load_into_project_graph(self):
+        """测试载入 use_graph 指定的项目图"""
+        with use_graph(ProjectGraph("synthetic")):
+            load_into_store(self.graph)
+            self.assertEqual(len(NodeDatabase().get_all()), 1500)
+            reachable = EdgeDatabase().reachable(self.graph.starts[0])
+            ends = {node["id"] for node in self.graph.nodes if node["type"] == "end"}
+            self.assertTrue(ends & set(reachable))
+
+    def test_project_file_round_trip(self):
+        """测试写出的项目文件（包括gzip压缩的）可以导入"""
+        for compress in (False, True):
+            path = os.path.join(self.directory, f"synthetic{int(compress)}.storyfactory")
+            write_project_file(self.graph, path, compress=compress)
+            with open(path, "rb") as stream:
+                nodes, edges = read_project(stream)
+            self.assertEqual([node["id"] for node in nodes], [node["id"] for node in self.graph.nodes])
+            self.assertEqual(len(edges), len(self.graph.edges))
+
+
+if __name__ == '__main__':
+    unittest.main()
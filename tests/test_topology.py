@@ -0,0 +1,138 @@
+import unittest
+import json
+import os
+import random
+import sys
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.app import create_app
+from backend.database import NodeDatabase, EdgeDatabase
+from backend.services import NodeService, EdgeService, BatchService, BatchOperationError
+from backend.topology import TopologyIndex, CycleError
+
+
+def _reaches(edges, start, goal):
+    """按定义搜索可达性，作为对照"""
+    seen, stack = {start}, [start]
+    while stack:
+        node = stack.pop()
+        for source, target in edges.values():
+            if source == node and target not in seen:
+                seen.add(target)
+                stack.append(target)
+    return goal in seen
+
+
+class TestTopologyIndex(unittest.TestCase):
+    """测试增量拓扑序"""
+
+    def test_random_edits_match_reachability(self):
+        """测试随机增删边时的环检测与按定义搜索一致，且拓扑序始终有效"""
+        rng = random.Random(5)
+        index = TopologyIndex()
+        edges = {}
+        for step in range(1500):
+            if edges and rng.random() < 0.3:
+                edge_id = rng.choice(list(edges))
+                index.remove(edge_id)
+                del edges[edge_id]
+                continue
+            source, target = f"n{rng.randrange(30)}", f"n{rng.randrange(30)}"
+            cyclic = _reaches(edges, target, source)
+            try:
+                index.add(f"e{step}", source, target)
+                edges[f"e{step}"] = (source, target)
+                self.assertFalse(cyclic)
+            except CycleError:
+                self.assertTrue(cyclic)
+            for source, target in edges.values():
+                self.assertLess(index._order[source], index._order[target])
+
+    def test_loaded_cycles(self):
+        """测试载入已有环的图后仍能拒绝新环，删除环上的边后恢复拓扑序"""
+        index = TopologyIndex()
+        index.rebuild([("e1", "a", "b"), ("e2", "b", "a")])
+        self.assertFalse(index.acyclic)
+        index.add("e3", "a", "c")
+        with self.assertRaises(CycleError):
+            index.add("e4", "c", "b")
+        index.remove("e2")
+        self.assertTrue(index.acyclic)
+        index.add("e5", "c", "b")
+        self.assertEqual(index.successors("c"), {"b"})
+        self.assertEqual(index.predecessors("b"), {"a", "c"})
+        self.assertEqual(sorted(index.edges_of("b")), ["e1", "e5"])
+
+
+class TestCycleRejection(unittest.TestCase):
+    """测试创建边时拒绝环和图校验接口"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+        NodeDatabase()._nodes = []
+        EdgeDatabase()._edges = []
+        self.node_service = NodeService()
+        self.edge_service = EdgeService()
+        self.start = self.node_service.create_node({"type": "start"})
+        self.a = self.node_service.create_node({"type": "text"})
+        self.b = self.node_service.create_node({"type": "text"})
+        self.edge_service.create_edge({"source": self.start["id"], "target": self.a["id"]})
+        self.ab = self.edge_service.create_edge({"source": self.a["id"], "target": self.b["id"]})
+
+    def test_api_rejects_cycle(self):
+        """测试形成环的边返回409且不会保存"""
+        response = self.client.post('/api/edges', json={"source": self.b["id"], "target": self.start["id"]})
+        self.assertEqual(response.status_code, 409)
+        response = self.client.put(f'/api/edges/{self.ab["id"]}', json={"source": self.b["id"], "target": self.a["id"]})
+        self.assertEqual(response.status_code, 200)
+        response = self.client.put(f'/api/edges/{self.ab["id"]}', json={"source": self.b["id"], "target": self.b["id"]})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(len(self.edge_service.get_all_edges()), 2)
+        self.assertEqual(self.edge_service.get_edge(self.ab["id"])["target"], self.a["id"])
+
+    def test_batch_cycle_rolls_back(self):
+        """测试批量操作中形成环时整体回滚，索引同样回滚"""
+        with self.assertRaises(BatchOperationError):
+            BatchService().apply([
+                {"op": "delete_edge", "id": self.ab["id"]},
+                {"op": "create_edge", "edge": {"source": self.b["id"], "target": self.a["id"]}},
+                {"op": "create_edge", "edge": {"source": self.a["id"], "target": self.start["id"]}},
+                {"op": "create_edge", "edge": {"source": self.start["id"], "target": self.b["id"]}},
+            ])
+        self.assertEqual(len(self.edge_service.get_all_edges()), 2)
+        with self.assertRaises(CycleError):
+            self.edge_service.create_edge({"source": self.b["id"], "target": self.a["id"]})
+
+    def test_validate(self):
+        """测试校验接口报告不可达节点、悬空边和环"""
+        orphan = self.node_service.create_node({"type": "text"})
+        dangling = self.edge_service.create_edge({"source": self.b["id"], "target": "missing"})
+        body = json.loads(self.client.get('/api/graph/validate').data)
+        self.assertFalse(body["valid"])
+        self.assertTrue(body["acyclic"])
+        self.assertEqual(body["start_nodes"], [self.start["id"]])
+        self.assertEqual(body["unreachable_nodes"], [orphan["id"]])
+        self.assertEqual(body["dangling_edges"], [dangling["id"]])
+
+        self.node_service.delete_node(orphan["id"])
+        self.edge_service.delete_edge(dangling["id"])
+        self.assertTrue(json.loads(self.client.get('/api/graph/validate').data)["valid"])
+
+        # 导入的数据可以带环
+        EdgeDatabase()._edges = [
+            {"id": "e1", "source": self.a["id"], "target": self.b["id"]},
+            {"id": "e2", "source": self.b["id"], "target": self.a["id"]},
+        ]
+        body = json.loads(self.client.get('/api/graph/validate').data)
+        self.assertFalse(body["acyclic"])
+        self.assertEqual(body["unreachable_nodes"], [self.a["id"], self.b["id"]])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+import unittest
+import os
+import shutil
+import sys
+import tempfile
+from types import SimpleNamespace
+from unittest import mock
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend import tracing
+from backend.api_generate import Generator
+from backend.app import create_app
+from backend.database import NodeDatabase, EdgeDatabase
+from backend.tracing import TraceStore, Trace, run_trace, span
+from backend.workspace import workspace
+
+
+class TestTrace(unittest.TestCase):
+    """测试区间记录和存储"""
+
+    def test_span_without_run_records_nothing(self):
+        """测试没有进行中的运行时span不做记录"""
+        with span("orphan"):
+            pass
+        self.assertIsNone(tracing.current_trace())
+
+    def test_nested_run_joins_outer_run(self):
+        """测试运行中再开始的运行并入外层运行"""
+        with run_trace("outer") as outer:
+            with run_trace("inner") as inner:
+                with span("work", "test", n=1):
+                    pass
+        self.assertIs(inner, outer)
+        events = [event for event in outer.to_chrome()["traceEvents"] if event["ph"] == "X"]
+        self.assertEqual([event["name"] for event in events], ["outer", "inner", "work"])
+        self.assertEqual(events[2]["args"], {"n": 1})
+        # 外层区间包含内层区间
+        self.assertLessEqual(events[0]["ts"], events[1]["ts"])
+        self.assertGreaterEqual(events[0]["ts"] + events[0]["dur"], events[1]["ts"] + events[1]["dur"])
+        self.assertIsNotNone(outer.duration)
+
+    def test_store_keeps_recent_runs(self):
+        """测试只保留最近的若干次运行"""
+        store = TraceStore(capacity=2)
+        runs = [Trace("run") for _ in range(3)]
+        for run in runs:
+            store.add(run)
+        self.assertIsNone(store.get(runs[0].id))
+        self.assertEqual(store.recent(), [runs[2], runs[1]])
+
+
+class TestWorkflowTrace(unittest.TestCase):
+    """测试工作流运行的追踪接口"""
+
+    def setUp(self):
+        self.app = create_app()
+        self.app.config["TESTING"] = True
+        self.client = self.app.test_client()
+        self.directory = tempfile.mkdtemp()
+        self.previous_directory = workspace.directory
+        workspace.directory = self.directory
+        NodeDatabase()._nodes = []
+        EdgeDatabase()._edges = []
+
+    def tearDown(self):
+        workspace.unload_all()
+        workspace.directory = self.previous_directory
+        shutil.rmtree(self.directory)
+
+    def _node(self, node_type, text=""):
+        response = self.client.post("/api/nodes", json={
+            "type": node_type, "data": {"label": node_type}, "position": {"x": 0, "y": 0},
+        })
+        node_id = response.get_json()["id"]
+        if text:
+            self.client.put(f"/api/nodes/{node_id}/text", json={"text": text})
+        return node_id
+
+    def _connect(self, *node_ids):
+        for source, target in zip(node_ids, node_ids[1:]):
+            self.client.post("/api/edges", json={"source": source, "target": target})
+
+    def test_workflow_trace_covers_each_phase(self):
+        """测试运行的追踪记录包括排队、输入合并、执行器、文本生成、状态写入和广播"""
+        start, text, generate, end = (
+            self._node("start"), self._node("text", "从前"), self._node("generate"), self._node("end")
+        )
+        self._connect(start, text, generate, end)
+        response_message = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="有座山"))], usage=None
+        )
+        client = mock.MagicMock()
+        client.chat.completions.create.return_value = response_message
+        with mock.patch.object(Generator, "client", new_callable=mock.PropertyMock, return_value=client):
+            result = self.client.post("/api/workflow/execute", json={}).get_json()
+        self.assertTrue(result["success"])
+
+        response = self.client.get(f"/api/workflow/runs/{result['run_id']}/trace")
+        self.assertEqual(response.status_code, 200)
+        trace = response.get_json()
+        self.assertEqual(trace["displayTimeUnit"], "ms")
+        events = [event for event in trace["traceEvents"] if event["ph"] == "X"]
+        names = [event["name"] for event in events]
+        for name in ("workflow", "queue_wait", "input_merge", "execute_node", "executor:generate",
+                     "llm_request", "status_update", "broadcast"):
+            self.assertIn(name, names)
+        self.assertEqual(names.count("execute_node"), 4)
+        # 开始节点之外的节点各有一次排队等待，每个节点写入两次状态
+        self.assertEqual(names.count("queue_wait"), 3)
+        self.assertEqual(names.count("status_update"), 8)
+        for event in events:
+            self.assertGreaterEqual(event["dur"], 0)
+        self.assertTrue(any(event["ph"] == "M" and event["name"] == "thread_name" for event in trace["traceEvents"]))
+
+        runs = self.client.get("/api/workflow/runs").get_json()
+        self.assertEqual(runs[0]["id"], result["run_id"])
+
+    def test_unknown_run_returns_404(self):
+        """测试不存在的运行返回404"""
+        self.assertEqual(self.client.get("/api/workflow/runs/missing/trace").status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,166 @@
+import unittest
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+# 添加项目根目录到Python路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from backend.app import create_app
+from backend.database import NodeDatabase, EdgeDatabase
+from backend.extensions import socketio
+from backend.services import NodeService, EdgeService
+from backend.topology import CycleError
+from backend.workspace import Workspace, workspace
+
+
+def _node(label):
+    return {"type": "text", "data": {"label": label, "text": ""}, "position": {"x": 0, "y": 0}}
+
+
+class TestWorkspace(unittest.TestCase):
+    """测试项目图的懒加载和LRU卸载"""
+
+    def setUp(self):
+        """测试前准备：每个项目约3条数据，预算只够同时驻留两个项目"""
+        self.directory = tempfile.mkdtemp()
+        self.workspace = Workspace(self.directory, budget=600, item_bytes=100)
+        self.node_service = NodeService()
+        self.edge_service = EdgeService()
+        NodeDatabase()._nodes = []
+        EdgeDatabase()._edges = []
+
+    def tearDown(self):
+        self.workspace.unload_all()
+        shutil.rmtree(self.directory)
+
+    def _fill(self, project_id):
+        with self.workspace.open(project_id):
+            a = self.node_service.create_node(_node(project_id))
+            b = self.node_service.create_node(_node(project_id))
+            self.edge_service.create_edge({"source": a["id"], "target": b["id"]})
+        return a, b
+
+    def test_projects_are_isolated(self):
+        """测试各项目与默认图互不影响"""
+        a, b = self._fill("alpha")
+        with self.workspace.open("beta"):
+            self.assertEqual(self.node_service.get_all_nodes(), [])
+            # 环检测也只看当前项目的边
+            self.edge_service.create_edge({"source": b["id"], "target": a["id"]})
+        with self.workspace.open("alpha"):
+            self.assertEqual(len(self.node_service.get_all_nodes()), 2)
+            with self.assertRaises(CycleError):
+                self.edge_service.create_edge({"source": b["id"], "target": a["id"]})
+        self.assertEqual(self.node_service.get_all_nodes(), [])
+        self.assertEqual(self.edge_service.get_all_edges(), [])
+
+    def test_lru_unload_and_reload(self):
+        """测试超出预算时卸载最久未使用的项目，再次访问时从磁盘载入"""
+        a, _ = self._fill("alpha")
+        self._fill("beta")
+        self.assertFalse(os.path.exists(self.workspace.path_for("alpha")))
+        self._fill("gamma")
+        self.assertEqual(self.workspace.loaded(), ["beta", "gamma"])
+        self.assertTrue(os.path.exists(self.workspace.path_for("alpha")))
+        self.assertLessEqual(self.workspace.memory_usage, 600)
+
+        with self.workspace.open("alpha"):
+            self.assertEqual(self.node_service.get_node(a["id"])["data"]["label"], "alpha")
+            self.assertEqual(len(EdgeDatabase().get_all()), 1)
+        self.assertEqual(self.workspace.loaded(), ["gamma", "alpha"])
+
+    def test_pinned_project_is_not_unloaded(self):
+        """测试正在使用的项目不会被卸载"""
+        with self.workspace.open("alpha"):
+            for _ in range(10):
+                self.node_service.create_node(_node("alpha"))
+            self._fill("beta")
+            self.assertIn("alpha", self.workspace.loaded())
+        self.assertNotIn("alpha", self.workspace.loaded())
+
+    def test_flush_and_invalid_ids(self):
+        """测试写回有修改的项目，以及非法的项目ID"""
+        self._fill("alpha")
+        self.assertEqual(self.workspace.flush(), 1)
+        self.assertEqual(self.workspace.flush(), 0)
+        self.assertEqual(self.workspace.list_projects(), [{"id": "alpha", "loaded": True}])
+        for project_id in ("../etc", "a.b", "", "x" * 65):
+            with self.assertRaises(ValueError):
+                self.workspace.acquire(project_id)
+
+
+class TestProjectAPI(unittest.TestCase):
+    """测试 /api/projects/<project_id> 下的接口"""
+
+    def setUp(self):
+        """测试前准备"""
+        self.app = create_app()
+        self.app.config['TESTING'] = True
+        self.client = self.app.test_client()
+
+        self.directory = tempfile.mkdtemp()
+        self.previous_directory = workspace.directory
+        workspace.directory = self.directory
+        NodeDatabase()._nodes = []
+        EdgeDatabase()._edges = []
+
+    def tearDown(self):
+        workspace.unload_all()
+        workspace.directory = self.previous_directory
+        shutil.rmtree(self.directory)
+
+    def test_routes_are_scoped_by_project(self):
+        """测试项目接口只作用于该项目"""
+        response = self.client.post('/api/projects/alpha/nodes', json=_node("alpha"))
+        self.assertEqual(response.status_code, 201)
+        nodes = json.loads(self.client.get('/api/projects/alpha/nodes').data)
+        self.assertEqual(len(nodes), 1)
+        self.assertEqual(json.loads(self.client.get('/api/projects/beta/nodes').data), [])
+        self.assertEqual(json.loads(self.client.get('/api/nodes').data), [])
+
+        projects = json.loads(self.client.get('/api/projects').data)["projects"]
+        self.assertEqual([project["id"] for project in projects], ["alpha", "beta"])
+        self.assertEqual(self.client.get('/api/projects/a.b/nodes').status_code, 400)
+
+    def test_etag_changes_after_reload(self):
+        """测试项目卸载后重新载入（版本号从头计数）时，之前的ETag不再有效"""
+        node = json.loads(self.client.post('/api/projects/alpha/nodes', json=_node("alpha")).data)
+        etag = self.client.get('/api/projects/alpha/nodes').headers["ETag"]
+        self.assertEqual(self.client.get('/api/projects/alpha/nodes', headers={"If-None-Match": etag}).status_code, 304)
+        workspace.unload_all()
+        # 重新载入后的一次修改使版本号回到卸载前的值
+        self.client.put(f'/api/projects/alpha/nodes/{node["id"]}/text', json={"text": "新的文本"})
+        response = self.client.get('/api/projects/alpha/nodes', headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.data)[0]["data"]["text"], "新的文本")
+
+    def test_socket_events_stay_in_project(self):
+        """测试客户端只收到所加入项目的推送"""
+        member = socketio.test_client(self.app)
+        outsider = socketio.test_client(self.app)
+        try:
+            member.emit("project_join", {"projectId": "alpha"})
+            self.assertEqual(member.get_received()[-1]["name"], "project_joined")
+            outsider.get_received()
+
+            self.client.post('/api/projects/alpha/nodes', json=_node("alpha"))
+            self.assertEqual([r["name"] for r in member.get_received()], ["nodes_update"])
+            self.assertEqual(outsider.get_received(), [])
+
+            self.client.post('/api/nodes', json=_node("default"))
+            self.assertEqual(member.get_received(), [])
+            self.assertEqual([r["name"] for r in outsider.get_received()], ["nodes_update"])
+
+            member.emit("nodes_update_request")
+            nodes = member.get_received()[0]["args"][0]["nodes"]
+            self.assertEqual([node["data"]["label"] for node in nodes], ["alpha"])
+        finally:
+            member.disconnect()
+            outsider.disconnect()
+
+
+if __name__ == '__main__':
+    unittest.main()